@@ -1,11 +1,23 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from courtbooker import schemas
-from courtbooker.app.refresh import refresh_court_data
-from courtbooker.mapper import get_venues_by_location
-from courtbooker.util import get_court_sessions
+from courtbooker import churn, compact, scheduler, schemas
+from courtbooker.app.http_cache import mark_cacheable
+from courtbooker.app.refresh import get_refresh_status, refresh_court_data
+from courtbooker.app.streaming import encode_json_array, encode_ndjson
+from courtbooker.database import get_pool_metrics
+from courtbooker.mapper import get_venues_by_location_async, location_cache
+from courtbooker.pagination import InvalidCursorError
+from courtbooker.settings import app_settings
+from courtbooker.util import (
+    get_court_sessions_async,
+    get_court_sessions_page_async,
+    stream_court_sessions_async,
+)
 
 router = APIRouter(
     prefix="/api",
@@ -14,17 +26,26 @@ router = APIRouter(
 
 
 @router.get("/courts", response_model=schemas.CourtsResponse)
-def courts(
+async def courts(
+    request: Request,
+    response: Response,
     venues: list[str] | None = None,
     start_time_after: datetime | None = None,
     start_time_before: datetime | None = None,
     only_double_headers: bool = False,
     exclude_working_hours: bool = False,
+    min_duration_minutes: int | None = Query(None, gt=0),
     use_location: bool = False,
     latitude: float | None = None,
     longitude: float | None = None,
     distance_km: float | None = None,
+    format: Literal["json", "ndjson", "json-stream"] = "json",
+    limit: int | None = Query(None, gt=0, le=app_settings.MAX_PAGE_SIZE),
+    cursor: str | None = None,
 ):
+    # The same url is served in the compact shape to clients that ask for it
+    response.headers["Vary"] = "Accept"
+
     if use_location:
         if latitude is None or longitude is None or distance_km is None:
             return {
@@ -36,28 +57,102 @@ def courts(
                 "message": "Venues cannot be provided when using location",
             }
 
-        venue_distance_map = get_venues_by_location(
-            latitude=latitude,
-            longitude=longitude,
+        venue_distance_map = await get_venues_by_location_async(
+            location=(latitude, longitude),
             radius_in_metres=distance_km * 1000,
         )
 
         venues = list(venue_distance_map.keys())
 
-    court_sessions = get_court_sessions(
+    filters = dict(
         venues=venues,
         start_time_after=start_time_after,
         start_time_before=start_time_before,
         only_double_headers=only_double_headers,
         exclude_working_hours=exclude_working_hours,
+        min_duration_minutes=min_duration_minutes,
     )
 
-    return {
-        "message": "Success",
-        "courts": court_sessions,
-    }
+    if format == "ndjson":
+        mark_cacheable(request)
+        return StreamingResponse(
+            encode_ndjson(stream_court_sessions_async(**filters)),
+            media_type="application/x-ndjson",
+        )
+
+    if format == "json-stream":
+        mark_cacheable(request)
+        return StreamingResponse(
+            encode_json_array(stream_court_sessions_async(**filters)),
+            media_type="application/json",
+        )
+
+    if limit is not None or cursor is not None:
+        try:
+            page = await get_court_sessions_page_async(
+                limit=limit or app_settings.HTML_PAGE_SIZE,
+                cursor=cursor,
+                **filters,
+            )
+        except InvalidCursorError as e:
+            return {"message": str(e), "courts": []}
+
+        return _courts_response(
+            request,
+            page.court_sessions,
+            next_cursor=page.next_cursor,
+            total=page.total,
+            total_is_exact=page.total_is_exact,
+        )
+
+    court_sessions = await get_court_sessions_async(**filters)
+
+    return _courts_response(request, court_sessions)
+
+
+def _courts_response(
+    request: Request, court_sessions: list[schemas.CourtSession], **fields
+) -> dict | Response:
+    mark_cacheable(request)
+    media_type = compact.negotiate(request.headers.get("accept"))
+    if media_type is None:
+        return {"message": "Success", "courts": court_sessions, **fields}
+
+    return Response(
+        compact.dumps(
+            compact.encode(court_sessions, message="Success", **fields),
+            media_type,
+        ),
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
 
 
 @router.get("/refresh-courts")
-def refresh_courts():
-    refresh_court_data()
+async def refresh_courts():
+    # The Redis and database clients block, so it runs in a thread
+    return await run_in_threadpool(refresh_court_data)
+
+
+@router.get("/refresh-status")
+async def refresh_status():
+    return await run_in_threadpool(get_refresh_status)
+
+
+@router.get("/metrics/database")
+def database_metrics():
+    return get_pool_metrics()
+
+
+@router.get("/metrics/cache")
+def cache_metrics():
+    return {"location": location_cache.stats()}
+
+
+@router.get("/metrics/scraping")
+def scraping_metrics():
+    return scheduler.estimate_scrape_savings(
+        scheduler.get_candidate_slices(date.today()),
+        churn.load_churn_factors(),
+        date.today(),
+    )
@@ -6,13 +6,20 @@ from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
+from courtbooker.app.http_cache import mark_cacheable
 from courtbooker.app.refresh import refresh_court_data
-from courtbooker.mapper import InvalidLocationError, get_venues_by_location
+from courtbooker.mapper import (
+    InvalidLocationError,
+    get_venues_by_location_async,
+)
+from courtbooker.pagination import InvalidCursorError
+from courtbooker.settings import app_settings
 from courtbooker.util import (
-    get_court_sessions,
-    get_latest_update_time,
-    get_venues,
+    get_court_sessions_page_async,
+    get_latest_update_time_async,
+    get_venues_async,
 )
 
 
@@ -35,15 +42,16 @@ templates = Jinja2Templates(directory="./courtbooker/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
-def read_root(
+async def read_root(
     request: Request,
 ):
-    all_venues = get_venues()
-    last_update_time = get_latest_update_time()
+    all_venues = await get_venues_async()
+    last_update_time = await get_latest_update_time_async()
 
     if last_update_time is not None:
         last_update_time = last_update_time.strftime("%d/%m/%y %H:%M")
 
+    mark_cacheable(request)
     return templates.TemplateResponse(
         "index.html",
         {
@@ -72,7 +80,7 @@ def _empty_to_none(value_str: str | None = Query(None)) -> float | None:
 
 
 @router.get("/courts", response_class=HTMLResponse)
-def get_courts(
+async def get_courts(
     request: Request,
     search_type: SearchType = Query(SearchType.venue),
     daterange: str = Query(None),
@@ -83,6 +91,7 @@ def get_courts(
     latitude: float | None = Depends(_empty_to_none),
     longitude: float | None = Depends(_empty_to_none),
     postcode: str | None = Query(None),
+    cursor: str | None = Query(None),
 ):
     logging.info(f"Venues: {venues}")
     logging.info(f"Daterange: {daterange}")
@@ -121,7 +130,7 @@ def get_courts(
             location = postcode
 
         try:
-            venues = get_venues_by_location(
+            venues = await get_venues_by_location_async(
                 location=location,
                 radius_in_metres=distance_km * 1000,
             )
@@ -135,32 +144,49 @@ def get_courts(
 
         venues = list(venues.keys())
 
-    court_sessions = get_court_sessions(
-        venues=venues,
-        start_time_after=start_time_gte,
-        start_time_before=start_time_lte,
-        only_double_headers=only_double_headers == "on",
-        exclude_working_hours=exclude_working_hours == "on",
-    )
-
+    try:
+        page = await get_court_sessions_page_async(
+            limit=app_settings.HTML_PAGE_SIZE,
+            cursor=cursor,
+            venues=venues,
+            start_time_after=start_time_gte,
+            start_time_before=start_time_lte,
+            only_double_headers=only_double_headers == "on",
+            exclude_working_hours=exclude_working_hours == "on",
+        )
+    except InvalidCursorError as e:
+        return _return_error_response(request, str(e))
+
+    next_url = None
+    if page.next_cursor is not None:
+        next_url = str(
+            request.url.include_query_params(cursor=page.next_cursor)
+        )
+
+    mark_cacheable(request)
+    # Later pages are appended to the table as they scroll into view
     return templates.TemplateResponse(
-        "courts.html",
+        "courts.html" if cursor is None else "court-rows.html",
         {
             "request": request,
             "venues": len(venues),
-            "courts": court_sessions,
+            "courts": page.court_sessions,
+            "next_url": next_url,
+            "total": page.total,
+            "total_is_exact": page.total_is_exact,
             "error_message": None,
         },
     )
 
 
 @router.get("/refresh-courts", response_class=HTMLResponse)
-def refresh_data(request: Request):
-    court_task = refresh_court_data()
+async def refresh_data(request: Request):
+    court_task = await run_in_threadpool(refresh_court_data)
     return templates.TemplateResponse(
         "refresh-data.html",
         {
             "request": request,
             "message": court_task["message"],
+            "progress": court_task.get("progress"),
         },
     )
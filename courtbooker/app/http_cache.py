@@ -0,0 +1,131 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Hashable
+
+import orjson
+from fastapi import Request, Response
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+)
+from starlette.types import ASGIApp
+
+from courtbooker import compact
+from courtbooker.settings import app_settings
+from courtbooker.util import (
+    get_latest_update_time_async,
+    get_results_version_async,
+)
+
+
+def get_etag(version: Hashable, request: Request) -> str:
+    """A weak ETag for a search against a version of the results
+
+    Query parameters are sorted, so the same search always gets the same
+    tag, and the compact format the client accepts is included, as it
+    changes the representation.
+    """
+    key = orjson.dumps(
+        [
+            version,
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            compact.negotiate(request.headers.get("accept")),
+        ]
+    )
+    return f'W/"{hashlib.sha256(key).hexdigest()[:32]}"'
+
+
+def mark_cacheable(request: Request):
+    """Marks the response to a request as search results
+
+    Only marked responses get caching headers, so error messages sent with
+    a 200 status aren't cached.
+    """
+    request.state.cacheable = True
+
+
+def format_http_date(time: datetime) -> str:
+    # Scrape times are naive local times
+    return format_datetime(time.astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None
+) -> bool:
+    """Whether the client's cached copy is still current
+
+    If-Modified-Since is only used when If-None-Match isn't sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or _strip_weak(etag) in {
+            _strip_weak(tag) for tag in if_none_match.split(",")
+        }
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    # HTTP dates are to the second
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= (
+        since
+    )
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """Answers repeated searches with 304 Not Modified
+
+    Results only change when a scrape lands, so the ETag and Last-Modified
+    of the given paths are worked out from the latest scrape tasks before
+    the endpoint runs. Requests the client already has a current copy of
+    are answered without any further database work. Responses are only
+    given the headers if the endpoint marked them with `mark_cacheable`.
+    """
+
+    def __init__(self, app: ASGIApp, paths: set[str]):
+        super().__init__(app)
+        self.paths = paths
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        if request.method != "GET" or request.url.path not in self.paths:
+            return await call_next(request)
+
+        version = await get_results_version_async()
+        last_modified = await get_latest_update_time_async()
+
+        headers = {
+            "ETag": get_etag(version, request),
+            "Cache-Control": (
+                f"public, max-age={app_settings.HTTP_CACHE_MAX_AGE_SECONDS}"
+            ),
+            "Vary": "Accept",
+        }
+        if last_modified is not None:
+            headers["Last-Modified"] = format_http_date(last_modified)
+
+        if is_not_modified(request, headers["ETag"], last_modified):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200 and getattr(
+            request.state, "cacheable", False
+        ):
+            response.headers.update(headers)
+
+        return response
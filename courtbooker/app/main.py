@@ -1,10 +1,20 @@
 from fastapi import FastAPI
 
 from courtbooker.app import api, frontend
-from courtbooker.database import Base, engine
+from courtbooker.app.http_cache import ConditionalGetMiddleware
+from courtbooker.mapper import close_http_client
+from courtbooker.settings import app_settings
 
-Base.metadata.create_all(bind=engine)
+# The schema is upgraded by `python -m courtbooker.migrations` before the
+# API starts, rather than by every process that imports the app
 fastapi = FastAPI()
 
 fastapi.include_router(api.router)
 fastapi.include_router(frontend.router)
+fastapi.add_event_handler("shutdown", close_http_client)
+
+if app_settings.HTTP_CACHE_ENABLED:
+    fastapi.add_middleware(
+        ConditionalGetMiddleware,
+        paths={"/api/courts", "/html/courts", "/html/"},
+    )
@@ -1,35 +1,54 @@
+import uuid
 from datetime import datetime, timedelta
 
+from courtbooker.celery_app import celery
+from courtbooker.refresh_status import refresh_registry
 from courtbooker.settings import app_settings
-from courtbooker.util import get_latest_update_time
-from courtbooker.worker import court_refresh_task, get_running_task_id
+
+
+def _already_running(task_id: str) -> dict:
+    return {
+        "message": "Refresh task already running",
+        "task_id": task_id,
+        "progress": refresh_registry.get_progress(task_id),
+    }
 
 
 def refresh_court_data():
     # Prevents the task from running multiple times
-    current_task_id = get_running_task_id(
-        "court_refresh_task"
-    ) or get_running_task_id("scrape_sessions")
+    current_task_id = refresh_registry.get_running_task_id()
     if current_task_id:
-        return {
-            "message": "Refresh task already running",
-            "task_id": current_task_id,
-        }
+        return _already_running(current_task_id)
 
-    last_update_time = get_latest_update_time()
+    # Not the latest scrape, which scheduled scrapes keep recent
+    last_refresh_time = refresh_registry.get_last_refresh_time()
     current_time = datetime.now()
-    if last_update_time is not None:
-        time_since_update = current_time - last_update_time
-        if time_since_update < timedelta(
+    if last_refresh_time is not None:
+        time_since_refresh = current_time - last_refresh_time
+        if time_since_refresh < timedelta(
             minutes=app_settings.REFRESH_COOLDOWN_MINUTES
         ):
             return {
                 "message": f"Please wait at least {app_settings.REFRESH_COOLDOWN_MINUTES} minutes before refreshing",
-                "last_update_time": last_update_time,
+                "last_refresh_time": last_refresh_time,
             }
 
-    task = court_refresh_task.delay()
+    # Claimed before sending, so concurrent requests can't start two
+    task_id = str(uuid.uuid4())
+    current_task_id = refresh_registry.claim(task_id)
+    if current_task_id != task_id:
+        return _already_running(current_task_id)
+
+    # Sent by name so the API never imports the worker and its scrapers
+    celery.send_task("court_refresh", task_id=task_id)
     return {
         "message": "Refresh task started",
-        "task_id": task.id,
+        "task_id": task_id,
+    }
+
+
+def get_refresh_status() -> dict:
+    return {
+        "task_id": refresh_registry.get_running_task_id(),
+        "progress": refresh_registry.get_progress(),
     }
@@ -0,0 +1,35 @@
+from typing import Any, AsyncIterator
+
+import orjson
+
+Batches = AsyncIterator[list[dict[str, Any]]]
+
+
+def _dumps(row: dict[str, Any], option: int | None = None) -> bytes:
+    # Costs are Decimals or the strings they're stored as
+    return orjson.dumps(row, default=str, option=option)
+
+
+async def encode_ndjson(batches: Batches) -> AsyncIterator[bytes]:
+    """Encodes each batch of rows as one chunk of newline delimited JSON"""
+    async for batch in batches:
+        yield b"".join(
+            _dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in batch
+        )
+
+
+async def encode_json_array(
+    batches: Batches, message: str = "Success"
+) -> AsyncIterator[bytes]:
+    """Encodes the rows in the shape of a CourtsResponse, a batch at a time"""
+    yield b'{"message":' + orjson.dumps(message) + b',"courts":['
+
+    separator = b""
+    async for batch in batches:
+        if not batch:
+            continue
+
+        yield separator + b",".join(_dumps(row) for row in batch)
+        separator = b","
+
+    yield b"]}"
@@ -0,0 +1,716 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+import numpy as np
+import orjson
+import redis
+
+from courtbooker import schemas
+from courtbooker.geo import VenueIndex
+from courtbooker.pagination import (
+    CourtSessionsPage,
+    PageKey,
+    encode_cursor,
+    paginate,
+)
+
+SNAPSHOT_KEY_PREFIX = "courtbooker:snapshot"
+
+
+class Snapshot(NamedTuple):
+    court_sessions: list[schemas.CourtSession]
+    venues: list[str]
+    latest_update_time: Optional[datetime]
+    venue_coordinates: dict[str, tuple[float, float]] = {}
+    # The ids of the latest court sessions, in the same order, which break
+    # ties between page keys as they do in the database
+    court_session_ids: list[int] = []
+
+
+def factorize(values: list[Hashable]) -> tuple[list[Hashable], list[int]]:
+    """Replaces each value with its position in a list of unique values"""
+    ids = {}
+    codes = [ids.setdefault(value, len(ids)) for value in values]
+    return list(ids), codes
+
+
+class IndexedSnapshot:
+    """A snapshot held as NumPy columns, in page order
+
+    Filters run as vectorized masks over the columns and court sessions are
+    only built for the rows that are returned. Available blocks are found
+    with a single sort of the matching rows.
+    """
+
+    def __init__(self, version: Hashable, snapshot: Snapshot):
+        self.version = version
+        self.venues = snapshot.venues
+        self.latest_update_time = snapshot.latest_update_time
+        self.venue_index = VenueIndex(snapshot.venue_coordinates)
+
+        # Ordered by the page key, so pages are seeks
+        court_session_ids = snapshot.court_session_ids or [0] * len(
+            snapshot.court_sessions
+        )
+        rows = sorted(
+            zip(snapshot.court_sessions, court_session_ids),
+            key=lambda row: (
+                row[0].start_time,
+                row[0].venue,
+                row[0].label or "",
+                row[1],
+            ),
+        )
+        court_sessions = [court_session for court_session, _ in rows]
+
+        self.venue_names, venue_ids = factorize(
+            [court_session.venue for court_session in court_sessions]
+        )
+        self.labels, label_ids = factorize(
+            [court_session.label for court_session in court_sessions]
+        )
+        self.urls, url_ids = factorize(
+            [court_session.url for court_session in court_sessions]
+        )
+        self.venue_ids_by_name = {
+            venue_name: venue_id
+            for venue_id, venue_name in enumerate(self.venue_names)
+        }
+
+        self.id = np.array([id for _, id in rows], dtype=np.int64)
+        self.venue_id = np.array(venue_ids, dtype=np.int64)
+        self.label_id = np.array(label_ids, dtype=np.int64)
+        self.url_id = np.array(url_ids, dtype=np.int64)
+        self.start_time = np.array(
+            [court_session.start_time for court_session in court_sessions],
+            dtype="datetime64[us]",
+        )
+        self.end_time = np.array(
+            [court_session.end_time for court_session in court_sessions],
+            dtype="datetime64[us]",
+        )
+        self.cost_cents = np.array(
+            [
+                round(court_session.cost * 100)
+                for court_session in court_sessions
+            ],
+            dtype=np.int64,
+        )
+
+        start_date = self.start_time.astype("datetime64[D]")
+        # 1970-01-01 was a Thursday
+        weekday = (start_date.view(np.int64) + 3) % 7
+        hour = (self.start_time.astype("datetime64[h]") - start_date).view(
+            np.int64
+        )
+        self.is_working_hours = (weekday < 5) & (8 <= hour) & (hour < 17)
+
+        self.start_seconds = self.start_time.astype("datetime64[s]").view(
+            np.int64
+        )
+        self.end_seconds = self.end_time.astype("datetime64[s]").view(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.start_time)
+
+    def get_court_sessions(
+        self,
+        venues: list[str] | None = None,
+        start_time_after: datetime | None = None,
+        start_time_before: datetime | None = None,
+        exclude_working_hours: bool = False,
+        min_duration: timedelta | None = None,
+    ) -> list[schemas.CourtSession]:
+        """Gets the court sessions for the venues between the start times,
+        ordered by start time
+
+        If `min_duration` is given, contiguous sessions at the same court are
+        merged into blocks and only blocks lasting at least that long are
+        returned.
+        """
+        return self._build_court_sessions(
+            *self._get_columns(
+                venues,
+                start_time_after,
+                start_time_before,
+                exclude_working_hours,
+                min_duration,
+            )
+        )
+
+    def iter_court_sessions(
+        self,
+        batch_size: int,
+        venues: list[str] | None = None,
+        start_time_after: datetime | None = None,
+        start_time_before: datetime | None = None,
+        exclude_working_hours: bool = False,
+        min_duration: timedelta | None = None,
+    ) -> Iterator[list[schemas.CourtSession]]:
+        """Like `get_court_sessions`, but builds the sessions `batch_size`
+        at a time, so only one batch is held at once"""
+        rows, end_time, cost_cents = self._get_columns(
+            venues,
+            start_time_after,
+            start_time_before,
+            exclude_working_hours,
+            min_duration,
+        )
+
+        for start in range(0, len(rows), batch_size):
+            batch = slice(start, start + batch_size)
+            yield self._build_court_sessions(
+                rows[batch], end_time[batch], cost_cents[batch]
+            )
+
+    def _get_columns(
+        self,
+        venues: list[str] | None,
+        start_time_after: datetime | None,
+        start_time_before: datetime | None,
+        exclude_working_hours: bool,
+        min_duration: timedelta | None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The rows to build sessions from, with their end times and costs,
+        which differ from the rows' own for blocks"""
+        rows = self._get_rows(
+            venues, start_time_after, start_time_before, exclude_working_hours
+        )
+
+        if min_duration is not None:
+            return self._find_available_blocks(rows, min_duration)
+
+        return rows, self.end_time[rows], self.cost_cents[rows]
+
+    def get_court_sessions_page(
+        self,
+        limit: int,
+        after: PageKey | None = None,
+        venues: list[str] | None = None,
+        start_time_after: datetime | None = None,
+        start_time_before: datetime | None = None,
+        exclude_working_hours: bool = False,
+        min_duration: timedelta | None = None,
+    ) -> CourtSessionsPage:
+        """Gets the page of court sessions after the cursor's key
+
+        The rows are already in page order, so the page is a seek to the
+        cursor's start time and only its sessions are built. Blocks are
+        merged from every matching row, so they are paged afterwards.
+        """
+        if min_duration is not None:
+            return paginate(
+                self.get_court_sessions(
+                    venues,
+                    start_time_after,
+                    start_time_before,
+                    exclude_working_hours,
+                    min_duration,
+                ),
+                limit,
+                after,
+            )
+
+        rows = self._get_rows(
+            venues, start_time_after, start_time_before, exclude_working_hours
+        )
+
+        start = 0
+        if after is not None:
+            start = int(
+                np.searchsorted(
+                    self.start_time[rows], np.datetime64(after[0], "us")
+                )
+            )
+            # Sessions at the cursor's start time are compared on the rest
+            while start < len(rows) and self._page_key(rows[start]) <= after:
+                start += 1
+
+        page_rows = rows[start : start + limit]
+        next_cursor = None
+        if start + limit < len(rows):
+            next_cursor = encode_cursor(self._page_key(page_rows[-1]))
+
+        court_sessions = self._build_court_sessions(
+            page_rows, self.end_time[page_rows], self.cost_cents[page_rows]
+        )
+
+        if after is not None:
+            return CourtSessionsPage(court_sessions, next_cursor)
+
+        return CourtSessionsPage(court_sessions, next_cursor, len(rows), True)
+
+    def _page_key(self, row: int) -> PageKey:
+        # The same key as the database pages by
+        return (
+            self.start_time[row].item(),
+            self.venue_names[self.venue_id[row]],
+            self.labels[self.label_id[row]] or "",
+            int(self.id[row]),
+        )
+
+    def _get_rows(
+        self,
+        venues: list[str] | None,
+        start_time_after: datetime | None,
+        start_time_before: datetime | None,
+        exclude_working_hours: bool,
+    ) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+
+        if venues:
+            venue_ids = [
+                self.venue_ids_by_name[venue]
+                for venue in venues
+                if venue in self.venue_ids_by_name
+            ]
+            mask &= np.isin(self.venue_id, venue_ids)
+
+        if start_time_after is not None:
+            mask &= self.start_time >= np.datetime64(start_time_after, "us")
+
+        if start_time_before is not None:
+            mask &= self.start_time <= np.datetime64(start_time_before, "us")
+
+        if exclude_working_hours:
+            mask &= ~self.is_working_hours
+
+        return np.flatnonzero(mask)
+
+    def _find_available_blocks(
+        self, rows: np.ndarray, min_duration: timedelta
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if len(rows) == 0:
+            return rows, self.end_time[rows], self.cost_cents[rows]
+
+        rows = rows[
+            np.lexsort(
+                (
+                    self.start_seconds[rows],
+                    self.label_id[rows],
+                    self.venue_id[rows],
+                )
+            )
+        ]
+        start_seconds = self.start_seconds[rows]
+        end_seconds = self.end_seconds[rows]
+
+        court_id = (self.venue_id[rows] << 32) | self.label_id[rows]
+        new_court = np.ones(len(rows), dtype=bool)
+        new_court[1:] = court_id[1:] != court_id[:-1]
+
+        # Offsetting by the court index resets the running maximum per court
+        court_offset = np.cumsum(new_court) << 32
+        block_end_seconds = (
+            np.maximum.accumulate(court_offset | end_seconds) - court_offset
+        )
+
+        new_block = new_court
+        new_block[1:] |= start_seconds[1:] > block_end_seconds[:-1]
+        block_starts = np.flatnonzero(new_block)
+
+        block_start_seconds = start_seconds[block_starts]
+        block_end_seconds = np.maximum.reduceat(end_seconds, block_starts)
+        long_enough = np.flatnonzero(
+            block_end_seconds - block_start_seconds
+            >= min_duration.total_seconds()
+        )
+        long_enough = long_enough[
+            np.argsort(block_start_seconds[long_enough], kind="stable")
+        ]
+
+        block_end_time = np.maximum.reduceat(self.end_time[rows], block_starts)
+        block_cost_cents = np.add.reduceat(self.cost_cents[rows], block_starts)
+
+        return (
+            rows[block_starts[long_enough]],
+            block_end_time[long_enough],
+            block_cost_cents[long_enough],
+        )
+
+    def _build_court_sessions(
+        self, rows: np.ndarray, end_time: np.ndarray, cost_cents: np.ndarray
+    ) -> list[schemas.CourtSession]:
+        columns = zip(
+            self.venue_id[rows].tolist(),
+            self.label_id[rows].tolist(),
+            cost_cents.tolist(),
+            self.start_time[rows].tolist(),
+            end_time.tolist(),
+            self.url_id[rows].tolist(),
+        )
+
+        # The rows were validated when the snapshot was loaded
+        return [
+            schemas.CourtSession.model_construct(
+                venue=self.venue_names[venue_id],
+                label=self.labels[label_id],
+                cost=Decimal(cost_cents).scaleb(-2),
+                start_time=start_time,
+                end_time=end_time,
+                url=self.urls[url_id],
+            )
+            for venue_id, label_id, cost_cents, start_time, end_time, url_id in columns
+        ]
+
+
+class SnapshotCache:
+    """Keeps the latest snapshot in memory until a newer one is available
+
+    Whether the snapshot is stale is checked with `get_version`, which
+    should be cheap, at most once every `poll_seconds`. The snapshot is
+    only reloaded with `load_snapshot` when the version has changed.
+    """
+
+    def __init__(
+        self,
+        get_version: Callable[[], Hashable],
+        load_snapshot: Callable[[], Snapshot],
+        poll_seconds: float,
+        get_version_async: Callable[[], Awaitable[Hashable]] | None = None,
+        load_snapshot_async: Callable[[], Awaitable[Snapshot]] | None = None,
+    ):
+        self.get_version = get_version
+        self.load_snapshot = load_snapshot
+        self.poll_seconds = poll_seconds
+        self.get_version_async = get_version_async
+        self.load_snapshot_async = load_snapshot_async
+
+        self._snapshot: IndexedSnapshot | None = None
+        self._last_polled = float("-inf")
+        self._lock = threading.Lock()
+        # Created in the running loop on first use, as the cache is built
+        # at import time, before any loop exists
+        self._async_lock: asyncio.Lock | None = None
+        self._async_lock_loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self) -> IndexedSnapshot:
+        if time.monotonic() - self._last_polled < self.poll_seconds:
+            return self._snapshot
+
+        with self._lock:
+            # Another thread may have polled while we waited for the lock
+            if time.monotonic() - self._last_polled < self.poll_seconds:
+                return self._snapshot
+
+            version = self.get_version()
+            if self._snapshot is None or self._snapshot.version != version:
+                logging.info(f"Loading court sessions snapshot {version}")
+                self._snapshot = IndexedSnapshot(version, self.load_snapshot())
+
+            self._last_polled = time.monotonic()
+
+        return self._snapshot
+
+    async def get_async(self) -> IndexedSnapshot:
+        """Like `get`, but polls and loads with the async callables"""
+        if time.monotonic() - self._last_polled < self.poll_seconds:
+            return self._snapshot
+
+        async with self._get_async_lock():
+            if time.monotonic() - self._last_polled < self.poll_seconds:
+                return self._snapshot
+
+            version = await self.get_version_async()
+            if self._snapshot is None or self._snapshot.version != version:
+                logging.info(f"Loading court sessions snapshot {version}")
+                self._snapshot = IndexedSnapshot(
+                    version, await self.load_snapshot_async()
+                )
+
+            self._last_polled = time.monotonic()
+
+        return self._snapshot
+
+    def _get_async_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._async_lock is None or self._async_lock_loop is not loop:
+            self._async_lock = asyncio.Lock()
+            self._async_lock_loop = loop
+        return self._async_lock
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._last_polled = float("-inf")
+
+
+def encode_court_sessions(
+    court_sessions: list[schemas.CourtSession], court_session_ids: list[int]
+) -> bytes:
+    """Encodes court sessions and their ids as compact rows rather than
+    keyed objects"""
+    return orjson.dumps(
+        [
+            [
+                id,
+                court_session.venue,
+                court_session.label,
+                str(court_session.cost),
+                court_session.start_time,
+                court_session.end_time,
+                court_session.url,
+            ]
+            for court_session, id in zip(court_sessions, court_session_ids)
+        ]
+    )
+
+
+def decode_court_sessions(
+    data: bytes,
+) -> tuple[list[schemas.CourtSession], list[int]]:
+    rows = orjson.loads(data)
+
+    # The rows were validated before they were encoded
+    court_sessions = [
+        schemas.CourtSession.model_construct(
+            venue=venue,
+            label=label,
+            cost=Decimal(cost),
+            start_time=datetime.fromisoformat(start_time),
+            end_time=datetime.fromisoformat(end_time),
+            url=url,
+        )
+        for _, venue, label, cost, start_time, end_time, url in rows
+    ]
+
+    return court_sessions, [row[0] for row in rows]
+
+
+class RedisSnapshotStore:
+    """Shares the latest snapshot between processes through Redis
+
+    The court sessions of each data source are stored under their own key,
+    so a scrape only has to rewrite its own data source. Every save bumps
+    the version key, which readers poll to know when to reload.
+    """
+
+    def __init__(
+        self, client: redis.Redis, key_prefix: str = SNAPSHOT_KEY_PREFIX
+    ):
+        self.client = client
+        self.version_key = f"{key_prefix}:version"
+        self.metadata_key = f"{key_prefix}:metadata"
+        self.court_sessions_key_prefix = f"{key_prefix}:court_sessions"
+
+    def _court_sessions_key(self, data_source: str) -> str:
+        return f"{self.court_sessions_key_prefix}:{data_source}"
+
+    def get_version(self) -> int:
+        return int(self.client.get(self.version_key) or 0)
+
+    def save(
+        self,
+        court_sessions_by_data_source: dict[
+            str, tuple[list[schemas.CourtSession], list[int]]
+        ],
+        venues: list[str],
+        latest_update_time: Optional[datetime],
+        venue_coordinates: dict[str, tuple[float, float]] | None = None,
+    ):
+        """Saves the court sessions and their ids of the data sources"""
+        metadata = orjson.dumps(
+            {
+                "venues": venues,
+                "latest_update_time": latest_update_time,
+                "venue_coordinates": venue_coordinates or {},
+            }
+        )
+
+        with self.client.pipeline() as pipeline:
+            for data_source, (
+                court_sessions,
+                court_session_ids,
+            ) in court_sessions_by_data_source.items():
+                pipeline.set(
+                    self._court_sessions_key(data_source),
+                    encode_court_sessions(court_sessions, court_session_ids),
+                )
+            pipeline.set(self.metadata_key, metadata)
+            pipeline.incr(self.version_key)
+            pipeline.execute()
+
+    def load(self, data_sources: list[str]) -> Snapshot | None:
+        """Loads the snapshot of the data sources, or None if any part of it
+        has not been saved yet"""
+        metadata, *encoded_court_sessions = self.client.mget(
+            [self.metadata_key]
+            + [
+                self._court_sessions_key(data_source)
+                for data_source in data_sources
+            ]
+        )
+
+        if metadata is None or None in encoded_court_sessions:
+            return None
+
+        metadata = orjson.loads(metadata)
+        latest_update_time = metadata["latest_update_time"]
+
+        court_sessions, court_session_ids = [], []
+        for data in encoded_court_sessions:
+            data_source_sessions, data_source_ids = decode_court_sessions(data)
+            court_sessions.extend(data_source_sessions)
+            court_session_ids.extend(data_source_ids)
+
+        return Snapshot(
+            court_sessions=court_sessions,
+            venues=metadata["venues"],
+            latest_update_time=(
+                datetime.fromisoformat(latest_update_time)
+                if latest_update_time is not None
+                else None
+            ),
+            venue_coordinates={
+                venue: tuple(coordinates)
+                for venue, coordinates in metadata.get(
+                    "venue_coordinates", {}
+                ).items()
+            },
+            court_session_ids=court_session_ids,
+        )
+
+
+class TTLCache:
+    """An LRU cache whose entries expire after `ttl_seconds`
+
+    If a Redis client is given, entries are also stored in Redis so that
+    they are shared between processes and survive restarts. Values must be
+    JSON serializable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl_seconds: float,
+        client: redis.Redis | None = None,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.client = client
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis_key(self, key: str) -> str:
+        return f"courtbooker:{self.name}:{key}"
+
+    def _get_local(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return value
+
+    def _set_local(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Any | None:
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        if self.client is not None:
+            redis_key = self._redis_key(key)
+            try:
+                with self.client.pipeline() as pipeline:
+                    pipeline.get(redis_key)
+                    pipeline.pttl(redis_key)
+                    data, ttl_milliseconds = pipeline.execute()
+            except redis.RedisError:
+                logging.exception(f"Failed to read {key} from Redis")
+                data = None
+
+            if data is not None:
+                value = orjson.loads(data)
+                # Expire locally when the shared entry expires
+                self._set_local(
+                    key,
+                    value,
+                    max(ttl_milliseconds, 0) / 1000 or self.ttl_seconds,
+                )
+                with self._lock:
+                    self.redis_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+
+        return None
+
+    def set(self, key: str, value: Any):
+        self._set_local(key, value, self.ttl_seconds)
+
+        if self.client is not None:
+            try:
+                self.client.set(
+                    self._redis_key(key),
+                    orjson.dumps(value),
+                    px=round(self.ttl_seconds * 1000),
+                )
+            except redis.RedisError:
+                logging.exception(f"Failed to write {key} to Redis")
+
+    async def get_async(self, key: str) -> Any | None:
+        if self.client is None:
+            return self.get(key)
+
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        # The Redis client blocks, so it is called from a thread
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, value: Any):
+        if self.client is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,13 @@
+import os
+
+from celery import Celery
+
+# Kept apart from the worker so the API can send tasks without importing
+# the scrapers
+celery = Celery("courtbooker.worker")
+celery.conf.broker_url = os.environ.get(
+    "CELERY_BROKER_URL", "redis://localhost:6379"
+)
+celery.conf.result_backend = os.environ.get(
+    "CELERY_RESULT_BACKEND", "redis://localhost:6379"
+)
@@ -0,0 +1,157 @@
+import datetime
+import math
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from courtbooker import models
+from courtbooker.database import DbSession
+from courtbooker.settings import app_settings
+
+ChurnKey = tuple[str, int, int]
+DayKey = tuple[models.DataSource, str, int]
+
+
+def get_hour_bucket(hour: int) -> int:
+    return hour // app_settings.CHURN_HOUR_BUCKET_HOURS
+
+
+def _hour_buckets() -> range:
+    return range(math.ceil(24 / app_settings.CHURN_HOUR_BUCKET_HOURS))
+
+
+def _churn_key(court_session: models.CourtSession) -> ChurnKey:
+    return (
+        court_session.venue.path,
+        court_session.start_time.weekday(),
+        get_hour_bucket(court_session.start_time.hour),
+    )
+
+
+def record_churn(
+    db_session: Session,
+    data_source: models.DataSource,
+    changed_sessions: Iterable[models.CourtSession],
+    slices: set[tuple[str, datetime.date]],
+    scraped_at: datetime.datetime,
+):
+    """Updates the change rates from the differences found by a scrape
+
+    Only slices scraped before count, as the hours since their previous
+    scrape are needed to turn the changes into a rate.
+
+    Args:
+        db_session (Session): The session to update the rates in
+        data_source (models.DataSource): The data source scraped
+        changed_sessions (Iterable[models.CourtSession]): The sessions that
+            are new, changed or no longer available
+        slices (set[tuple[str, datetime.date]]): The (venue path, date)
+            pairs the scrape covered
+        scraped_at (datetime.datetime): When the scrape started
+    """
+    if not slices:
+        return
+
+    venue_paths = {venue_path for venue_path, _ in slices}
+    previous_scrapes = {
+        (row.venue_path, row.date): row.time_scraped
+        for row in db_session.query(models.ScrapeSlice).filter(
+            models.ScrapeSlice.data_source == data_source,
+            models.ScrapeSlice.venue_path.in_(venue_paths),
+            models.ScrapeSlice.time_scraped.is_not(None),
+        )
+    }
+
+    hours = defaultdict(float)
+    observations = Counter()
+    for venue_path, date in slices:
+        time_scraped = previous_scrapes.get((venue_path, date))
+        if time_scraped is None or time_scraped >= scraped_at:
+            continue
+
+        elapsed_hours = (scraped_at - time_scraped).total_seconds() / 3600
+        for hour_bucket in _hour_buckets():
+            key = (venue_path, date.weekday(), hour_bucket)
+            hours[key] += elapsed_hours
+            observations[key] += 1
+
+    if not hours:
+        return
+
+    changes = Counter(
+        key for key in map(_churn_key, changed_sessions) if key in observations
+    )
+
+    rows = {
+        (row.venue_path, row.weekday, row.hour_bucket): row
+        for row in db_session.query(models.ChurnStat).filter(
+            models.ChurnStat.data_source == data_source,
+            models.ChurnStat.venue_path.in_(venue_paths),
+        )
+    }
+
+    for key, key_hours in hours.items():
+        row = rows.get(key)
+        if row is None:
+            venue_path, weekday, hour_bucket = key
+            row = models.ChurnStat(
+                data_source=data_source,
+                venue_path=venue_path,
+                weekday=weekday,
+                hour_bucket=hour_bucket,
+                changes=0.0,
+                hours=0.0,
+                observations=0,
+            )
+            db_session.add(row)
+
+        row.changes = row.changes * app_settings.CHURN_DECAY + changes[key]
+        row.hours = row.hours * app_settings.CHURN_DECAY + key_hours
+        row.observations += observations[key]
+
+
+def get_churn_factors(rows: list[models.ChurnStat]) -> dict[DayKey, float]:
+    """How much to scale each venue and weekday's target staleness by
+
+    Slices are scraped a whole day at a time, so a day is as stale as its
+    busiest hours. The changes per hour of a venue's busiest hour bucket on
+    a weekday are compared with the mean of those across every venue and
+    weekday, so slices that change twice as often get half the staleness.
+
+    Args:
+        rows (list[models.ChurnStat]): The recorded change rates
+
+    Returns:
+        dict[DayKey, float]: The factor for each (data source, venue path,
+            weekday), clamped to the configured range
+    """
+    day_rates = defaultdict(float)
+    for row in rows:
+        if row.hours > 0:
+            key = (row.data_source, row.venue_path, row.weekday)
+            day_rates[key] = max(day_rates[key], row.changes / row.hours)
+
+    if not day_rates:
+        return {}
+
+    mean_rate = sum(day_rates.values()) / len(day_rates)
+
+    return {
+        key: min(
+            max(
+                mean_rate / rate if rate > 0 else math.inf,
+                app_settings.CHURN_MIN_FACTOR,
+            ),
+            app_settings.CHURN_MAX_FACTOR,
+        )
+        for key, rate in day_rates.items()
+    }
+
+
+def load_churn_factors() -> dict[DayKey, float]:
+    if not app_settings.CHURN_ADAPTIVE_ENABLED:
+        return {}
+
+    with DbSession(read_only=True) as db_session:
+        return get_churn_factors(db_session.query(models.ChurnStat).all())
@@ -0,0 +1,177 @@
+import datetime
+from decimal import Decimal
+from typing import Any, Callable
+
+import msgpack
+import orjson
+
+from courtbooker import schemas
+from courtbooker.cache import factorize
+
+COMPACT_JSON = "application/vnd.courtbooker.compact+json"
+COMPACT_MSGPACK = "application/vnd.courtbooker.compact+msgpack"
+
+_SERIALIZERS: dict[str, tuple[Callable, Callable]] = {
+    COMPACT_JSON: (orjson.dumps, orjson.loads),
+    COMPACT_MSGPACK: (msgpack.packb, msgpack.unpackb),
+    "application/msgpack": (msgpack.packb, msgpack.unpackb),
+    "application/x-msgpack": (msgpack.packb, msgpack.unpackb),
+}
+# Accepting any of these gets the usual CourtsResponse
+_PLAIN_JSON = {"application/json", "application/*", "*/*"}
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MINUTE = datetime.timedelta(minutes=1)
+# Booking urls link to a venue's page for the date of the session
+DATE_PLACEHOLDER = "{date}"
+
+
+def _format_date(start_time: datetime.datetime) -> str:
+    return f"{start_time:%Y-%m-%d}"
+
+
+def encode(
+    court_sessions: list[schemas.CourtSession], **fields
+) -> dict[str, Any]:
+    """Encodes court sessions as columns of integers
+
+    Venues, labels and url templates are each listed once and referred to
+    by their position. Start times are minutes since the epoch, counting
+    the naive times as UTC, and durations are minutes.
+
+    Args:
+        court_sessions (list[schemas.CourtSession]): The sessions to encode
+        **fields: Other fields of the response, such as the message
+
+    Returns:
+        dict[str, Any]: The response, ready to serialize with `dumps`
+    """
+    venues, venue_ids = factorize(
+        [court_session.venue for court_session in court_sessions]
+    )
+    labels, label_ids = factorize(
+        [court_session.label for court_session in court_sessions]
+    )
+    urls, url_ids = factorize(
+        [
+            court_session.url.replace(
+                _format_date(court_session.start_time), DATE_PLACEHOLDER
+            )
+            for court_session in court_sessions
+        ]
+    )
+
+    return {
+        **fields,
+        "venues": venues,
+        "labels": labels,
+        "urls": urls,
+        "courts": {
+            "venue": venue_ids,
+            "label": label_ids,
+            "url": url_ids,
+            "start_minutes": [
+                (court_session.start_time - EPOCH) // MINUTE
+                for court_session in court_sessions
+            ],
+            "duration_minutes": [
+                (court_session.end_time - court_session.start_time) // MINUTE
+                for court_session in court_sessions
+            ],
+            "cost_cents": [
+                round(court_session.cost * 100)
+                for court_session in court_sessions
+            ],
+        },
+    }
+
+
+def decode(payload: dict[str, Any]) -> list[schemas.CourtSession]:
+    """Turns a compact response back into court sessions"""
+    venues, labels, urls = (
+        payload["venues"],
+        payload["labels"],
+        payload["urls"],
+    )
+    columns = payload["courts"]
+    court_sessions = []
+
+    for venue, label, url, start_minutes, duration_minutes, cost in zip(
+        columns["venue"],
+        columns["label"],
+        columns["url"],
+        columns["start_minutes"],
+        columns["duration_minutes"],
+        columns["cost_cents"],
+    ):
+        start_time = EPOCH + start_minutes * MINUTE
+        court_sessions.append(
+            schemas.CourtSession(
+                venue=venues[venue],
+                label=labels[label],
+                cost=Decimal(cost).scaleb(-2),
+                start_time=start_time,
+                end_time=start_time + duration_minutes * MINUTE,
+                url=urls[url].replace(
+                    DATE_PLACEHOLDER, _format_date(start_time)
+                ),
+            )
+        )
+
+    return court_sessions
+
+
+def _base_media_type(media_type: str) -> str:
+    return media_type.split(";")[0].strip().lower()
+
+
+def dumps(payload: dict[str, Any], media_type: str) -> bytes:
+    serialize, _ = _SERIALIZERS[_base_media_type(media_type)]
+    return serialize(payload)
+
+
+def decode_response(
+    content: bytes, media_type: str
+) -> list[schemas.CourtSession]:
+    """Decodes the body of a compact response from /api/courts
+
+    Args:
+        content (bytes): The response body
+        media_type (str): The response's Content-Type
+
+    Returns:
+        list[schemas.CourtSession]: The courts in the response
+    """
+    _, deserialize = _SERIALIZERS[_base_media_type(media_type)]
+    return decode(deserialize(content))
+
+
+def negotiate(accept: str | None) -> str | None:
+    """Picks the compact media type a client prefers from its Accept header
+
+    Returns:
+        str | None: The media type to respond with, or None when the client
+            prefers the usual JSON response
+    """
+    best, best_quality = None, 0.0
+
+    for media_range in (accept or "").split(","):
+        media_type, *params = media_range.split(";")
+        media_type = _base_media_type(media_type)
+        if media_type not in _SERIALIZERS and media_type not in _PLAIN_JSON:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if quality > best_quality:
+            best = media_type if media_type in _SERIALIZERS else None
+            best_quality = quality
+
+    return best
@@ -1,28 +1,328 @@
-from sqlalchemy import create_engine
+import functools
+import logging
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from courtbooker.settings import app_settings
 
-engine = create_engine(app_settings.POSTGRES_CONNECTION_STRING)
+
+def _pool_options() -> dict:
+    return dict(
+        pool_size=app_settings.DATABASE_POOL_SIZE,
+        max_overflow=app_settings.DATABASE_MAX_OVERFLOW,
+        pool_recycle=app_settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_timeout=app_settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_pre_ping=app_settings.DATABASE_POOL_PRE_PING,
+    )
+
+
+# Engines are created on first use, so importing the models or the app
+# doesn't build connection pools a process may never need
+@functools.cache
+def get_engine() -> Engine:
+    return create_engine(
+        app_settings.POSTGRES_CONNECTION_STRING, **_pool_options()
+    )
+
+
+@functools.cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        app_settings.POSTGRES_ASYNC_CONNECTION_STRING, **_pool_options()
+    )
+
+
+@functools.cache
+def get_session_local() -> sessionmaker[Session]:
+    return sessionmaker(autoflush=False, bind=get_engine())
+
+
+@functools.cache
+def get_async_session_local() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+
+# Read only sessions go to the replica when one is configured
+def has_replica() -> bool:
+    return app_settings.POSTGRES_REPLICA_URL is not None
+
+
+@functools.cache
+def get_replica_engine() -> Engine:
+    return create_engine(app_settings.POSTGRES_REPLICA_URL, **_pool_options())
+
+
+@functools.cache
+def get_async_replica_engine() -> AsyncEngine:
+    return create_async_engine(
+        app_settings.POSTGRES_REPLICA_ASYNC_CONNECTION_STRING,
+        **_pool_options(),
+    )
+
+
+@functools.cache
+def get_replica_session_local() -> sessionmaker[Session]:
+    return sessionmaker(autoflush=False, bind=get_replica_engine())
+
+
+@functools.cache
+def get_async_replica_session_local() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        get_async_replica_engine(), expire_on_commit=False
+    )
+
 
 Base = declarative_base()
 
 
+class PoolMetrics:
+    """Counts connection checkouts and how long sessions waited for one"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def summary(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "mean_wait_seconds": (
+                    self.total_wait_seconds / self.checkouts
+                    if self.checkouts
+                    else 0.0
+                ),
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def _pool_status(engine: Engine | AsyncEngine) -> dict[str, int]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def get_pool_metrics() -> dict:
+    metrics = {
+        "sync": _pool_status(get_engine()),
+        "async": _pool_status(get_async_engine()),
+        **pool_metrics.summary(),
+    }
+
+    if has_replica():
+        metrics["replica_sync"] = _pool_status(get_replica_engine())
+        metrics["replica_async"] = _pool_status(get_async_replica_engine())
+        metrics["replica_lag_seconds"] = replica_monitor.lag_seconds
+        metrics["replica_in_use"] = replica_monitor.is_usable
+
+    return metrics
+
+
+def _is_postgres(bind: Engine | AsyncEngine) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+# Zero when the replica has replayed everything it has received, as the
+# last replay time only advances when the primary writes
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaMonitor:
+    """Tracks whether the replica is close enough to the primary to read from
+
+    The replication lag is measured at most every `check_seconds`. Reads
+    fall back to the primary while the lag exceeds `max_lag_seconds` or the
+    replica can't be reached.
+    """
+
+    def __init__(self, max_lag_seconds: float, check_seconds: float):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+
+        self.lag_seconds: float | None = None
+        self.is_usable = True
+        self._last_checked = float("-inf")
+
+    def _is_check_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_checked < self.check_seconds:
+            return False
+
+        # Claimed before measuring so concurrent sessions don't all check
+        self._last_checked = now
+        return True
+
+    def _update(self, lag_seconds: float | None):
+        self.lag_seconds = lag_seconds
+        is_usable = (
+            lag_seconds is not None and lag_seconds <= self.max_lag_seconds
+        )
+
+        if is_usable != self.is_usable:
+            logging.warning(
+                f"{'Reading from' if is_usable else 'Not reading from'} the "
+                f"replica, replication lag is {lag_seconds} seconds"
+            )
+
+        self.is_usable = is_usable
+
+    def use_replica(self) -> bool:
+        if self._is_check_due():
+            try:
+                with get_replica_engine().connect() as connection:
+                    lag_seconds = _measure_lag(connection)
+            except SQLAlchemyError:
+                logging.exception("Failed to measure the replication lag")
+                lag_seconds = None
+
+            self._update(lag_seconds)
+
+        return self.is_usable
+
+    async def use_replica_async(self) -> bool:
+        if self._is_check_due():
+            try:
+                async with get_async_replica_engine().connect() as connection:
+                    lag_seconds = await connection.run_sync(_measure_lag)
+            except SQLAlchemyError:
+                logging.exception("Failed to measure the replication lag")
+                lag_seconds = None
+
+            self._update(lag_seconds)
+
+        return self.is_usable
+
+
+def _measure_lag(connection: Connection) -> float:
+    if not _is_postgres(connection.engine):
+        return 0.0
+
+    return float(connection.execute(REPLICA_LAG_QUERY).scalar() or 0)
+
+
+replica_monitor = ReplicaMonitor(
+    max_lag_seconds=app_settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    check_seconds=app_settings.DATABASE_REPLICA_LAG_CHECK_SECONDS,
+)
+
+
 class DbSession:
-    def __init__(self, read_only=False):
+    """A session that commits on success and rolls back on error
+
+    Read only sessions are never committed, and Postgres rejects any writes
+    made in them. Closing them leaves loaded objects usable. With
+    `use_replica`, they read from the replica, if there is one and it isn't
+    lagging too far behind. Only the API's reads opt in, as the worker
+    reads back rows it has just written.
+    """
+
+    def __init__(self, read_only=False, use_replica=False):
         self.read_only = read_only
+        self.use_replica = read_only and use_replica
+
+    def __enter__(self) -> Session:
+        if (
+            self.use_replica
+            and has_replica()
+            and replica_monitor.use_replica()
+        ):
+            self.session = get_replica_session_local()()
+        else:
+            self.session = get_session_local()()
+
+        try:
+            started = time.perf_counter()
+            self.session.connection()
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+            if self.read_only and _is_postgres(self.session.get_bind()):
+                self.session.execute(text("SET TRANSACTION READ ONLY"))
+        except BaseException:
+            # __exit__ isn't called when __enter__ raises
+            self.session.close()
+            raise
 
-    def __enter__(self):
-        self.session = scoped_session(
-            sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        )
         return self.session
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if not self.read_only:
-            self.session.commit()
-        self.session.close()
+        try:
+            if exc_type is not None:
+                self.session.rollback()
+            elif not self.read_only:
+                self.session.commit()
+        finally:
+            self.session.close()
+
+
+class AsyncDbSession:
+    """The async counterpart of DbSession"""
+
+    def __init__(self, read_only=False, use_replica=False):
+        self.read_only = read_only
+        self.use_replica = read_only and use_replica
+
+    async def __aenter__(self) -> AsyncSession:
+        if (
+            self.use_replica
+            and has_replica()
+            and await replica_monitor.use_replica_async()
+        ):
+            self.session = get_async_replica_session_local()()
+        else:
+            self.session = get_async_session_local()()
+
+        try:
+            started = time.perf_counter()
+            await self.session.connection()
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+            if self.read_only and _is_postgres(self.session.bind):
+                await self.session.execute(text("SET TRANSACTION READ ONLY"))
+        except BaseException:
+            await self.session.close()
+            raise
+
+        return self.session
 
-        if exc_type:
-            raise exc_type(exc_val)
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is not None:
+                await self.session.rollback()
+            elif not self.read_only:
+                await self.session.commit()
+        finally:
+            await self.session.close()
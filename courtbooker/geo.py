@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_METRES = 6_371_000
+METRES_PER_DEGREE_LATITUDE = 2 * math.pi * EARTH_RADIUS_METRES / 360
+
+
+def haversine_distance_in_metres(
+    latitude: float | np.ndarray,
+    longitude: float | np.ndarray,
+    other_latitude: float | np.ndarray,
+    other_longitude: float | np.ndarray,
+) -> float | np.ndarray:
+    """The great-circle distance between points given in degrees"""
+    latitude, longitude, other_latitude, other_longitude = map(
+        np.radians, (latitude, longitude, other_latitude, other_longitude)
+    )
+
+    a = (
+        np.sin((other_latitude - latitude) / 2) ** 2
+        + np.cos(latitude)
+        * np.cos(other_latitude)
+        * np.sin((other_longitude - longitude) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_METRES * np.arcsin(np.sqrt(a))
+
+
+class VenueIndex:
+    """Finds the venues within a radius of a point without any API calls
+
+    Venues are sorted by latitude, so a query only computes haversine
+    distances for the venues in the band of latitudes the radius covers.
+    """
+
+    def __init__(self, venue_coordinates: dict[str, tuple[float, float]]):
+        venues = sorted(venue_coordinates.items(), key=lambda item: item[1][0])
+
+        self.venues = [venue for venue, _ in venues]
+        self.latitudes = np.array(
+            [latitude for _, (latitude, _) in venues], dtype=np.float64
+        )
+        self.longitudes = np.array(
+            [longitude for _, (_, longitude) in venues], dtype=np.float64
+        )
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+    def __contains__(self, venue: str) -> bool:
+        return venue in self.venues
+
+    def get_venues_within(
+        self, latitude: float, longitude: float, radius_in_metres: float
+    ) -> dict[str, float]:
+        """Gets the distance in metres to each venue within the radius"""
+        latitude_delta = radius_in_metres / METRES_PER_DEGREE_LATITUDE
+        start = np.searchsorted(
+            self.latitudes, latitude - latitude_delta, side="left"
+        )
+        end = np.searchsorted(
+            self.latitudes, latitude + latitude_delta, side="right"
+        )
+
+        distances = haversine_distance_in_metres(
+            latitude,
+            longitude,
+            self.latitudes[start:end],
+            self.longitudes[start:end],
+        )
+
+        return {
+            self.venues[start + i]: float(distance)
+            for i, distance in enumerate(distances)
+            if distance <= radius_in_metres
+        }
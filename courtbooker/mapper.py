@@ -1,6 +1,22 @@
+import functools
+import logging
+
 import googlemaps
+import httpx
+import redis
 
+from courtbooker import models
+from courtbooker.cache import TTLCache
+from courtbooker.database import DbSession
+from courtbooker.geo import VenueIndex
 from courtbooker.settings import app_settings
+from courtbooker.util import get_venue_index, get_venue_index_async
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+DISTANCE_MATRIX_URL = (
+    "https://maps.googleapis.com/maps/api/distancematrix/json"
+)
+GOOGLE_MAPS_TIMEOUT_SECONDS = 10
 
 VENUE_NAME_TO_GOOGLE_MAPS_NAME = {
     "Askegardens": "Joe White Gardens Tennis Court",
@@ -21,23 +37,61 @@ VENUE_NAME_TO_GOOGLE_MAPS_NAME = {
 }
 
 
+# Geocoded addresses and walking distances from rounded origins rarely
+# change, so repeated searches don't need to call Google Maps
+location_cache = TTLCache(
+    name="location",
+    max_size=app_settings.LOCATION_CACHE_MAX_SIZE,
+    ttl_seconds=app_settings.LOCATION_CACHE_TTL_SECONDS,
+    client=(
+        redis.Redis.from_url(app_settings.REDIS_URL)
+        if app_settings.LOCATION_CACHE_REDIS_ENABLED
+        else None
+    ),
+)
+
+
 class InvalidLocationError(Exception):
     pass
 
 
-def get_distance_in_metres_to_venues(
-    origin: str | tuple[float, float],
-) -> dict[str, int]:
-    gmaps = googlemaps.Client(key=app_settings.GOOGLE_MAPS_API_KEY)
+def _get_client() -> googlemaps.Client:
+    return googlemaps.Client(key=app_settings.GOOGLE_MAPS_API_KEY)
 
-    destinations = list(VENUE_NAME_TO_GOOGLE_MAPS_NAME.values())
 
-    matrix = gmaps.distance_matrix(
-        origin,
-        destinations,
-        mode="walking",
+# Shared by every search, so connections to Google Maps are kept alive
+@functools.cache
+def _get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=GOOGLE_MAPS_TIMEOUT_SECONDS)
+
+
+async def close_http_client():
+    if _get_http_client.cache_info().currsize:
+        await _get_http_client().aclose()
+        _get_http_client.cache_clear()
+
+
+async def _get_json_async(url: str, params: dict) -> dict:
+    """Calls a Google Maps web service without blocking the event loop"""
+    response = await _get_http_client().get(
+        url, params={**params, "key": app_settings.GOOGLE_MAPS_API_KEY}
     )
+    response.raise_for_status()
 
+    body = response.json()
+    # Matches googlemaps.Client, which returns empty results for ZERO_RESULTS
+    if body["status"] not in ("OK", "ZERO_RESULTS"):
+        raise googlemaps.exceptions.ApiError(
+            body["status"], body.get("error_message")
+        )
+
+    return body
+
+
+def _parse_distance_matrix(
+    origin: str | tuple[float, float], venues: list[str], matrix: dict
+) -> dict[str, int]:
+    destinations = [VENUE_NAME_TO_GOOGLE_MAPS_NAME[venue] for venue in venues]
     distances = matrix["rows"][0]["elements"]
 
     try:
@@ -49,23 +103,275 @@ def get_distance_in_metres_to_venues(
         raise InvalidLocationError(f"Invalid location: {origin}")
 
     venue_distances = {
-        venue: gmaps_distances_to_destinations[google_maps_name]
-        for venue, google_maps_name in VENUE_NAME_TO_GOOGLE_MAPS_NAME.items()
+        venue: gmaps_distances_to_destinations[
+            VENUE_NAME_TO_GOOGLE_MAPS_NAME[venue]
+        ]
+        for venue in venues
     }
 
     return venue_distances
 
 
-def get_venues_by_location(
-    location: tuple[float, float] | str,
+def get_distance_in_metres_to_venues(
+    origin: str | tuple[float, float],
+    venues: list[str] | None = None,
+) -> dict[str, int]:
+    if venues is None:
+        venues = list(VENUE_NAME_TO_GOOGLE_MAPS_NAME)
+
+    if not venues:
+        return {}
+
+    gmaps = _get_client()
+
+    matrix = gmaps.distance_matrix(
+        origin,
+        [VENUE_NAME_TO_GOOGLE_MAPS_NAME[venue] for venue in venues],
+        mode="walking",
+    )
+
+    return _parse_distance_matrix(origin, venues, matrix)
+
+
+async def get_distance_in_metres_to_venues_async(
+    origin: tuple[float, float],
+    venues: list[str],
+) -> dict[str, int]:
+    if not venues:
+        return {}
+
+    matrix = await _get_json_async(
+        DISTANCE_MATRIX_URL,
+        {
+            "origins": f"{origin[0]},{origin[1]}",
+            "destinations": "|".join(
+                VENUE_NAME_TO_GOOGLE_MAPS_NAME[venue] for venue in venues
+            ),
+            "mode": "walking",
+        },
+    )
+
+    return _parse_distance_matrix(origin, venues, matrix)
+
+
+def _distances_cache_key(
+    origin: tuple[float, float],
+) -> tuple[tuple[float, float], str]:
+    precision = app_settings.LOCATION_CACHE_PRECISION
+    origin = round(origin[0], precision), round(origin[1], precision)
+    return origin, f"distances:{origin[0]}:{origin[1]}"
+
+
+def get_cached_distance_in_metres_to_venues(
+    origin: tuple[float, float],
+    venues: list[str],
+) -> dict[str, int]:
+    """Gets walking distances from the origin, rounded to a cell, only
+    requesting the venues that aren't cached for that cell yet
+
+    Distances to other venues already cached for the cell are included.
+    """
+    origin, key = _distances_cache_key(origin)
+
+    distances = location_cache.get(key) or {}
+    missing_venues = [venue for venue in venues if venue not in distances]
+
+    if missing_venues:
+        distances = {
+            **distances,
+            **get_distance_in_metres_to_venues(origin, missing_venues),
+        }
+        location_cache.set(key, distances)
+
+    return distances
+
+
+async def get_cached_distance_in_metres_to_venues_async(
+    origin: tuple[float, float],
+    venues: list[str],
+) -> dict[str, int]:
+    origin, key = _distances_cache_key(origin)
+
+    distances = await location_cache.get_async(key) or {}
+    missing_venues = [venue for venue in venues if venue not in distances]
+
+    if missing_venues:
+        distances = {
+            **distances,
+            **await get_distance_in_metres_to_venues_async(
+                origin, missing_venues
+            ),
+        }
+        await location_cache.set_async(key, distances)
+
+    return distances
+
+
+def _geocode_cache_key(address: str) -> str:
+    return f"geocode:{''.join(address.upper().split())}"
+
+
+def _parse_geocode_results(
+    address: str, results: list[dict]
+) -> tuple[float, float]:
+    if not results:
+        raise InvalidLocationError(f"Invalid location: {address}")
+
+    location = results[0]["geometry"]["location"]
+
+    return location["lat"], location["lng"]
+
+
+def geocode(address: str) -> tuple[float, float]:
+    """Gets the latitude and longitude of an address or place name"""
+    key = _geocode_cache_key(address)
+
+    coordinates = location_cache.get(key)
+    if coordinates is None:
+        results = _get_client().geocode(address, region="uk")
+        coordinates = _parse_geocode_results(address, results)
+        location_cache.set(key, coordinates)
+
+    latitude, longitude = coordinates
+    return latitude, longitude
+
+
+async def geocode_async(address: str) -> tuple[float, float]:
+    key = _geocode_cache_key(address)
+
+    coordinates = await location_cache.get_async(key)
+    if coordinates is None:
+        body = await _get_json_async(
+            GEOCODE_URL, {"address": address, "region": "uk"}
+        )
+        coordinates = _parse_geocode_results(address, body["results"])
+        await location_cache.set_async(key, coordinates)
+
+    latitude, longitude = coordinates
+    return latitude, longitude
+
+
+def geocode_missing_venues():
+    """Stores the coordinates of venues that have not been geocoded yet
+
+    The geocoding API is called outside of any transaction, so a slow or
+    rate limited API doesn't hold a database connection.
+    """
+    with DbSession(read_only=True) as db_session:
+        venues = (
+            db_session.query(models.Venue.id, models.Venue.name)
+            .filter(models.Venue.latitude.is_(None))
+            .all()
+        )
+
+    coordinates = {}
+    for venue_id, venue_name in venues:
+        address = VENUE_NAME_TO_GOOGLE_MAPS_NAME.get(venue_name)
+        if address is None:
+            continue
+
+        try:
+            coordinates[venue_id] = geocode(address)
+        except (
+            InvalidLocationError,
+            googlemaps.exceptions.ApiError,
+            googlemaps.exceptions.TransportError,
+            googlemaps.exceptions.Timeout,
+        ):
+            logging.exception(f"Failed to geocode {venue_name}")
+            continue
+
+        logging.info(f"Geocoded {venue_name}")
+
+    if not coordinates:
+        return
+
+    with DbSession() as db_session:
+        for venue_id, (latitude, longitude) in coordinates.items():
+            db_session.query(models.Venue).filter(
+                models.Venue.id == venue_id
+            ).update(
+                {
+                    models.Venue.latitude: latitude,
+                    models.Venue.longitude: longitude,
+                }
+            )
+
+
+def _get_candidate_venues(
+    venue_index: VenueIndex,
+    latitude: float,
+    longitude: float,
     radius_in_metres: float,
-) -> dict[str, float]:
-    distance_map = get_distance_in_metres_to_venues(location)
+) -> tuple[dict[str, float], list[str]]:
+    """Gets the straight-line distances to venues within the radius and the
+    venues whose walking distance could be within it"""
+    # Walking distances are never shorter than the straight line, so only
+    # venues within the radius, or without coordinates, can be in range
+    distances = venue_index.get_venues_within(
+        latitude, longitude, radius_in_metres
+    )
 
-    venues = {
+    candidate_venues = [
+        venue
+        for venue in VENUE_NAME_TO_GOOGLE_MAPS_NAME
+        if venue in distances or venue not in venue_index
+    ]
+
+    return distances, candidate_venues
+
+
+def _filter_by_radius(
+    distance_map: dict[str, int], radius_in_metres: float
+) -> dict[str, int]:
+    return {
         venue: distance
         for venue, distance in distance_map.items()
         if distance <= radius_in_metres
     }
 
-    return venues
+
+def get_venues_by_location(
+    location: tuple[float, float] | str,
+    radius_in_metres: float,
+) -> dict[str, float]:
+    if isinstance(location, str):
+        latitude, longitude = geocode(location)
+    else:
+        latitude, longitude = location
+
+    distances, candidate_venues = _get_candidate_venues(
+        get_venue_index(), latitude, longitude, radius_in_metres
+    )
+
+    if not app_settings.WALKING_DISTANCES_ENABLED:
+        return distances
+
+    distance_map = get_cached_distance_in_metres_to_venues(
+        (latitude, longitude), candidate_venues
+    )
+
+    return _filter_by_radius(distance_map, radius_in_metres)
+
+
+async def get_venues_by_location_async(
+    location: tuple[float, float] | str,
+    radius_in_metres: float,
+) -> dict[str, float]:
+    if isinstance(location, str):
+        latitude, longitude = await geocode_async(location)
+    else:
+        latitude, longitude = location
+
+    distances, candidate_venues = _get_candidate_venues(
+        await get_venue_index_async(), latitude, longitude, radius_in_metres
+    )
+
+    if not app_settings.WALKING_DISTANCES_ENABLED:
+        return distances
+
+    distance_map = await get_cached_distance_in_metres_to_venues_async(
+        (latitude, longitude), candidate_venues
+    )
+
+    return _filter_by_radius(distance_map, radius_in_metres)
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from courtbooker import models
+from courtbooker.database import Base, get_engine
+from courtbooker.persistence import refresh_latest_sessions
+
+# `create_all` only creates missing tables, so columns and indexes added to
+# existing tables are added here. Every statement must be safe to re-run.
+MIGRATIONS = [
+    "ALTER TABLE court_session ADD COLUMN IF NOT EXISTS time_closed TIMESTAMP WITHOUT TIME ZONE",
+    "ALTER TABLE scrape_task ADD COLUMN IF NOT EXISTS incremental BOOLEAN NOT NULL DEFAULT false",
+    "CREATE INDEX IF NOT EXISTS ix_court_session_task_id_start_time ON court_session (task_id, start_time)",
+    "CREATE INDEX IF NOT EXISTS ix_court_session_venue_id_start_time ON court_session (venue_id, start_time)",
+    "CREATE INDEX IF NOT EXISTS ix_scrape_task_data_source_time_started ON scrape_task (data_source, time_started)",
+    "ALTER TABLE venue ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION",
+    "ALTER TABLE venue ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION",
+    "CREATE INDEX IF NOT EXISTS ix_latest_court_session_page ON latest_court_session (start_time, venue_name, COALESCE(label, ''), id)",
+]
+
+
+def _backfill_latest_sessions(engine: Engine):
+    with Session(engine) as db_session, db_session.begin():
+        if db_session.query(models.LatestCourtSession.id).first() is not None:
+            return
+
+        for data_source in models.DataSource:
+            refresh_latest_sessions(db_session, data_source)
+
+
+def upgrade_schema(engine: Engine):
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            connection.execute(text(migration))
+
+    _backfill_latest_sessions(engine)
+
+
+if __name__ == "__main__":
+    upgrade_schema(get_engine())
@@ -5,11 +5,18 @@ from typing import Optional
 
 from sqlalchemy import (
     JSON,
+    Boolean,
+    Date,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
+    Index,
+    Integer,
     String,
     UniqueConstraint,
+    false,
+    func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -33,6 +40,9 @@ class Venue(Base):
         back_populates="venue"
     )
     name: Mapped[str] = mapped_column(String)
+    # Looked up once from Google Maps, for finding venues near a location
+    latitude: Mapped[Optional[float]] = mapped_column(Float)
+    longitude: Mapped[Optional[float]] = mapped_column(Float)
 
     __table_args__ = (
         UniqueConstraint("path", "data_source", name="path_source"),
@@ -70,6 +80,8 @@ class CourtSession(Base):
     start_time: Mapped[datetime.datetime] = mapped_column(DateTime)
     end_time: Mapped[datetime.datetime] = mapped_column(DateTime)
     url: Mapped[str] = mapped_column(String)
+    # Set by incremental scrapes once the session is no longer available
+    time_closed: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
 
     venue_id: Mapped[int] = mapped_column(ForeignKey("venue.id"))
     venue: Mapped["Venue"] = relationship(back_populates="court_sessions")
@@ -77,6 +89,13 @@ class CourtSession(Base):
     task_id: Mapped[int] = mapped_column(ForeignKey("scrape_task.id"))
     task: Mapped["ScrapeTask"] = relationship(back_populates="court_sessions")
 
+    __table_args__ = (
+        Index("ix_court_session_task_id_start_time", "task_id", "start_time"),
+        Index(
+            "ix_court_session_venue_id_start_time", "venue_id", "start_time"
+        ),
+    )
+
     def __str__(self) -> str:
         return f"{self.venue.name} {self.label} at {self.start_time:%H:%M} on {self.start_time:%A %d %B} (£{self.cost:.2f})"
 
@@ -95,6 +114,107 @@ class ScrapeTask(Base):
     time_finished: Mapped[datetime.datetime] = mapped_column(DateTime)
     data_source: Mapped[DataSource] = mapped_column(Enum(DataSource))
     params: Mapped[dict] = mapped_column(JSON)
+    incremental: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false()
+    )
     court_sessions: Mapped[list["CourtSession"]] = relationship(
         back_populates="task"
     )
+
+    __table_args__ = (
+        Index(
+            "ix_scrape_task_data_source_time_started",
+            "data_source",
+            "time_started",
+        ),
+    )
+
+
+class LatestCourtSession(Base):
+    """The current court sessions for every data source
+
+    A denormalized copy of the latest snapshot, rebuilt for a data source
+    at the end of each of its scrapes so reads never scan the history.
+    """
+
+    __tablename__ = "latest_court_session"
+
+    id: Mapped[int] = mapped_column(
+        ForeignKey("court_session.id"), primary_key=True
+    )
+    data_source: Mapped[DataSource] = mapped_column(Enum(DataSource))
+    venue_name: Mapped[str] = mapped_column(String)
+    label: Mapped[Optional[str]] = mapped_column(String)
+    cost: Mapped[Decimal] = mapped_column(String)
+    start_time: Mapped[datetime.datetime] = mapped_column(DateTime)
+    end_time: Mapped[datetime.datetime] = mapped_column(DateTime)
+    url: Mapped[str] = mapped_column(String)
+
+    __table_args__ = (
+        Index("ix_latest_court_session_start_time", "start_time"),
+        Index(
+            "ix_latest_court_session_venue_name_start_time",
+            "venue_name",
+            "start_time",
+        ),
+        # The keyset courts are paged by
+        Index(
+            "ix_latest_court_session_page",
+            "start_time",
+            "venue_name",
+            func.coalesce(label, ""),
+            "id",
+        ),
+    )
+
+
+class ScrapeSlice(Base):
+    """When a venue's sessions on a date were last scraped and queued
+
+    Used by the freshness scheduler to decide which venues and dates to
+    scrape next.
+    """
+
+    __tablename__ = "scrape_slice"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    data_source: Mapped[DataSource] = mapped_column(Enum(DataSource))
+    venue_path: Mapped[str] = mapped_column(String)
+    date: Mapped[datetime.date] = mapped_column(Date)
+    time_scraped: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    time_queued: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "data_source", "venue_path", "date", name="source_path_date"
+        ),
+    )
+
+
+class ChurnStat(Base):
+    """How often a venue's availability changes on a weekday and hour
+
+    Changes and hours observed are both decayed on every update, so their
+    ratio tracks the recent number of changes per hour.
+    """
+
+    __tablename__ = "churn_stat"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    data_source: Mapped[DataSource] = mapped_column(Enum(DataSource))
+    venue_path: Mapped[str] = mapped_column(String)
+    weekday: Mapped[int] = mapped_column(Integer)
+    hour_bucket: Mapped[int] = mapped_column(Integer)
+    changes: Mapped[float] = mapped_column(Float, default=0.0)
+    hours: Mapped[float] = mapped_column(Float, default=0.0)
+    observations: Mapped[int] = mapped_column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "data_source",
+            "venue_path",
+            "weekday",
+            "hour_bucket",
+            name="source_path_weekday_hour",
+        ),
+    )
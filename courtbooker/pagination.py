@@ -0,0 +1,84 @@
+import base64
+import bisect
+from datetime import datetime
+from typing import NamedTuple
+
+import orjson
+
+from courtbooker import schemas
+
+# Court sessions are paged in (start time, venue, label, id) order. Blocks
+# merged from several sessions have no id, but they can't share a start
+# time at the same court, so they use 0.
+PageKey = tuple[datetime, str, str, int]
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class CourtSessionsPage(NamedTuple):
+    court_sessions: list[schemas.CourtSession]
+    next_cursor: str | None
+    # Only counted for the first page, and capped so counting stays cheap
+    total: int | None = None
+    total_is_exact: bool | None = None
+
+
+def encode_cursor(key: PageKey) -> str:
+    start_time, venue, label, id = key
+    return base64.urlsafe_b64encode(
+        orjson.dumps([start_time.isoformat(), venue, label, id])
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    try:
+        start_time, venue, label, id = orjson.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        return datetime.fromisoformat(start_time), venue, label, int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor {cursor!r}") from e
+
+
+def _page_key(court_session: schemas.CourtSession) -> PageKey:
+    return (
+        court_session.start_time,
+        court_session.venue,
+        court_session.label or "",
+        0,
+    )
+
+
+def paginate(
+    court_sessions: list[schemas.CourtSession],
+    limit: int,
+    after: PageKey | None = None,
+) -> CourtSessionsPage:
+    """Pages through court sessions that are already in memory
+
+    Args:
+        court_sessions (list[schemas.CourtSession]): Every matching session
+        limit (int): The most sessions to return
+        after (PageKey | None): The key of the last session on the previous
+            page
+
+    Returns:
+        CourtSessionsPage: The sessions after `after`, with an exact total
+            on the first page
+    """
+    court_sessions = sorted(court_sessions, key=_page_key)
+    keys = [_page_key(court_session) for court_session in court_sessions]
+
+    start = 0 if after is None else bisect.bisect_right(keys, after)
+    page = court_sessions[start : start + limit]
+
+    next_cursor = None
+    if start + limit < len(court_sessions):
+        next_cursor = encode_cursor(keys[start + limit - 1])
+
+    if after is not None:
+        return CourtSessionsPage(page, next_cursor)
+
+    return CourtSessionsPage(page, next_cursor, len(court_sessions), True)
@@ -0,0 +1,482 @@
+import datetime
+import itertools
+import logging
+import time
+import zlib
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import ColumnElement, and_, delete, func, insert, select
+from sqlalchemy.orm import Session, contains_eager
+
+from courtbooker import churn, models
+from courtbooker.database import DbSession
+from courtbooker.settings import app_settings
+
+SessionKey = tuple[str, str | None, datetime.datetime]
+SliceKey = tuple[str, datetime.date]
+
+BULK_INSERT_BATCH_SIZE = 1000
+
+
+class SessionDiff(NamedTuple):
+    new: list[models.CourtSession]
+    changed: list[tuple[models.CourtSession, models.CourtSession]]
+    unchanged: list[tuple[models.CourtSession, models.CourtSession]]
+    vanished: list[models.CourtSession]
+
+
+def session_key(court_session: models.CourtSession) -> SessionKey:
+    return (
+        court_session.venue.path,
+        court_session.label,
+        court_session.start_time,
+    )
+
+
+def slice_key(court_session: models.CourtSession) -> SliceKey:
+    return (court_session.venue.path, court_session.start_time.date())
+
+
+def _has_changed(
+    previous: models.CourtSession, scraped: models.CourtSession
+) -> bool:
+    # Costs are stored as strings, so compare them as decimals
+    return (
+        Decimal(str(previous.cost)) != Decimal(str(scraped.cost))
+        or previous.end_time != scraped.end_time
+    )
+
+
+def diff_court_sessions(
+    previous: list[models.CourtSession],
+    scraped: list[models.CourtSession],
+) -> SessionDiff:
+    """Diffs freshly scraped sessions against the previous snapshot
+
+    Sessions are matched on venue, label and start time.
+
+    Args:
+        previous (list[models.CourtSession]): The currently open sessions
+        scraped (list[models.CourtSession]): The sessions just scraped
+
+    Returns:
+        SessionDiff: The scraped sessions that are new, the (previous,
+            scraped) pairs that have changed or not, and the previous
+            sessions that are no longer available
+    """
+    previous_by_key = {
+        session_key(court_session): court_session for court_session in previous
+    }
+
+    diff = SessionDiff(new=[], changed=[], unchanged=[], vanished=[])
+    seen_keys = set()
+
+    for court_session in scraped:
+        key = session_key(court_session)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        previous_session = previous_by_key.get(key)
+        if previous_session is None:
+            diff.new.append(court_session)
+        elif _has_changed(previous_session, court_session):
+            diff.changed.append((previous_session, court_session))
+        else:
+            diff.unchanged.append((previous_session, court_session))
+
+    diff.vanished.extend(
+        court_session
+        for key, court_session in previous_by_key.items()
+        if key not in seen_keys
+    )
+
+    return diff
+
+
+def _get_latest_task(
+    db_session: Session, data_source: models.DataSource
+) -> models.ScrapeTask | None:
+    return (
+        db_session.query(models.ScrapeTask)
+        .filter(models.ScrapeTask.data_source == data_source)
+        .order_by(models.ScrapeTask.time_started.desc())
+        .first()
+    )
+
+
+def _current_sessions_filter(
+    data_source: models.DataSource,
+    latest_task: models.ScrapeTask,
+) -> ColumnElement[bool]:
+    # Incremental tasks only hold the sessions they added, so their current
+    # sessions are all the open ones for the data source
+    if latest_task.incremental:
+        return and_(
+            models.Venue.data_source == data_source,
+            models.CourtSession.time_closed.is_(None),
+        )
+
+    return models.CourtSession.task_id == latest_task.id
+
+
+def _get_current_sessions(
+    db_session: Session,
+    data_source: models.DataSource,
+    latest_task: models.ScrapeTask | None,
+) -> list[models.CourtSession]:
+    if latest_task is None:
+        return []
+
+    return (
+        db_session.query(models.CourtSession)
+        .join(models.CourtSession.venue)
+        .options(contains_eager(models.CourtSession.venue))
+        .filter(_current_sessions_filter(data_source, latest_task))
+        .all()
+    )
+
+
+def refresh_latest_sessions(
+    db_session: Session, data_source: models.DataSource
+) -> int:
+    """Rebuilds the latest court sessions for a data source
+
+    Args:
+        db_session (Session): The session to refresh in, which must have
+            flushed the data source's latest task and sessions
+        data_source (models.DataSource): The data source to refresh
+
+    Returns:
+        int: The number of current sessions
+    """
+    start = time.perf_counter()
+
+    db_session.execute(
+        delete(models.LatestCourtSession).where(
+            models.LatestCourtSession.data_source == data_source
+        )
+    )
+
+    latest_task = _get_latest_task(db_session, data_source)
+    if latest_task is None:
+        return 0
+
+    current_sessions = (
+        select(
+            models.CourtSession.id,
+            models.Venue.data_source,
+            models.Venue.name,
+            models.CourtSession.label,
+            models.CourtSession.cost,
+            models.CourtSession.start_time,
+            models.CourtSession.end_time,
+            models.CourtSession.url,
+        )
+        .join(models.CourtSession.venue)
+        .where(_current_sessions_filter(data_source, latest_task))
+    )
+    result = db_session.execute(
+        insert(models.LatestCourtSession).from_select(
+            [
+                "id",
+                "data_source",
+                "venue_name",
+                "label",
+                "cost",
+                "start_time",
+                "end_time",
+                "url",
+            ],
+            current_sessions,
+        )
+    )
+
+    logging.info(
+        f"Refreshed {result.rowcount} latest {data_source} sessions in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+    return result.rowcount
+
+
+def lock_data_source(db_session: Session, data_source: models.DataSource):
+    """Waits for any other save of the data source to commit
+
+    Overlapping saves would otherwise diff against the same sessions and
+    rebuild the latest sessions at the same time. On PostgreSQL this takes
+    a transaction-level advisory lock; SQLite only allows one writer anyway.
+    """
+    if db_session.get_bind().dialect.name != "postgresql":
+        return
+
+    lock_id = zlib.crc32(f"courtbooker:save:{data_source.value}".encode())
+    db_session.execute(select(func.pg_advisory_xact_lock(lock_id)))
+
+
+def _detach_from_venues(
+    courts: list[models.CourtSession],
+) -> list[tuple[models.Venue, models.CourtSession]]:
+    """Unlinks scraped sessions from their venues
+
+    Otherwise adding a venue to a session cascades all of its scraped
+    sessions into it as individual ORM inserts.
+    """
+    venue_courts = [(court.venue, court) for court in courts]
+    for court in courts:
+        court.venue = None
+
+    return venue_courts
+
+
+def _add_new_venues(db_session: Session, venues: list[models.Venue]):
+    db_session.add_all(venue for venue in venues if venue.id is None)
+
+
+def bulk_insert_court_sessions(
+    db_session: Session,
+    venue_courts: list[tuple[models.Venue, models.CourtSession]],
+    task_id: int,
+) -> int:
+    """Inserts court sessions with batched multi-row INSERTs
+
+    Bypasses the ORM unit of work, so the venues must already be flushed.
+
+    Args:
+        db_session (Session): The session to insert with
+        venue_courts (list[tuple[models.Venue, models.CourtSession]]): The
+            sessions to insert, with the venue each belongs to
+        task_id (int): The task to link the sessions to
+
+    Returns:
+        int: The number of rows inserted
+    """
+    rows = [
+        {
+            "venue_id": venue.id,
+            "task_id": task_id,
+            "label": court.label,
+            "cost": str(court.cost),
+            "start_time": court.start_time,
+            "end_time": court.end_time,
+            "url": court.url,
+        }
+        for venue, court in venue_courts
+    ]
+
+    start = time.perf_counter()
+    statement = insert(models.CourtSession.__table__)
+    for i in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+        db_session.execute(statement, rows[i : i + BULK_INSERT_BATCH_SIZE])
+    elapsed = time.perf_counter() - start
+
+    logging.info(
+        f"Inserted {len(rows)} court sessions in {elapsed:.2f}s "
+        f"({len(rows) / max(elapsed, 1e-6):.0f} rows/s)"
+    )
+
+    return len(rows)
+
+
+def _record_churn(
+    db_session: Session,
+    data_source: models.DataSource,
+    diff: SessionDiff,
+    previous: list[models.CourtSession],
+    scraped: list[models.CourtSession],
+    start_time: datetime.datetime,
+    slices: set[SliceKey] | None = None,
+):
+    if slices is None:
+        # Dates without any sessions before or after can't have changed
+        slices = {
+            slice_key(court_session)
+            for court_session in itertools.chain(previous, scraped)
+        }
+
+    churn.record_churn(
+        db_session,
+        data_source,
+        itertools.chain(
+            diff.new,
+            (scraped_session for _, scraped_session in diff.changed),
+            diff.vanished,
+        ),
+        slices,
+        start_time,
+    )
+
+
+def _close_past_sessions(
+    db_session: Session,
+    data_source: models.DataSource,
+    before: datetime.date,
+    time_closed: datetime.datetime,
+):
+    venue_ids = select(models.Venue.id).where(
+        models.Venue.data_source == data_source
+    )
+    closed = (
+        db_session.query(models.CourtSession)
+        .filter(
+            models.CourtSession.venue_id.in_(venue_ids),
+            models.CourtSession.start_time
+            < datetime.datetime.combine(before, datetime.time()),
+            models.CourtSession.time_closed.is_(None),
+        )
+        .update(
+            {models.CourtSession.time_closed: time_closed},
+            synchronize_session=False,
+        )
+    )
+
+    if closed:
+        logging.info(f"Closed {closed} past {data_source} sessions")
+
+
+def save_snapshot(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    courts: list[models.CourtSession],
+    start_time: datetime.datetime,
+) -> int:
+    """Saves every scraped session as a new snapshot linked to a new task"""
+    end_time = datetime.datetime.now()
+
+    with DbSession() as db_session:
+        lock_data_source(db_session, data_source)
+
+        if app_settings.CHURN_ADAPTIVE_ENABLED:
+            latest_task = _get_latest_task(db_session, data_source)
+            previous = _get_current_sessions(
+                db_session, data_source, latest_task
+            )
+            _record_churn(
+                db_session,
+                data_source,
+                diff_court_sessions(previous, courts),
+                previous,
+                courts,
+                start_time,
+            )
+
+        venue_courts = _detach_from_venues(courts)
+        task = models.ScrapeTask(
+            time_started=start_time,
+            time_finished=end_time,
+            data_source=data_source,
+            params=app_settings.model_dump(),
+        )
+
+        _add_new_venues(db_session, venues)
+        db_session.add(task)
+        db_session.flush()
+
+        bulk_insert_court_sessions(db_session, venue_courts, task.id)
+        refresh_latest_sessions(db_session, data_source)
+        task_id = task.id
+
+    return task_id
+
+
+def save_incremental(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    courts: list[models.CourtSession],
+    start_time: datetime.datetime,
+    slices: set[SliceKey] | None = None,
+) -> int:
+    """Applies the scraped sessions to the current snapshot
+
+    Only new sessions are inserted (linked to the new task), sessions that
+    are no longer available are marked as closed and sessions whose cost
+    changed are updated in place.
+
+    When `slices` is given, only those (venue path, date) pairs were
+    scraped, so sessions on any other venue or date are left untouched.
+    Sessions on dates before the scrape are closed either way, as slices
+    are never scraped once their date has passed.
+    """
+    with DbSession() as db_session:
+        lock_data_source(db_session, data_source)
+
+        latest_task = _get_latest_task(db_session, data_source)
+        previous = _get_current_sessions(db_session, data_source, latest_task)
+        if slices is not None:
+            previous = [
+                court_session
+                for court_session in previous
+                if slice_key(court_session) in slices
+            ]
+
+        diff = diff_court_sessions(previous, courts)
+        logging.info(
+            f"{data_source} diff: {len(diff.new)} new, "
+            f"{len(diff.changed)} changed, {len(diff.unchanged)} unchanged, "
+            f"{len(diff.vanished)} closed"
+        )
+
+        if app_settings.CHURN_ADAPTIVE_ENABLED:
+            _record_churn(
+                db_session,
+                data_source,
+                diff,
+                previous,
+                courts,
+                start_time,
+                slices,
+            )
+
+        end_time = datetime.datetime.now()
+
+        for previous_session, scraped_session in diff.changed:
+            previous_session.cost = scraped_session.cost
+            previous_session.end_time = scraped_session.end_time
+
+        for court_session in diff.vanished:
+            court_session.time_closed = end_time
+
+        _close_past_sessions(
+            db_session, data_source, start_time.date(), end_time
+        )
+
+        if latest_task is not None and not latest_task.incremental:
+            # Sessions from snapshots older than the previous one were
+            # never closed, so close them now they've been superseded
+            venue_ids = select(models.Venue.id).where(
+                models.Venue.data_source == data_source
+            )
+            db_session.query(models.CourtSession).filter(
+                models.CourtSession.venue_id.in_(venue_ids),
+                models.CourtSession.task_id != latest_task.id,
+                models.CourtSession.time_closed.is_(None),
+            ).update(
+                {models.CourtSession.time_closed: end_time},
+                synchronize_session=False,
+            )
+
+        new_court_ids = {id(court) for court in diff.new}
+        new_venue_courts = [
+            (venue, court)
+            for venue, court in _detach_from_venues(courts)
+            if id(court) in new_court_ids
+        ]
+
+        task = models.ScrapeTask(
+            time_started=start_time,
+            time_finished=end_time,
+            data_source=data_source,
+            params=app_settings.model_dump(),
+            incremental=True,
+        )
+
+        _add_new_venues(db_session, venues)
+        db_session.add(task)
+        db_session.flush()
+
+        bulk_insert_court_sessions(db_session, new_venue_courts, task.id)
+        refresh_latest_sessions(db_session, data_source)
+        task_id = task.id
+
+    return task_id
@@ -0,0 +1,196 @@
+from datetime import datetime
+
+import redis
+
+from courtbooker.settings import app_settings
+
+# The lock is only extended or released by the refresh holding it
+_EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RefreshRegistry:
+    """Tracks the running refresh in Redis
+
+    A lock with a TTL holds the id of the running refresh, so checking for
+    one is a single GET rather than a broadcast to every worker. A hash per
+    refresh holds each data source's state and how many of its planned pages
+    have been scraped. The lock is released once every data source has
+    finished, or expires if a worker dies part way through. Updates from an
+    earlier refresh, such as a retried shard, only touch that refresh's hash
+    and never extend or release a newer refresh's lock. The time of the
+    last refresh is kept, so the refresh cooldown isn't reset by scheduled
+    scrapes.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        lock_ttl_seconds: int,
+        key_prefix: str = "courtbooker:refresh",
+    ):
+        self.client = client
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.lock_key = f"{key_prefix}:lock"
+        self.status_key_prefix = f"{key_prefix}:status"
+        self.latest_key = f"{key_prefix}:latest"
+        self.last_refresh_key = f"{key_prefix}:last_refresh"
+
+    def _status_key(self, refresh_id: str) -> str:
+        return f"{self.status_key_prefix}:{refresh_id}"
+
+    def get_running_task_id(self) -> str | None:
+        task_id = self.client.get(self.lock_key)
+        return task_id.decode() if task_id is not None else None
+
+    def get_latest_task_id(self) -> str | None:
+        """Gets the id of the last refresh claimed, even once it's finished"""
+        task_id = self.client.get(self.latest_key)
+        return task_id.decode() if task_id is not None else None
+
+    def claim(self, task_id: str) -> str:
+        """Takes the lock for a refresh, unless another holds it
+
+        Returns:
+            str: The id of the refresh holding the lock, which is `task_id`
+                if it was claimed
+        """
+        if self.client.set(
+            self.lock_key, task_id, nx=True, ex=self.lock_ttl_seconds
+        ):
+            with self.client.pipeline() as pipeline:
+                pipeline.set(self.latest_key, task_id)
+                pipeline.set(self.last_refresh_key, datetime.now().isoformat())
+                pipeline.execute()
+            return task_id
+
+        # The lock may have expired since, in which case it is free again
+        return self.get_running_task_id() or self.claim(task_id)
+
+    def get_last_refresh_time(self) -> datetime | None:
+        """Gets when the last refresh was claimed, if there has been one"""
+        last_refresh_time = self.client.get(self.last_refresh_key)
+        if last_refresh_time is None:
+            return None
+
+        return datetime.fromisoformat(last_refresh_time.decode())
+
+    def _release(self, refresh_id: str):
+        self.client.eval(_RELEASE_LOCK_SCRIPT, 1, self.lock_key, refresh_id)
+
+    def start(self, refresh_id: str, data_sources: list[str]):
+        """Records the data sources the refresh will scrape"""
+        status_key = self._status_key(refresh_id)
+        with self.client.pipeline() as pipeline:
+            pipeline.hset(
+                status_key,
+                mapping={
+                    "pending": len(data_sources),
+                    **{
+                        f"{data_source}:state": "queued"
+                        for data_source in data_sources
+                    },
+                },
+            )
+            pipeline.expire(status_key, self.lock_ttl_seconds)
+            pipeline.execute()
+
+        if not data_sources:
+            self._release(refresh_id)
+
+    def start_source(
+        self, refresh_id: str, data_source: str, pages_planned: int
+    ):
+        with self.client.pipeline() as pipeline:
+            pipeline.hset(
+                self._status_key(refresh_id),
+                mapping={
+                    f"{data_source}:state": "running",
+                    f"{data_source}:pages_planned": pages_planned,
+                    f"{data_source}:pages_done": 0,
+                },
+            )
+            pipeline.eval(
+                _EXTEND_LOCK_SCRIPT,
+                1,
+                self.lock_key,
+                refresh_id,
+                self.lock_ttl_seconds,
+            )
+            pipeline.execute()
+
+    def add_pages_done(self, refresh_id: str, data_source: str, pages: int):
+        status_key = self._status_key(refresh_id)
+        with self.client.pipeline() as pipeline:
+            pipeline.hincrby(status_key, f"{data_source}:pages_done", pages)
+            pipeline.expire(status_key, self.lock_ttl_seconds)
+            pipeline.eval(
+                _EXTEND_LOCK_SCRIPT,
+                1,
+                self.lock_key,
+                refresh_id,
+                self.lock_ttl_seconds,
+            )
+            pipeline.execute()
+
+    def finish_source(
+        self, refresh_id: str, data_source: str, failed: bool = False
+    ):
+        """Records a data source as done, releasing the lock after the last"""
+        status_key = self._status_key(refresh_id)
+        with self.client.pipeline() as pipeline:
+            pipeline.hset(
+                status_key,
+                f"{data_source}:state",
+                "failed" if failed else "done",
+            )
+            pipeline.hincrby(status_key, "pending", -1)
+            pipeline.expire(status_key, self.lock_ttl_seconds)
+            _, pending, _ = pipeline.execute()
+
+        if pending <= 0:
+            self._release(refresh_id)
+
+    def get_progress(
+        self, refresh_id: str | None = None
+    ) -> dict[str, dict[str, str | int]]:
+        """Gets each data source's state and pages done out of planned
+
+        Args:
+            refresh_id (str | None): The refresh to get the progress of,
+                which defaults to the latest one
+        """
+        refresh_id = refresh_id or self.get_latest_task_id()
+        if refresh_id is None:
+            return {}
+
+        progress = {}
+        for field, value in self.client.hgetall(
+            self._status_key(refresh_id)
+        ).items():
+            field, value = field.decode(), value.decode()
+            if ":" not in field:
+                continue
+
+            data_source, name = field.split(":", 1)
+            progress.setdefault(data_source, {})[name] = (
+                value if name == "state" else int(value)
+            )
+
+        return progress
+
+
+refresh_registry = RefreshRegistry(
+    redis.Redis.from_url(app_settings.REDIS_URL),
+    lock_ttl_seconds=app_settings.REFRESH_LOCK_TTL_SECONDS,
+)
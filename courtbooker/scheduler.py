@@ -0,0 +1,227 @@
+import datetime
+import math
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import delete
+
+from courtbooker import churn, models
+from courtbooker.database import DbSession
+from courtbooker.settings import app_settings
+
+
+class Slice(NamedTuple):
+    """A venue's sessions on a single date, the unit the scheduler scrapes"""
+
+    data_source: models.DataSource
+    venue_path: str
+    date: datetime.date
+
+
+class SliceState(NamedTuple):
+    time_scraped: datetime.datetime | None
+    time_queued: datetime.datetime | None
+
+
+def get_target_staleness(
+    days_ahead: int, churn_factor: float = 1.0
+) -> datetime.timedelta:
+    """How out of date a slice may get before it is scraped again
+
+    Grows geometrically with how far ahead the date is, as availability
+    for the next few days changes much more quickly than a week out, and
+    is then scaled by how often the venue changes on that weekday.
+    """
+    minutes = min(
+        app_settings.FRESHNESS_MIN_STALENESS_MINUTES
+        * app_settings.FRESHNESS_STALENESS_GROWTH ** max(days_ahead, 0),
+        app_settings.FRESHNESS_MAX_STALENESS_MINUTES,
+    )
+    return datetime.timedelta(
+        minutes=max(
+            minutes * churn_factor,
+            app_settings.FRESHNESS_MIN_STALENESS_MINUTES,
+        )
+    )
+
+
+def _get_churn_factor(
+    slice_: Slice, churn_factors: dict[churn.DayKey, float]
+) -> float:
+    return churn_factors.get(
+        (slice_.data_source, slice_.venue_path, slice_.date.weekday()), 1.0
+    )
+
+
+def get_candidate_slices(today: datetime.date) -> list[Slice]:
+    """Every venue and date within each data source's look ahead"""
+    candidates = []
+
+    for data_source in models.DataSource:
+        data_source_settings = app_settings.data_sources[data_source.value]
+        for days_ahead in range(data_source_settings.LOOK_AHEAD_DAYS):
+            date = today + datetime.timedelta(days=days_ahead)
+            candidates.extend(
+                Slice(data_source, venue_path, date)
+                for venue_path in data_source_settings.VENUES
+            )
+
+    return candidates
+
+
+def _is_queued(state: SliceState, now: datetime.datetime) -> bool:
+    if state.time_queued is None:
+        return False
+
+    if state.time_scraped is not None and (
+        state.time_scraped >= state.time_queued
+    ):
+        return False
+
+    return now - state.time_queued < datetime.timedelta(
+        minutes=app_settings.FRESHNESS_QUEUED_TIMEOUT_MINUTES
+    )
+
+
+def _overdue_ratio(
+    slice_: Slice,
+    state: SliceState | None,
+    now: datetime.datetime,
+    churn_factors: dict[churn.DayKey, float],
+) -> float:
+    if state is None or state.time_scraped is None:
+        return math.inf
+
+    target_staleness = get_target_staleness(
+        (slice_.date - now.date()).days,
+        _get_churn_factor(slice_, churn_factors),
+    )
+    return (now - state.time_scraped) / target_staleness
+
+
+def select_stale_slices(
+    candidates: list[Slice],
+    states: dict[Slice, SliceState],
+    now: datetime.datetime,
+    budget: int,
+    churn_factors: dict[churn.DayKey, float] | None = None,
+) -> list[Slice]:
+    """Picks the slices past their target staleness, most overdue first
+
+    Args:
+        candidates (list[Slice]): The slices that could be scraped
+        states (dict[Slice, SliceState]): When each slice was last scraped
+            and queued
+        now (datetime.datetime): The current time
+        budget (int): The most slices to return
+        churn_factors (dict[churn.DayKey, float] | None): How much to
+            scale each venue and weekday's target staleness by
+
+    Returns:
+        list[Slice]: The stale slices that aren't already queued
+    """
+    overdue = []
+
+    for slice_ in candidates:
+        state = states.get(slice_)
+        if state is not None and _is_queued(state, now):
+            continue
+
+        ratio = _overdue_ratio(slice_, state, now, churn_factors or {})
+        if ratio >= 1:
+            overdue.append((ratio, slice_))
+
+    # Stable, so slices never scraped keep their nearest dates first order
+    overdue.sort(key=lambda item: item[0], reverse=True)
+
+    return [slice_ for _, slice_ in overdue[:budget]]
+
+
+def load_slice_states() -> dict[Slice, SliceState]:
+    with DbSession(read_only=True) as db_session:
+        return {
+            Slice(row.data_source, row.venue_path, row.date): SliceState(
+                row.time_scraped, row.time_queued
+            )
+            for row in db_session.query(models.ScrapeSlice)
+        }
+
+
+def _update_slices(slices: Iterable[Slice], **values):
+    slices = set(slices)
+    if not slices:
+        return
+
+    with DbSession() as db_session:
+        rows = {
+            Slice(row.data_source, row.venue_path, row.date): row
+            for row in db_session.query(models.ScrapeSlice).filter(
+                models.ScrapeSlice.data_source.in_(
+                    {slice_.data_source for slice_ in slices}
+                ),
+                models.ScrapeSlice.date
+                >= min(slice_.date for slice_ in slices),
+            )
+        }
+
+        for slice_ in slices:
+            row = rows.get(slice_)
+            if row is None:
+                row = models.ScrapeSlice(
+                    data_source=slice_.data_source,
+                    venue_path=slice_.venue_path,
+                    date=slice_.date,
+                )
+                db_session.add(row)
+
+            for name, value in values.items():
+                setattr(row, name, value)
+
+
+def mark_slices_queued(slices: Iterable[Slice], time: datetime.datetime):
+    _update_slices(slices, time_queued=time)
+
+
+def mark_slices_scraped(slices: Iterable[Slice], time: datetime.datetime):
+    _update_slices(slices, time_scraped=time)
+
+
+def delete_past_slices(today: datetime.date) -> int:
+    with DbSession() as db_session:
+        result = db_session.execute(
+            delete(models.ScrapeSlice).where(models.ScrapeSlice.date < today)
+        )
+
+    return result.rowcount
+
+
+def group_by_data_source(
+    slices: list[Slice],
+) -> dict[models.DataSource, list[Slice]]:
+    grouped = {}
+    for slice_ in slices:
+        grouped.setdefault(slice_.data_source, []).append(slice_)
+
+    return grouped
+
+
+def estimate_scrape_savings(
+    candidates: list[Slice],
+    churn_factors: dict[churn.DayKey, float],
+    today: datetime.date,
+) -> dict[str, float]:
+    """Compares the scrapes per day with and without the churn factors"""
+    day = datetime.timedelta(days=1)
+    flat = adaptive = 0.0
+
+    for slice_ in candidates:
+        days_ahead = (slice_.date - today).days
+        flat += day / get_target_staleness(days_ahead)
+        adaptive += day / get_target_staleness(
+            days_ahead, _get_churn_factor(slice_, churn_factors)
+        )
+
+    return {
+        "flat_scrapes_per_day": flat,
+        "adaptive_scrapes_per_day": adaptive,
+        "saved_fraction": 1 - adaptive / flat if flat else 0.0,
+    }
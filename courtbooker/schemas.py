@@ -50,3 +50,7 @@ class ScrapeTaskResponse(BaseModel):
 class CourtsResponse(BaseModel):
     message: str
     courts: list[CourtSession]
+    # Set when the courts are paged
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+import itertools
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+from urllib.parse import urlsplit
+
+import httpx
+
+from courtbooker import models
+from courtbooker.scraper.common import (
+    OnPageDone,
+    PageWaitTimings,
+    collect_pages,
+)
+from courtbooker.scraper.fetch import USER_AGENT, FetchedPage, PageSourceReady
+from courtbooker.settings import DataSourceSettings
+
+AsyncScrapePage = Callable[
+    [models.Venue, datetime.date],
+    Awaitable[list[models.CourtSession]],
+]
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_BASE_DELAY_SECONDS = 0.5
+
+
+class HostRateLimiter:
+    """Limits concurrent requests and requests per second for each host"""
+
+    def __init__(self, max_concurrency: int, requests_per_second: float):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least one")
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+
+        self.max_concurrency = max_concurrency
+        self.interval = 1 / requests_per_second
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._next_slot: dict[str, float] = {}
+
+    @asynccontextmanager
+    async def limit(self, host: str) -> AsyncIterator[None]:
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self.max_concurrency)
+        )
+        async with semaphore:
+            await self._wait_for_slot(host)
+            yield
+
+    async def _wait_for_slot(self, host: str):
+        # Spaces requests out evenly; no await between reading and
+        # reserving the slot, so this is safe without a lock
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, RETRY_BASE_DELAY_SECONDS * 2**attempt)
+
+
+class AsyncHttpFetcher:
+    """Fetches server-rendered pages concurrently over a pooled HTTP client
+
+    Unlike `fetch.HttpFetcher` there is no browser to fall back to, so
+    pages that need javascript to render are skipped.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        is_page_source_ready: PageSourceReady,
+        max_retries: int,
+        timings: PageWaitTimings | None = None,
+    ):
+        self.client = client
+        self.limiter = limiter
+        self.is_page_source_ready = is_page_source_ready
+        self.max_retries = max_retries
+        self.timings = timings
+
+    async def fetch(
+        self, url: str, http_url: str | None = None
+    ) -> FetchedPage | None:
+        request_url = http_url or url
+        response = await self._get_with_retry(request_url)
+        if response is None:
+            return None
+
+        if not response.text or not self.is_page_source_ready(response.text):
+            logging.warning(
+                f"No availability in page source for {request_url}, "
+                "use the sync scrape mode for sources that need a browser"
+            )
+            return None
+
+        final_url = str(response.url) if response.history else url
+        return FetchedPage(final_url, response.text)
+
+    async def _get_with_retry(self, url: str) -> httpx.Response | None:
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1))
+
+            try:
+                async with self.limiter.limit(host):
+                    response = await self.client.get(url)
+            except httpx.TransportError as e:
+                logging.warning(f"Failed to fetch {url} ({attempt=}): {e}")
+                continue
+
+            if self.timings is not None:
+                self.timings.record(response.elapsed.total_seconds())
+
+            if response.status_code in RETRY_STATUS_CODES:
+                logging.warning(
+                    f"Failed to fetch {url} ({attempt=}): {response.status_code}"
+                )
+                continue
+
+            if response.is_error:
+                logging.error(f"Failed to fetch {url}: {response.status_code}")
+                return None
+
+            return response
+
+        logging.error(f"Giving up on {url} after {attempt + 1} attempts")
+        return None
+
+
+@asynccontextmanager
+async def open_async_fetcher(
+    name: str,
+    settings: DataSourceSettings,
+    is_page_source_ready: PageSourceReady,
+) -> AsyncIterator[AsyncHttpFetcher]:
+    timings = PageWaitTimings(name)
+    limiter = HostRateLimiter(
+        settings.MAX_CONCURRENCY, settings.MAX_REQUESTS_PER_SECOND
+    )
+    limits = httpx.Limits(
+        max_connections=settings.MAX_CONCURRENCY,
+        max_keepalive_connections=settings.MAX_CONCURRENCY,
+    )
+
+    async with httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        timeout=settings.PAGE_TIMEOUT_SECONDS,
+        limits=limits,
+        follow_redirects=True,
+    ) as client:
+        yield AsyncHttpFetcher(
+            client,
+            limiter,
+            is_page_source_ready,
+            max_retries=settings.MAX_RETRIES,
+            timings=timings,
+        )
+
+    timings.log_summary()
+
+
+async def scrape_concurrently_async(
+    scrape_page: AsyncScrapePage,
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    """Scrapes every (date, venue) page concurrently on the running loop
+
+    Concurrency is bounded by the fetcher's rate limiter rather than here.
+    `on_page_done` is called after each page from a thread, so it may block.
+
+    Returns:
+        list[models.CourtSession]: The available sessions, in the same order
+            as scraping `itertools.product(date_range, venues)` one at a time
+
+    Raises:
+        PageScrapeError: If any page failed, once every page has been tried
+    """
+    pages = list(itertools.product(date_range, venues))
+    logging.info(f"Scraping {len(pages)} pages asynchronously")
+
+    async def _scrape(date: datetime.date, venue: models.Venue):
+        try:
+            return await scrape_page(venue, date), False
+        except Exception as e:
+            logging.error(f"Failed to scrape {venue} on {date}")
+            logging.exception(e)
+            return [], True
+        finally:
+            if on_page_done is not None:
+                await asyncio.to_thread(on_page_done)
+
+    results = await asyncio.gather(
+        *(_scrape(date, venue) for date, venue in pages)
+    )
+
+    return collect_pages(results, pages)
@@ -1,21 +1,27 @@
 import datetime
-import itertools
+import functools
 import logging
-import time
 from itertools import islice
 from typing import Iterable
 
 import lxml.html as lxhtml
 import lxml.html.clean as clean
+from selenium.webdriver.remote.webdriver import WebDriver
 
 from courtbooker import models
-from courtbooker.scraper.common import get_webdriver
+from courtbooker.scraper.aio import (
+    AsyncHttpFetcher,
+    open_async_fetcher,
+    scrape_concurrently_async,
+)
+from courtbooker.scraper.common import OnPageDone, scrape_concurrently
+from courtbooker.scraper.fetch import FetchedPage, Fetcher, open_fetcher
 from courtbooker.settings import app_settings
 
 BEFORE_AVAILABILITY_TABLE_STRING = "browse by location"
 AFTER_AVAILABILITY_TABLE_STRING = "shopping basket"
 NUM_COLUMNS = 6
-PAGE_WAIT_SECONDS = 4
+NO_SESSIONS_STRINGS = ("no sessions available", "no activities available")
 
 
 def parse_start_end_time(value: str) -> tuple[int, int]:
@@ -104,60 +110,155 @@ def create_court_session(
     )
 
 
-def get_available_sessions(
-    venues: list[models.Venue],
-    date_range: list[datetime.date],
-) -> list[models.CourtSession]:
-    COLUMN_MAPPERS = [
-        (0, "start_end_time", parse_start_end_time),
-        (4, "cost", parse_cost),
-        (5, "availability", parse_availability),
-    ]
+COLUMN_MAPPERS = [
+    (0, "start_end_time", parse_start_end_time),
+    (4, "cost", parse_cost),
+    (5, "availability", parse_availability),
+]
+
+
+def _format_url(venue: models.Venue, date: datetime.date) -> str:
+    return (
+        f"{app_settings.BETTER.BASE_URL}/{venue.path}/{date:%Y-%m-%d}/by-time"
+    )
+
+
+def is_page_source_ready(page_source: str) -> bool:
+    """Whether the page source contains the availability table or the no
+    sessions message"""
+    if any(text in page_source.lower() for text in NO_SESSIONS_STRINGS):
+        return True
+
+    return len(extract_lines_from_page_source(page_source)) >= NUM_COLUMNS
+
+
+def _availability_table_ready(browser: WebDriver) -> bool:
+    # A redirect away from the booking page leaves nothing to wait for
+    if not browser.current_url.endswith("/by-time"):
+        return True
+
+    return is_page_source_ready(browser.page_source)
 
+
+def parse_page_source(
+    page_source: str,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
+) -> list[models.CourtSession]:
     available_courts: list[models.CourtSession] = []
 
-    with get_webdriver() as browser:
-        logging.info(f"{venues=}, {type(venues)=}")
-        logging.info(f"{date_range=}, {type(date_range)=}")
-        for date, venue in itertools.product(date_range, venues):
-            url = f"{app_settings.BETTER.BASE_URL}/{venue.path}/{date:%Y-%m-%d}/by-time"
-
-            logging.debug(f"Getting booking page {url=}")
-            browser.get(url)
-            time.sleep(PAGE_WAIT_SECONDS)
-
-            logging.debug("Extracting page source")
-            if browser.current_url != url:
-                logging.error(f"Failed to load {url=}, {browser.current_url=}")
-                continue
-
-            lines = extract_lines_from_page_source(browser.page_source)
-            if len(lines) < NUM_COLUMNS:
-                logging.debug(
-                    f"No valid session lines found for {venue.name=} {date=}"
+    lines = extract_lines_from_page_source(page_source)
+    if len(lines) < NUM_COLUMNS:
+        logging.debug(
+            f"No valid session lines found for {venue.name=} {date=}"
+        )
+        return available_courts
+
+    for batch in batched(lines, NUM_COLUMNS):
+        court = {}
+        for column, key, mapper in COLUMN_MAPPERS:
+            value = batch[column]
+            try:
+                value = mapper(value)
+            except Exception as e:
+                logging.error(
+                    f"Failed to parse value {value} for {key} ({batch=})"
                 )
-                continue
-
-            for batch in batched(lines, NUM_COLUMNS):
-                court = {}
-                for column, key, mapper in COLUMN_MAPPERS:
-                    value = batch[column]
-                    try:
-                        value = mapper(value)
-                    except Exception as e:
-                        logging.error(
-                            f"Failed to parse value {value} for {key} ({batch=})"
-                        )
-                        raise e
-
-                    court[key] = value
-
-                if court["availability"] > 0:
-                    court_session = create_court_session(
-                        date=date, venue=venue, url=url, **court
-                    )
-
-                    logging.info(f"Found available court: {court_session}")
-                    available_courts.append(court_session)
+                raise e
+
+            court[key] = value
+
+        if court["availability"] > 0:
+            court_session = create_court_session(
+                date=date, venue=venue, url=url, **court
+            )
+
+            logging.info(f"Found available court: {court_session}")
+            available_courts.append(court_session)
 
     return available_courts
+
+
+def _parse_fetched_page(
+    page: FetchedPage | None,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
+) -> list[models.CourtSession]:
+    if page is None:
+        return []
+
+    logging.debug("Extracting page source")
+    if page.url != url:
+        logging.error(f"Failed to load {url=}, {page.url=}")
+        return []
+
+    return parse_page_source(page.page_source, venue, date, url)
+
+
+def _scrape_page(
+    fetcher: Fetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    url = _format_url(venue, date)
+
+    logging.debug(f"Getting booking page {url=}")
+    page = fetcher.fetch(url)
+
+    return _parse_fetched_page(page, venue, date, url)
+
+
+async def _scrape_page_async(
+    fetcher: AsyncHttpFetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    url = _format_url(venue, date)
+
+    logging.debug(f"Getting booking page {url=}")
+    page = await fetcher.fetch(url)
+
+    return _parse_fetched_page(page, venue, date, url)
+
+
+def get_available_sessions(
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    logging.info(f"{venues=}, {type(venues)=}")
+    logging.info(f"{date_range=}, {type(date_range)=}")
+
+    with open_fetcher(
+        "better",
+        app_settings.BETTER,
+        ready_condition=_availability_table_ready,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return scrape_concurrently(
+            functools.partial(_scrape_page, fetcher),
+            venues,
+            date_range,
+            max_concurrency=app_settings.BETTER.MAX_CONCURRENCY,
+            on_page_done=on_page_done,
+        )
+
+
+async def get_available_sessions_async(
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    async with open_async_fetcher(
+        "better",
+        app_settings.BETTER,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return await scrape_concurrently_async(
+            functools.partial(_scrape_page_async, fetcher),
+            venues,
+            date_range,
+            on_page_done=on_page_done,
+        )
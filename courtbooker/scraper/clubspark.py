@@ -1,18 +1,40 @@
 import datetime
-import itertools
+import functools
 import logging
-import time
 from decimal import Decimal
 
-from selenium.common.exceptions import NoSuchElementException
+import lxml.html as lxhtml
 from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions as EC
 
 from courtbooker import models
-from courtbooker.scraper.common import get_webdriver
+from courtbooker.scraper.aio import (
+    AsyncHttpFetcher,
+    open_async_fetcher,
+    scrape_concurrently_async,
+)
+from courtbooker.scraper.common import (
+    OnPageDone,
+    page_text_contains,
+    scrape_concurrently,
+    xpath_has_class,
+)
+from courtbooker.scraper.fetch import FetchedPage, Fetcher, open_fetcher
 from courtbooker.settings import app_settings
 
-PAGE_WAIT_SECONDS = 3
+COURT_CSS_SELECTOR = "div.resource"
+COURT_XPATH = f"//div[{xpath_has_class('resource')}]"
+SESSION_XPATH = (
+    f".//div[{xpath_has_class('resource-session')}][@data-availability='true']"
+)
+INTERVAL_XPATH = f".//div[{xpath_has_class('resource-interval')}]"
+NOT_BOOKED_XPATH = f".//a[{xpath_has_class('not-booked')}]"
+NO_SESSIONS_STRINGS = ("no courts available", "no sessions available")
+
+PAGE_READY = EC.any_of(
+    EC.presence_of_element_located((By.CSS_SELECTOR, COURT_CSS_SELECTOR)),
+    page_text_contains(*NO_SESSIONS_STRINGS),
+)
 
 
 def _get_dt_from_mins_and_date(
@@ -25,7 +47,7 @@ def _get_dt_from_mins_and_date(
 
 
 def get_court_availability(
-    court_element: WebElement,
+    court_element: lxhtml.HtmlElement,
     label: str,
     venue: models.Venue,
     date: datetime.date,
@@ -33,82 +55,170 @@ def get_court_availability(
 ) -> list[models.CourtSession]:
     available_sessions = []
 
-    sessions = court_element.find_elements(
-        By.CSS_SELECTOR, 'div.resource-session[data-availability="true"]'
-    )
+    sessions = court_element.xpath(SESSION_XPATH)
 
     for session in sessions:
         try:
-            cost = Decimal(session.get_attribute("data-session-cost"))
+            cost = Decimal(session.get("data-session-cost"))
 
         except TypeError:
             logging.warning(f"Could not parse cost for session: {session}")
             continue
 
-        intervals = session.find_elements(
-            By.CSS_SELECTOR, "div.resource-interval"
-        )
+        intervals = session.xpath(INTERVAL_XPATH)
         for interval in intervals:
-            try:
-                interval.find_element(By.CSS_SELECTOR, "a.not-booked")
-            except NoSuchElementException:
+            if not interval.xpath(NOT_BOOKED_XPATH):
                 continue
-            else:
-                start_dt = _get_dt_from_mins_and_date(
-                    int(interval.get_attribute("data-system-start-time")),
-                    date,
-                )
-                end_dt = _get_dt_from_mins_and_date(
-                    int(interval.get_attribute("data-system-end-time")),
-                    date,
-                )
-
-                session = models.CourtSession(
-                    venue=venue,
-                    label=label,
-                    cost=cost,
-                    start_time=start_dt,
-                    end_time=end_dt,
-                    url=url,
-                )
-
-                logging.info(f"Found available court: {session}")
-                available_sessions.append(session)
+
+            start_dt = _get_dt_from_mins_and_date(
+                int(interval.get("data-system-start-time")),
+                date,
+            )
+            end_dt = _get_dt_from_mins_and_date(
+                int(interval.get("data-system-end-time")),
+                date,
+            )
+
+            court_session = models.CourtSession(
+                venue=venue,
+                label=label,
+                cost=cost,
+                start_time=start_dt,
+                end_time=end_dt,
+                url=url,
+            )
+
+            logging.info(f"Found available court: {court_session}")
+            available_sessions.append(court_session)
 
     return available_sessions
 
 
+def _format_url(venue: models.Venue, date: datetime.date) -> str:
+    return f"{app_settings.CLUBSPARK.BASE_URL}/{venue.path}/Booking/BookByDate#?date={date:%Y-%m-%d}"
+
+
+def _format_http_url(venue: models.Venue, date: datetime.date) -> str:
+    # The date fragment is only read client side, so send it as a query too
+    return f"{app_settings.CLUBSPARK.BASE_URL}/{venue.path}/Booking/BookByDate?date={date:%Y-%m-%d}"
+
+
+def is_page_source_ready(page_source: str) -> bool:
+    """Whether the page source contains the courts or the no sessions
+    message"""
+    if any(text in page_source.lower() for text in NO_SESSIONS_STRINGS):
+        return True
+
+    return bool(lxhtml.fromstring(page_source).xpath(COURT_XPATH))
+
+
+def parse_page_source(
+    page_source: str,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
+) -> list[models.CourtSession]:
+    available_courts: list[models.CourtSession] = []
+
+    courts = lxhtml.fromstring(page_source).xpath(COURT_XPATH)
+    for court_element in courts:
+        court_label = court_element.get("data-resource-name")
+
+        if "mini" in court_label.lower():
+            continue
+
+        sessions = get_court_availability(
+            court_element,
+            court_label,
+            venue,
+            date,
+            url,
+        )
+
+        available_courts.extend(sessions)
+
+    return available_courts
+
+
+def _parse_fetched_page(
+    page: FetchedPage | None,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
+) -> list[models.CourtSession]:
+    if page is None:
+        return []
+
+    return parse_page_source(page.page_source, venue, date, url)
+
+
+def _scrape_page(
+    fetcher: Fetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    logging.info(f"Fetching court availability for {venue} on {date}")
+    venue_date_url = _format_url(venue, date)
+    logging.debug(f"Fetching {venue_date_url}")
+
+    page = fetcher.fetch(
+        venue_date_url, http_url=_format_http_url(venue, date)
+    )
+
+    return _parse_fetched_page(page, venue, date, venue_date_url)
+
+
+async def _scrape_page_async(
+    fetcher: AsyncHttpFetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    logging.info(f"Fetching court availability for {venue} on {date}")
+    venue_date_url = _format_url(venue, date)
+
+    page = await fetcher.fetch(
+        venue_date_url, http_url=_format_http_url(venue, date)
+    )
+
+    return _parse_fetched_page(page, venue, date, venue_date_url)
+
+
 def get_available_sessions(
     venues: list[models.Venue],
     date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
 ) -> list[models.CourtSession]:
-    available_courts: list[models.CourtSession] = []
+    logging.info(f"{venues=}, {type(venues)=}")
+    logging.info(f"{date_range=}, {type(date_range)=}")
+
+    with open_fetcher(
+        "clubspark",
+        app_settings.CLUBSPARK,
+        ready_condition=PAGE_READY,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return scrape_concurrently(
+            functools.partial(_scrape_page, fetcher),
+            venues,
+            date_range,
+            max_concurrency=app_settings.CLUBSPARK.MAX_CONCURRENCY,
+            on_page_done=on_page_done,
+        )
 
-    with get_webdriver() as driver:
-        logging.info(f"{venues=}, {type(venues)=}")
-        logging.info(f"{date_range=}, {type(date_range)=}")
-        for date, venue in itertools.product(date_range, venues):
-            logging.info(f"Fetching court availability for {venue} on {date}")
-            venue_date_url = f"{app_settings.CLUBSPARK.BASE_URL}/{venue.path}/Booking/BookByDate#?date={date:%Y-%m-%d}"
-            logging.debug(f"Fetching {venue_date_url}")
-            driver.get(venue_date_url)
-            time.sleep(PAGE_WAIT_SECONDS)
-
-            courts = driver.find_elements(By.CSS_SELECTOR, "div.resource")
-            for court_element in courts:
-                court_label = court_element.get_attribute("data-resource-name")
-
-                if "mini" in court_label.lower():
-                    continue
-
-                sessions = get_court_availability(
-                    court_element,
-                    court_label,
-                    venue,
-                    date,
-                    venue_date_url,
-                )
-
-                available_courts.extend(sessions)
 
-    return available_courts
+async def get_available_sessions_async(
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    async with open_async_fetcher(
+        "clubspark",
+        app_settings.CLUBSPARK,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return await scrape_concurrently_async(
+            functools.partial(_scrape_page_async, fetcher),
+            venues,
+            date_range,
+            on_page_done=on_page_done,
+        )
@@ -1,19 +1,320 @@
+import datetime
+import functools
+import itertools
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from typing import Callable, Iterator
 
+import geckodriver_autoinstaller
 from selenium import webdriver
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
 
+from courtbooker import models
 
-@contextmanager
-def get_webdriver() -> webdriver.Firefox:
+ScrapePage = Callable[
+    [models.Venue, datetime.date],
+    list[models.CourtSession],
+]
+ReadyCondition = Callable[[webdriver.Firefox], bool]
+# Called after each page has been tried, to report progress
+OnPageDone = Callable[[], None]
+
+PAGE_POLL_SECONDS = 0.25
+
+
+class PageScrapeError(Exception):
+    """Raised once every page has been tried, if any of them failed
+
+    Holds the sessions from the pages that were scraped, so they can be
+    saved without the failed pages closing the sessions they had.
+    """
+
+    def __init__(
+        self,
+        court_sessions: list[models.CourtSession],
+        failed_pages: list[tuple[datetime.date, models.Venue]],
+    ):
+        super().__init__(f"Failed to scrape {len(failed_pages)} pages")
+        self.court_sessions = court_sessions
+        self.failed_pages = failed_pages
+
+
+def collect_pages(
+    results: list[tuple[list[models.CourtSession], bool]],
+    pages: list[tuple[datetime.date, models.Venue]],
+) -> list[models.CourtSession]:
+    """Joins the sessions from each page, raising if any page failed"""
+    court_sessions = list(
+        itertools.chain.from_iterable(sessions for sessions, _ in results)
+    )
+    failed_pages = [
+        page for page, (_, failed) in zip(pages, results) if failed
+    ]
+
+    if failed_pages:
+        raise PageScrapeError(court_sessions, failed_pages)
+
+    return court_sessions
+
+
+@functools.cache
+def _install_geckodriver():
+    # Only processes that start a browser need the driver
+    logging.info("Installing geckodriver")
+    geckodriver_autoinstaller.install()
+
+
+def _create_webdriver() -> webdriver.Firefox:
+    _install_geckodriver()
+    logging.debug("Initiliasing Firefox webdriver")
+    options = webdriver.FirefoxOptions()
+    options.headless = True
+    return webdriver.Firefox(options=options)
+
+
+def page_text_contains(*texts: str) -> ReadyCondition:
+    """Ready condition that holds once any of `texts` is visible on the page
+
+    The comparison is case-insensitive.
+    """
+    texts = tuple(text.lower() for text in texts)
+
+    def _condition(driver: webdriver.Firefox) -> bool:
+        try:
+            body_text = driver.find_element(By.TAG_NAME, "body").text.lower()
+        except NoSuchElementException:
+            return False
+        return any(text in body_text for text in texts)
+
+    return _condition
+
+
+class PageWaitTimings:
+    """Thread-safe record of how long each page took to become ready"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.waits: list[float] = []
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits.append(seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def log_summary(self):
+        if not self.waits:
+            return
+
+        waits = sorted(self.waits)
+        logging.info(
+            f"{self.name} page waits: {len(waits)} pages, "
+            f"total={sum(waits):.1f}s, "
+            f"median={waits[len(waits) // 2]:.2f}s, "
+            f"max={waits[-1]:.2f}s, "
+            f"timeouts={self.timeouts}"
+        )
+
+
+def wait_for_page(
+    driver: webdriver.Firefox,
+    ready_condition: ReadyCondition,
+    timeout: float,
+    timings: PageWaitTimings | None = None,
+) -> bool:
+    """Waits until the current page satisfies `ready_condition`
+
+    Args:
+        driver (webdriver.Firefox): The driver that loaded the page
+        ready_condition (ReadyCondition): Returns True once the page is ready
+        timeout (float): The maximum number of seconds to wait
+        timings (PageWaitTimings | None): Records how long the wait took
+
+    Returns:
+        bool: Whether the page became ready before the timeout
+    """
+    start = time.monotonic()
     try:
-        logging.debug("Initiliasing Firefox webdriver")
-        options = webdriver.FirefoxOptions()
-        options.headless = True
-        driver = webdriver.Firefox(options=options)
-        yield driver
-    except Exception as e:
-        logging.exception(e)
-    finally:
-        logging.debug("Closing driver")
-        driver.quit()
+        WebDriverWait(driver, timeout, poll_frequency=PAGE_POLL_SECONDS).until(
+            ready_condition
+        )
+        is_ready = True
+    except TimeoutException:
+        is_ready = False
+
+    elapsed = time.monotonic() - start
+    if timings is not None:
+        timings.record(elapsed, timed_out=not is_ready)
+
+    if is_ready:
+        logging.debug(f"Page ready after {elapsed:.2f}s")
+    else:
+        logging.warning(
+            f"Page not ready after {timeout}s: {driver.current_url}"
+        )
+
+    return is_ready
+
+
+class WebDriverPool:
+    """A bounded pool of reusable headless webdrivers
+
+    Drivers are started lazily when no idle driver is available, so at most
+    `size` browsers are ever running. A driver that raises a
+    `WebDriverException` is discarded rather than handed to the next caller.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("size must be at least one")
+
+        self.size = size
+        self._idle: queue.LifoQueue[webdriver.Firefox] = queue.LifoQueue()
+        self._drivers: list[webdriver.Firefox] = []
+        self._num_drivers = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "WebDriverPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @contextmanager
+    def acquire(self) -> Iterator[webdriver.Firefox]:
+        driver = self._checkout()
+        is_broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            is_broken = True
+            raise
+        finally:
+            # Every other exit, including errors from parsing the page, hands
+            # the driver back so its slot isn't lost
+            if is_broken:
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+            self._num_drivers = 0
+
+        logging.debug(f"Closing {len(drivers)} pooled drivers")
+        for driver in drivers:
+            try:
+                driver.quit()
+            except WebDriverException as e:
+                logging.warning(f"Failed to close driver: {e}")
+
+    def _checkout(self) -> webdriver.Firefox:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                start_new_driver = self._num_drivers < self.size
+                if start_new_driver:
+                    self._num_drivers += 1
+
+            if start_new_driver:
+                break
+
+            # Re-check capacity periodically in case a driver was discarded
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        try:
+            driver = _create_webdriver()
+        except Exception:
+            with self._lock:
+                self._num_drivers -= 1
+            raise
+
+        with self._lock:
+            self._drivers.append(driver)
+
+        return driver
+
+    def _discard(self, driver: webdriver.Firefox):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._num_drivers -= 1
+
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+def xpath_has_class(class_name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector `.class_name`"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def scrape_concurrently(
+    scrape_page: ScrapePage,
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    max_concurrency: int,
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    """Scrapes every (date, venue) page on a pool of threads
+
+    Args:
+        scrape_page (ScrapePage): Scrapes a single venue on a single date
+        venues (list[models.Venue]): The venues to scrape
+        date_range (list[datetime.date]): The dates to scrape
+        max_concurrency (int): The maximum number of pages to scrape at once
+        on_page_done (OnPageDone | None): Called after each page, whether
+            or not it failed
+
+    Returns:
+        list[models.CourtSession]: The available sessions, in the same order
+            as scraping `itertools.product(date_range, venues)` one at a time
+
+    Raises:
+        PageScrapeError: If any page failed, once every page has been tried
+    """
+    pages = list(itertools.product(date_range, venues))
+    if not pages:
+        return []
+
+    num_workers = max(1, min(max_concurrency, len(pages)))
+    logging.info(f"Scraping {len(pages)} pages with {num_workers} workers")
+
+    def _scrape(page: tuple[datetime.date, models.Venue]):
+        date, venue = page
+        try:
+            return scrape_page(venue, date), False
+        except Exception as e:
+            logging.error(f"Failed to scrape {venue} on {date}")
+            logging.exception(e)
+            return [], True
+        finally:
+            if on_page_done is not None:
+                on_page_done()
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = list(executor.map(_scrape, pages))
+
+    return collect_pages(results, pages)
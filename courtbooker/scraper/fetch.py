@@ -0,0 +1,170 @@
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple, Protocol
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from courtbooker.scraper.common import (
+    PageWaitTimings,
+    ReadyCondition,
+    WebDriverPool,
+    wait_for_page,
+)
+from courtbooker.settings import DataSourceSettings
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0"
+)
+
+PageSourceReady = Callable[[str], bool]
+
+
+class FetchedPage(NamedTuple):
+    url: str
+    page_source: str
+
+
+class Fetcher(Protocol):
+    def fetch(
+        self, url: str, http_url: str | None = None
+    ) -> FetchedPage | None:
+        ...
+
+
+class SeleniumFetcher:
+    """Renders pages in a pooled headless browser"""
+
+    def __init__(
+        self,
+        pool: WebDriverPool,
+        ready_condition: ReadyCondition,
+        timeout: float,
+        timings: PageWaitTimings | None = None,
+    ):
+        self.pool = pool
+        self.ready_condition = ready_condition
+        self.timeout = timeout
+        self.timings = timings
+
+    def fetch(
+        self, url: str, http_url: str | None = None
+    ) -> FetchedPage | None:
+        with self.pool.acquire() as driver:
+            logging.debug(f"Rendering {url}")
+            driver.get(url)
+            wait_for_page(
+                driver,
+                self.ready_condition,
+                timeout=self.timeout,
+                timings=self.timings,
+            )
+            return FetchedPage(driver.current_url, driver.page_source)
+
+
+class HttpFetcher:
+    """Fetches server-rendered pages over a pooled keep-alive HTTP session
+
+    Pages that fail to load, or whose source doesn't contain the data yet
+    (i.e. they need javascript to render), are handed to the `fallback`
+    fetcher if one is given.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        is_page_source_ready: PageSourceReady,
+        timeout: float,
+        timings: PageWaitTimings | None = None,
+        fallback: Fetcher | None = None,
+    ):
+        self.session = session
+        self.is_page_source_ready = is_page_source_ready
+        self.timeout = timeout
+        self.timings = timings
+        self.fallback = fallback
+
+    def fetch(
+        self, url: str, http_url: str | None = None
+    ) -> FetchedPage | None:
+        request_url = http_url or url
+        logging.debug(f"Fetching {request_url}")
+
+        try:
+            response = self.session.get(request_url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.warning(f"Failed to fetch {request_url}: {e}")
+            return self._fall_back(url, http_url)
+
+        if self.timings is not None:
+            self.timings.record(response.elapsed.total_seconds())
+
+        if not response.text or not self.is_page_source_ready(response.text):
+            logging.info(f"No availability in page source for {request_url}")
+            return self._fall_back(url, http_url)
+
+        final_url = response.url if response.history else url
+        return FetchedPage(final_url, response.text)
+
+    def _fall_back(self, url: str, http_url: str | None) -> FetchedPage | None:
+        if self.fallback is None:
+            return None
+
+        logging.info(f"Falling back to browser for {url}")
+        return self.fallback.fetch(url, http_url)
+
+
+def create_http_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@contextmanager
+def open_fetcher(
+    name: str,
+    settings: DataSourceSettings,
+    ready_condition: ReadyCondition,
+    is_page_source_ready: PageSourceReady,
+) -> Iterator[Fetcher]:
+    """Opens the fetch backend configured for a data source
+
+    The browser pool is always available as the selenium fetcher or as the
+    HTTP fetcher's fallback, but only starts a browser when first used.
+
+    Args:
+        name (str): The data source name, used for logging
+        settings (DataSourceSettings): The data source settings
+        ready_condition (ReadyCondition): When a rendered page is ready
+        is_page_source_ready (PageSourceReady): When a raw page has its data
+
+    Yields:
+        Fetcher: The fetcher to scrape pages with
+    """
+    timings = PageWaitTimings(name)
+
+    with WebDriverPool(settings.MAX_CONCURRENCY) as pool:
+        fetcher = SeleniumFetcher(
+            pool,
+            ready_condition,
+            timeout=settings.PAGE_TIMEOUT_SECONDS,
+            timings=timings,
+        )
+
+        if settings.FETCH_BACKEND == "http":
+            with create_http_session(settings.MAX_CONCURRENCY) as session:
+                yield HttpFetcher(
+                    session,
+                    is_page_source_ready,
+                    timeout=settings.PAGE_TIMEOUT_SECONDS,
+                    timings=timings,
+                    fallback=fetcher,
+                )
+        else:
+            yield fetcher
+
+    timings.log_summary()
@@ -1,77 +1,170 @@
 import datetime
-import itertools
+import functools
 import logging
-import time
 
-from selenium.common.exceptions import NoSuchElementException
+import lxml.html as lxhtml
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
 
 from courtbooker import models
-from courtbooker.scraper.common import get_webdriver
+from courtbooker.scraper.aio import (
+    AsyncHttpFetcher,
+    open_async_fetcher,
+    scrape_concurrently_async,
+)
+from courtbooker.scraper.common import (
+    OnPageDone,
+    page_text_contains,
+    scrape_concurrently,
+    xpath_has_class,
+)
+from courtbooker.scraper.fetch import FetchedPage, Fetcher, open_fetcher
 from courtbooker.settings import app_settings
 
-PAGE_WAIT_SECONDS = 5
-
 COURT_CSS_SELECTOR = "label.court"
+COURT_XPATH = f"//label[{xpath_has_class('court')}]"
+BOOKABLE_XPATH = f".//input[{xpath_has_class('bookable')}]"
+NO_SESSIONS_STRINGS = ("no courts available", "no sessions available")
+
+PAGE_READY = EC.any_of(
+    EC.presence_of_element_located((By.CSS_SELECTOR, COURT_CSS_SELECTOR)),
+    page_text_contains(*NO_SESSIONS_STRINGS),
+)
 
 
 def _format_url(venue: models.Venue, date: datetime.date) -> str:
     return f"{app_settings.TOWERHAMLETS.BASE_URL}/{venue.path}/{date.strftime('%Y-%m-%d')}"
 
 
-def get_available_sessions(
-    venues: list[models.Venue],
-    date_range: list[datetime.date],
+def is_page_source_ready(page_source: str) -> bool:
+    """Whether the page source contains the courts or the no sessions
+    message"""
+    if any(text in page_source.lower() for text in NO_SESSIONS_STRINGS):
+        return True
+
+    return bool(lxhtml.fromstring(page_source).xpath(COURT_XPATH))
+
+
+def parse_page_source(
+    page_source: str,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
 ) -> list[models.CourtSession]:
     available_courts: list[models.CourtSession] = []
 
-    with get_webdriver() as driver:
-        logging.info(f"{venues=}")
-        logging.info(f"{date_range=}")
-
-        for date, venue in itertools.product(date_range, venues):
-            logging.info(f"Checking availability for {venue} on {date}")
-            url = _format_url(venue, date)
-            driver.get(url)
-            time.sleep(PAGE_WAIT_SECONDS)
-
-            courts = driver.find_elements(By.CSS_SELECTOR, COURT_CSS_SELECTOR)
-
-            for court in courts:
-                try:
-                    court_info = court.find_element(
-                        By.CSS_SELECTOR, "input.bookable"
-                    )
-                except NoSuchElementException:
-                    continue
-
-                cost = float(court_info.get_attribute("data-price"))
-
-                court_label = court.text.split("£")[0]
-                try:
-                    _, _, date_str, time_str = court_info.get_attribute(
-                        "value"
-                    ).split("_")
-                except ValueError:
-                    logging.warning(
-                        f"Could not parse court time: {court_info.get_attribute('value')}"
-                    )
-                    continue
-
-                start_time = datetime.datetime.strptime(
-                    f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
-                )
-                end_time = start_time + datetime.timedelta(hours=1)
-
-                session = models.CourtSession(
-                    venue=venue,
-                    label=court_label,
-                    start_time=start_time,
-                    end_time=end_time,
-                    cost=cost,
-                    url=url,
-                )
-                logging.info(f"Found available court: {session}")
-                available_courts.append(session)
+    courts = lxhtml.fromstring(page_source).xpath(COURT_XPATH)
+
+    for court in courts:
+        bookable = court.xpath(BOOKABLE_XPATH)
+        if not bookable:
+            continue
+
+        court_info = bookable[0]
+        cost = float(court_info.get("data-price"))
+
+        court_label = " ".join(court.text_content().split("£")[0].split())
+        try:
+            _, _, date_str, time_str = court_info.get("value").split("_")
+        except ValueError:
+            logging.warning(
+                f"Could not parse court time: {court_info.get('value')}"
+            )
+            continue
+
+        start_time = datetime.datetime.strptime(
+            f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
+        )
+        end_time = start_time + datetime.timedelta(hours=1)
+
+        session = models.CourtSession(
+            venue=venue,
+            label=court_label,
+            start_time=start_time,
+            end_time=end_time,
+            cost=cost,
+            url=url,
+        )
+        logging.info(f"Found available court: {session}")
+        available_courts.append(session)
 
     return available_courts
+
+
+def _parse_fetched_page(
+    page: FetchedPage | None,
+    venue: models.Venue,
+    date: datetime.date,
+    url: str,
+) -> list[models.CourtSession]:
+    if page is None:
+        return []
+
+    return parse_page_source(page.page_source, venue, date, url)
+
+
+def _scrape_page(
+    fetcher: Fetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    logging.info(f"Checking availability for {venue} on {date}")
+    url = _format_url(venue, date)
+
+    page = fetcher.fetch(url)
+
+    return _parse_fetched_page(page, venue, date, url)
+
+
+async def _scrape_page_async(
+    fetcher: AsyncHttpFetcher,
+    venue: models.Venue,
+    date: datetime.date,
+) -> list[models.CourtSession]:
+    logging.info(f"Checking availability for {venue} on {date}")
+    url = _format_url(venue, date)
+
+    page = await fetcher.fetch(url)
+
+    return _parse_fetched_page(page, venue, date, url)
+
+
+def get_available_sessions(
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    logging.info(f"{venues=}")
+    logging.info(f"{date_range=}")
+
+    with open_fetcher(
+        "towerhamlets",
+        app_settings.TOWERHAMLETS,
+        ready_condition=PAGE_READY,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return scrape_concurrently(
+            functools.partial(_scrape_page, fetcher),
+            venues,
+            date_range,
+            max_concurrency=app_settings.TOWERHAMLETS.MAX_CONCURRENCY,
+            on_page_done=on_page_done,
+        )
+
+
+async def get_available_sessions_async(
+    venues: list[models.Venue],
+    date_range: list[datetime.date],
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    async with open_async_fetcher(
+        "towerhamlets",
+        app_settings.TOWERHAMLETS,
+        is_page_source_ready=is_page_source_ready,
+    ) as fetcher:
+        return await scrape_concurrently_async(
+            functools.partial(_scrape_page_async, fetcher),
+            venues,
+            date_range,
+            on_page_done=on_page_done,
+        )
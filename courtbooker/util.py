@@ -1,8 +1,73 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta
-from typing import Optional
+from decimal import Decimal
+from functools import partial
+from operator import attrgetter
+from typing import Any, AsyncIterator, Callable, Hashable, Optional, TypeVar
+
+import redis
+from sqlalchemy import (
+    ColumnElement,
+    Result,
+    Row,
+    Select,
+    and_,
+    extract,
+    func,
+    select,
+    tuple_,
+)
 
 from courtbooker import models, schemas
-from courtbooker.database import DbSession
+from courtbooker.cache import RedisSnapshotStore, Snapshot, SnapshotCache
+from courtbooker.database import AsyncDbSession, DbSession
+from courtbooker.geo import VenueIndex
+from courtbooker.pagination import (
+    CourtSessionsPage,
+    PageKey,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+from courtbooker.settings import app_settings
+
+DOUBLE_HEADER_MINUTES = 120
+# Monday to Friday, from 8am until 5pm
+WORKING_WEEKDAYS = range(0, 5)
+WORKING_HOURS = range(8, 17)
+
+T = TypeVar("T")
+
+
+def _get_min_duration(
+    only_double_headers: bool, min_duration_minutes: int | None
+) -> timedelta | None:
+    if min_duration_minutes is None and only_double_headers:
+        min_duration_minutes = DOUBLE_HEADER_MINUTES
+
+    if min_duration_minutes is None:
+        return None
+
+    return timedelta(minutes=min_duration_minutes)
+
+
+def _filter_court_sessions(
+    court_sessions: list[schemas.CourtSession],
+    exclude_working_hours: bool,
+    min_duration: timedelta | None,
+) -> list[schemas.CourtSession]:
+    if exclude_working_hours:
+        court_sessions = [
+            court_session
+            for court_session in court_sessions
+            if not is_working_hours(court_session.start_time)
+        ]
+
+    if min_duration is not None:
+        court_sessions = find_available_blocks(court_sessions, min_duration)
+
+    return court_sessions
 
 
 def get_court_sessions(
@@ -12,127 +77,714 @@ def get_court_sessions(
     start_time_before: datetime | None = None,
     only_double_headers: bool = False,
     exclude_working_hours: bool = False,
+    min_duration_minutes: int | None = None,
 ) -> list[schemas.CourtSession]:
-    with DbSession(read_only=True) as db_session:
-        if task_ids is None:
-            task_ids: set[str] = {
-                task.id
-                for task in (
-                    db_session.query(models.ScrapeTask)
-                    .distinct(models.ScrapeTask.data_source)
-                    .order_by(
-                        models.ScrapeTask.data_source,
-                        models.ScrapeTask.time_started.desc(),
-                    )
-                )
-            }
+    min_duration = _get_min_duration(only_double_headers, min_duration_minutes)
 
-        filters = [
-            models.CourtSession.task_id.in_(task_ids),
-        ]
+    if task_ids is None and app_settings.READ_CACHE_ENABLED:
+        return snapshot_cache.get().get_court_sessions(
+            venues=venues,
+            start_time_after=start_time_after,
+            start_time_before=start_time_before,
+            exclude_working_hours=exclude_working_hours,
+            min_duration=min_duration,
+        )
 
-        if venues:
-            filters.append(models.Venue.name.in_(venues))
+    court_sessions = _query_court_sessions(
+        task_ids=task_ids,
+        venues=venues,
+        start_time_after=start_time_after,
+        start_time_before=start_time_before,
+    )
 
-        if start_time_after:
-            filters.append(models.CourtSession.start_time >= start_time_after)
+    return _filter_court_sessions(
+        court_sessions, exclude_working_hours, min_duration
+    )
 
-        if start_time_before:
-            filters.append(models.CourtSession.start_time <= start_time_before)
 
-        query = db_session.query(models.CourtSession).join(
-            models.CourtSession.venue
+async def get_court_sessions_async(
+    task_ids: list[str] | None = None,
+    venues: list[str] | None = None,
+    start_time_after: datetime | None = None,
+    start_time_before: datetime | None = None,
+    only_double_headers: bool = False,
+    exclude_working_hours: bool = False,
+    min_duration_minutes: int | None = None,
+) -> list[schemas.CourtSession]:
+    min_duration = _get_min_duration(only_double_headers, min_duration_minutes)
+
+    if task_ids is None and app_settings.READ_CACHE_ENABLED:
+        snapshot = await snapshot_cache.get_async()
+        return snapshot.get_court_sessions(
+            venues=venues,
+            start_time_after=start_time_after,
+            start_time_before=start_time_before,
+            exclude_working_hours=exclude_working_hours,
+            min_duration=min_duration,
         )
-        court_sessions = (
-            query.filter(*filters)
-            .order_by(
-                models.CourtSession.start_time,
+
+    court_sessions = await _query_court_sessions_async(
+        task_ids=task_ids,
+        venues=venues,
+        start_time_after=start_time_after,
+        start_time_before=start_time_before,
+    )
+
+    return _filter_court_sessions(
+        court_sessions, exclude_working_hours, min_duration
+    )
+
+
+# The worker publishes snapshots with the sync queries, right after saving,
+# so only the API's async queries read from the replica
+def _fetch(statement: Select, convert: Callable[[Result], T]) -> T:
+    with DbSession(read_only=True) as db_session:
+        return convert(db_session.execute(statement))
+
+
+async def _fetch_async(statement: Select, convert: Callable[[Result], T]) -> T:
+    async with AsyncDbSession(read_only=True, use_replica=True) as db_session:
+        return convert(await db_session.execute(statement))
+
+
+def _court_sessions_statement(
+    task_ids: list[str] | None = None,
+    venues: list[str] | None = None,
+    start_time_after: datetime | None = None,
+    start_time_before: datetime | None = None,
+    data_source: models.DataSource | None = None,
+    exclude_working_hours: bool = False,
+    order_by_court: bool = False,
+) -> Select:
+    if task_ids is None:
+        # The latest sessions are kept up to date after every scrape
+        table = models.LatestCourtSession
+        venue_name = models.LatestCourtSession.venue_name
+        filters = []
+        if data_source is not None:
+            filters.append(
+                models.LatestCourtSession.data_source == data_source
             )
-            .all()
+    else:
+        table = models.CourtSession
+        venue_name = models.Venue.name
+        filters = [models.CourtSession.task_id.in_(task_ids)]
+
+    statement = select(
+        venue_name.label("venue"),
+        table.label,
+        table.cost,
+        table.start_time,
+        table.end_time,
+        table.url,
+    ).select_from(table)
+
+    if task_ids is not None:
+        statement = statement.join(models.CourtSession.venue)
+
+    if venues:
+        filters.append(venue_name.in_(venues))
+
+    if start_time_after:
+        filters.append(table.start_time >= start_time_after)
+
+    if start_time_before:
+        filters.append(table.start_time <= start_time_before)
+
+    if exclude_working_hours:
+        filters.append(~_is_working_hours_clause(table.start_time))
+
+    statement = statement.where(*filters)
+
+    if order_by_court:
+        # The order _BlockMerger needs, matching _court_start_key
+        return statement.order_by(
+            venue_name,
+            table.label.is_(None),
+            table.label,
+            table.start_time,
         )
 
-        court_sessions = [
-            schemas.CourtSession(
-                venue=court_session.venue.name,
-                label=court_session.label,
-                start_time=court_session.start_time,
-                end_time=court_session.end_time,
-                cost=court_session.cost,
-                url=court_session.url,
+    return statement.order_by(table.start_time)
+
+
+def _to_court_sessions(result: Result) -> list[schemas.CourtSession]:
+    return [schemas.CourtSession(**row._mapping) for row in result]
+
+
+def _query_court_sessions(**filters) -> list[schemas.CourtSession]:
+    return _fetch(_court_sessions_statement(**filters), _to_court_sessions)
+
+
+async def _query_court_sessions_async(
+    **filters,
+) -> list[schemas.CourtSession]:
+    return await _fetch_async(
+        _court_sessions_statement(**filters), _to_court_sessions
+    )
+
+
+async def _to_stream_batches(
+    partitions: AsyncIterator[list[Row]],
+    exclude_working_hours: bool,
+    min_duration: timedelta | None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    merger = _BlockMerger(min_duration) if min_duration is not None else None
+
+    async for rows in partitions:
+        if exclude_working_hours:
+            rows = [
+                row for row in rows if not is_working_hours(row.start_time)
+            ]
+
+        if merger is None:
+            yield [row._asdict() for row in rows]
+            continue
+
+        blocks = [
+            block.model_dump()
+            for row in rows
+            if (
+                block := merger.add(
+                    schemas.CourtSession.model_construct(
+                        **row._asdict() | {"cost": Decimal(row.cost)}
+                    )
+                )
             )
-            for court_session in court_sessions
+            is not None
         ]
+        if blocks:
+            yield blocks
 
-    if exclude_working_hours:
-        court_sessions = [
-            court_session
-            for court_session in court_sessions
-            if not is_working_hours(court_session.start_time)
-        ]
+    if merger is not None and (block := merger.finish()) is not None:
+        yield [block.model_dump()]
 
-    if only_double_headers:
-        court_sessions = filter_out_single_sessions(court_sessions)
 
-    return court_sessions
+async def stream_court_sessions_async(
+    venues: list[str] | None = None,
+    start_time_after: datetime | None = None,
+    start_time_before: datetime | None = None,
+    only_double_headers: bool = False,
+    exclude_working_hours: bool = False,
+    min_duration_minutes: int | None = None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Streams the latest court sessions from a server side cursor
+
+    Rows are fetched `STREAM_BATCH_SIZE` at a time and yielded in batches,
+    so memory use doesn't grow with the number of sessions. Blocks are
+    merged as the rows arrive, so they are ordered by court rather than by
+    start time.
+
+    With the read cache enabled, the sessions come from the snapshot instead,
+    so they match the version the results are served under.
+    """
+    min_duration = _get_min_duration(only_double_headers, min_duration_minutes)
+
+    if app_settings.READ_CACHE_ENABLED:
+        snapshot = await snapshot_cache.get_async()
+        for court_sessions in snapshot.iter_court_sessions(
+            app_settings.STREAM_BATCH_SIZE,
+            venues=venues,
+            start_time_after=start_time_after,
+            start_time_before=start_time_before,
+            exclude_working_hours=exclude_working_hours,
+            min_duration=min_duration,
+        ):
+            yield [
+                court_session.model_dump() for court_session in court_sessions
+            ]
+        return
+
+    statement = _court_sessions_statement(
+        venues=venues,
+        start_time_after=start_time_after,
+        start_time_before=start_time_before,
+        order_by_court=min_duration is not None,
+    ).execution_options(yield_per=app_settings.STREAM_BATCH_SIZE)
+
+    async with AsyncDbSession(read_only=True, use_replica=True) as db_session:
+        result = await db_session.stream(statement)
+
+        async for batch in _to_stream_batches(
+            result.partitions(), exclude_working_hours, min_duration
+        ):
+            yield batch
+
+
+def _page_order(table=models.LatestCourtSession) -> tuple:
+    # Matches ix_latest_court_session_page, so pages are index seeks
+    return (
+        table.start_time,
+        table.venue_name,
+        func.coalesce(table.label, ""),
+        table.id,
+    )
+
+
+def _page_statement(
+    limit: int, after: PageKey | None = None, **filters
+) -> Select:
+    statement = (
+        _court_sessions_statement(**filters)
+        .add_columns(models.LatestCourtSession.id)
+        .order_by(None)
+        .order_by(*_page_order())
+    )
+
+    if after is not None:
+        statement = statement.where(tuple_(*_page_order()) > tuple_(*after))
+
+    # One more than the page, to tell whether there is a next one
+    return statement.limit(limit + 1)
+
+
+def _count_statement(**filters) -> Select:
+    capped = (
+        _court_sessions_statement(**filters)
+        .order_by(None)
+        .limit(app_settings.PAGE_COUNT_CAP + 1)
+    )
+    return select(func.count()).select_from(capped.subquery())
+
+
+def _to_page(
+    result: Result, limit: int
+) -> tuple[list[schemas.CourtSession], str | None]:
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(
+            (last.start_time, last.venue, last.label or "", last.id)
+        )
+
+    return _to_court_sessions(rows[:limit]), next_cursor
+
+
+async def get_court_sessions_page_async(
+    limit: int,
+    cursor: str | None = None,
+    venues: list[str] | None = None,
+    start_time_after: datetime | None = None,
+    start_time_before: datetime | None = None,
+    only_double_headers: bool = False,
+    exclude_working_hours: bool = False,
+    min_duration_minutes: int | None = None,
+) -> CourtSessionsPage:
+    """Gets a page of the latest court sessions, ordered by start time
+
+    Pages are served from the snapshot cache when it is enabled. Otherwise
+    they are fetched with a keyset seek after the cursor rather than an
+    OFFSET. Blocks are merged in memory, so they are paged there instead.
+
+    Raises:
+        InvalidCursorError: If the cursor wasn't returned by a previous page
+    """
+    after = decode_cursor(cursor) if cursor is not None else None
+    min_duration = _get_min_duration(only_double_headers, min_duration_minutes)
+    filters = dict(
+        venues=venues,
+        start_time_after=start_time_after,
+        start_time_before=start_time_before,
+    )
+
+    if app_settings.READ_CACHE_ENABLED:
+        snapshot = await snapshot_cache.get_async()
+        return snapshot.get_court_sessions_page(
+            limit,
+            after,
+            **filters,
+            exclude_working_hours=exclude_working_hours,
+            min_duration=min_duration,
+        )
+
+    if min_duration is not None:
+        court_sessions = await get_court_sessions_async(
+            **filters,
+            only_double_headers=only_double_headers,
+            exclude_working_hours=exclude_working_hours,
+            min_duration_minutes=min_duration_minutes,
+        )
+        return paginate(court_sessions, limit, after)
+
+    filters["exclude_working_hours"] = exclude_working_hours
+    court_sessions, next_cursor = await _fetch_async(
+        _page_statement(limit, after, **filters),
+        partial(_to_page, limit=limit),
+    )
+
+    if after is not None:
+        return CourtSessionsPage(court_sessions, next_cursor)
+
+    total = await _fetch_async(_count_statement(**filters), Result.scalar_one)
+    return CourtSessionsPage(
+        court_sessions,
+        next_cursor,
+        total=min(total, app_settings.PAGE_COUNT_CAP),
+        total_is_exact=total <= app_settings.PAGE_COUNT_CAP,
+    )
 
 
 def is_working_hours(start_time: datetime) -> bool:
-    return start_time.isoweekday() < 6 and (8 <= start_time.hour < 17)
+    return (
+        start_time.weekday() in WORKING_WEEKDAYS
+        and start_time.hour in WORKING_HOURS
+    )
+
+
+def _is_working_hours_clause(start_time: ColumnElement) -> ColumnElement:
+    """The SQL equivalent of is_working_hours"""
+    # Sunday is day 0, rather than Monday
+    return and_(
+        extract("dow", start_time).between(
+            WORKING_WEEKDAYS.start + 1, WORKING_WEEKDAYS.stop
+        ),
+        extract("hour", start_time).between(
+            WORKING_HOURS.start, WORKING_HOURS.stop - 1
+        ),
+    )
 
 
 def get_venues() -> list[str]:
-    with DbSession(read_only=True) as db_session:
-        venues = (
-            db_session.query(models.Venue).order_by(models.Venue.name).all()
-        )
+    if app_settings.READ_CACHE_ENABLED:
+        return snapshot_cache.get().venues
+
+    return _query_venues()
+
+
+async def get_venues_async() -> list[str]:
+    if app_settings.READ_CACHE_ENABLED:
+        return (await snapshot_cache.get_async()).venues
+
+    return await _query_venues_async()
+
+
+VENUES_STATEMENT = select(models.Venue.name).order_by(models.Venue.name)
+
+
+def _to_scalars(result: Result) -> list:
+    return list(result.scalars())
+
+
+def _query_venues() -> list[str]:
+    return _fetch(VENUES_STATEMENT, _to_scalars)
+
 
-        venue_names = [venue.name for venue in venues]
+async def _query_venues_async() -> list[str]:
+    return await _fetch_async(VENUES_STATEMENT, _to_scalars)
 
-    return venue_names
+
+def get_venue_index() -> VenueIndex:
+    if app_settings.READ_CACHE_ENABLED:
+        return snapshot_cache.get().venue_index
+
+    return VenueIndex(_query_venue_coordinates())
+
+
+async def get_venue_index_async() -> VenueIndex:
+    if app_settings.READ_CACHE_ENABLED:
+        return (await snapshot_cache.get_async()).venue_index
+
+    return VenueIndex(await _query_venue_coordinates_async())
+
+
+VENUE_COORDINATES_STATEMENT = select(
+    models.Venue.name, models.Venue.latitude, models.Venue.longitude
+).where(
+    models.Venue.latitude.is_not(None),
+    models.Venue.longitude.is_not(None),
+)
+
+
+def _to_venue_coordinates(result: Result) -> dict[str, tuple[float, float]]:
+    return {
+        name: (latitude, longitude) for name, latitude, longitude in result
+    }
+
+
+def _query_venue_coordinates() -> dict[str, tuple[float, float]]:
+    return _fetch(VENUE_COORDINATES_STATEMENT, _to_venue_coordinates)
+
+
+async def _query_venue_coordinates_async() -> dict[str, tuple[float, float]]:
+    return await _fetch_async(
+        VENUE_COORDINATES_STATEMENT, _to_venue_coordinates
+    )
 
 
 def get_latest_update_time() -> Optional[datetime]:
-    with DbSession(read_only=True) as db_session:
-        latest_update_time = (
-            db_session.query(models.ScrapeTask.time_finished)
-            .order_by(models.ScrapeTask.time_finished.desc())
-            .first()
-        )
+    if app_settings.READ_CACHE_ENABLED:
+        return snapshot_cache.get().latest_update_time
+
+    return _query_latest_update_time()
+
+
+async def get_latest_update_time_async() -> Optional[datetime]:
+    if app_settings.READ_CACHE_ENABLED:
+        return (await snapshot_cache.get_async()).latest_update_time
+
+    return await _query_latest_update_time_async()
+
+
+LATEST_UPDATE_TIME_STATEMENT = (
+    select(models.ScrapeTask.time_finished)
+    .order_by(models.ScrapeTask.time_finished.desc())
+    .limit(1)
+)
+
+
+def _to_scalar(result: Result) -> Any:
+    return result.scalar()
+
+
+def _query_latest_update_time() -> Optional[datetime]:
+    return _fetch(LATEST_UPDATE_TIME_STATEMENT, _to_scalar)
+
+
+async def _query_latest_update_time_async() -> Optional[datetime]:
+    return await _fetch_async(LATEST_UPDATE_TIME_STATEMENT, _to_scalar)
 
-        if latest_update_time is not None:
-            latest_update_time = latest_update_time[0]
 
-    return latest_update_time
+# The newest scrape task of each data source changes whenever any data
+# source finishes a scrape
+SNAPSHOT_VERSION_STATEMENT = (
+    select(models.ScrapeTask.data_source, func.max(models.ScrapeTask.id))
+    .group_by(models.ScrapeTask.data_source)
+    .order_by(models.ScrapeTask.data_source)
+)
+
+
+def _to_snapshot_version(result: Result) -> tuple[tuple[str, int], ...]:
+    return tuple(
+        (data_source.value, task_id) for data_source, task_id in result
+    )
+
+
+def _query_snapshot_version() -> tuple[tuple[str, int], ...]:
+    return _fetch(SNAPSHOT_VERSION_STATEMENT, _to_snapshot_version)
+
+
+async def _query_snapshot_version_async() -> tuple[tuple[str, int], ...]:
+    return await _fetch_async(SNAPSHOT_VERSION_STATEMENT, _to_snapshot_version)
+
+
+async def get_results_version_async() -> Hashable:
+    """Changes whenever a scrape lands that could change search results
+
+    With the read cache enabled this is the version of the cached snapshot,
+    so results are never older than the version they are served under.
+    """
+    if app_settings.READ_CACHE_ENABLED:
+        return (await snapshot_cache.get_async()).version
+
+    return await _query_snapshot_version_async()
+
+
+def _snapshot_sessions_statement(**filters) -> Select:
+    # Pages of the snapshot break ties on the id, as the database does
+    return _court_sessions_statement(**filters).add_columns(
+        models.LatestCourtSession.id
+    )
+
+
+def _to_snapshot_sessions(
+    result: Result,
+) -> tuple[list[schemas.CourtSession], list[int]]:
+    rows = result.all()
+    return _to_court_sessions(rows), [row.id for row in rows]
+
+
+def _query_snapshot_sessions(
+    **filters,
+) -> tuple[list[schemas.CourtSession], list[int]]:
+    return _fetch(
+        _snapshot_sessions_statement(**filters), _to_snapshot_sessions
+    )
+
+
+async def _query_snapshot_sessions_async() -> (
+    tuple[list[schemas.CourtSession], list[int]]
+):
+    return await _fetch_async(
+        _snapshot_sessions_statement(), _to_snapshot_sessions
+    )
+
+
+def _query_snapshot() -> Snapshot:
+    court_sessions, court_session_ids = _query_snapshot_sessions()
+    return Snapshot(
+        court_sessions=court_sessions,
+        venues=_query_venues(),
+        latest_update_time=_query_latest_update_time(),
+        venue_coordinates=_query_venue_coordinates(),
+        court_session_ids=court_session_ids,
+    )
+
+
+async def _query_snapshot_async() -> Snapshot:
+    (
+        (court_sessions, court_session_ids),
+        venues,
+        latest_update_time,
+        venue_coordinates,
+    ) = await asyncio.gather(
+        _query_snapshot_sessions_async(),
+        _query_venues_async(),
+        _query_latest_update_time_async(),
+        _query_venue_coordinates_async(),
+    )
+    return Snapshot(
+        court_sessions,
+        venues,
+        latest_update_time,
+        venue_coordinates,
+        court_session_ids,
+    )
+
+
+snapshot_store = RedisSnapshotStore(
+    redis.Redis.from_url(app_settings.REDIS_URL)
+)
+
+
+def publish_snapshot(data_sources: list[models.DataSource]):
+    """Saves the latest court sessions of the data sources to Redis, so
+    that every API replica can load them without querying the database"""
+    snapshot_store.save(
+        court_sessions_by_data_source={
+            data_source.value: _query_snapshot_sessions(
+                data_source=data_source
+            )
+            for data_source in data_sources
+        },
+        venues=_query_venues(),
+        latest_update_time=_query_latest_update_time(),
+        venue_coordinates=_query_venue_coordinates(),
+    )
+
+
+def _load_shared_snapshot() -> Snapshot:
+    data_sources = [data_source.value for data_source in models.DataSource]
+    snapshot = snapshot_store.load(data_sources)
+
+    if snapshot is None:
+        # Nothing has been published since Redis was last emptied
+        logging.info("Publishing court sessions snapshot from the database")
+        publish_snapshot(list(models.DataSource))
+        snapshot = snapshot_store.load(data_sources)
+
+    return snapshot
+
+
+if app_settings.READ_CACHE_BACKEND == "redis":
+    # The Redis client is synchronous, so it is called from a thread
+    snapshot_cache = SnapshotCache(
+        get_version=snapshot_store.get_version,
+        load_snapshot=_load_shared_snapshot,
+        poll_seconds=app_settings.READ_CACHE_POLL_SECONDS,
+        get_version_async=partial(
+            asyncio.to_thread, snapshot_store.get_version
+        ),
+        load_snapshot_async=partial(asyncio.to_thread, _load_shared_snapshot),
+    )
+else:
+    snapshot_cache = SnapshotCache(
+        get_version=_query_snapshot_version,
+        load_snapshot=_query_snapshot,
+        poll_seconds=app_settings.READ_CACHE_POLL_SECONDS,
+        get_version_async=_query_snapshot_version_async,
+        load_snapshot_async=_query_snapshot_async,
+    )
 
 
 def filter_out_single_sessions(
     court_sessions: list[schemas.CourtSession],
 ) -> list[schemas.CourtSession]:
     """
-    Filter out court sessions that don't have another available session immediately after at the same court/venue.
+    Merges court sessions into blocks of at least two hours at the same court.
     """
-    # Group court sessions by venue and start time
-    court_sessions_grouped = {}
-    for court_session in court_sessions:
-        key = (court_session.venue, court_session.start_time)
-        if key not in court_sessions_grouped:
-            court_sessions_grouped[key] = []
-        court_sessions_grouped[key].append(court_session)
-
-    keys_to_remove = set()
-    for key in court_sessions_grouped.keys():
-        hour_after = key[1] + timedelta(hours=1)
-        key_hour_after = (key[0], hour_after)
-        if key_hour_after not in court_sessions_grouped:
-            keys_to_remove.add(key)
-
-    for key in keys_to_remove:
-        del court_sessions_grouped[key]
-
-    court_sessions = [
-        court_session
-        for court_sessions_list in court_sessions_grouped.values()
-        for court_session in court_sessions_list
+    return find_available_blocks(
+        court_sessions, timedelta(minutes=DOUBLE_HEADER_MINUTES)
+    )
+
+
+def _court_start_key(court_session: schemas.CourtSession):
+    return (
+        court_session.venue,
+        court_session.label is None,
+        court_session.label or "",
+        court_session.start_time,
+    )
+
+
+class _BlockMerger:
+    """Merges court sessions sorted by court and start time into blocks"""
+
+    def __init__(self, min_duration: timedelta):
+        self.min_duration = min_duration
+        self.block = None
+
+    def _complete(
+        self, block: schemas.CourtSession | None
+    ) -> schemas.CourtSession | None:
+        if (
+            block is None
+            or block.end_time - block.start_time < self.min_duration
+        ):
+            return None
+
+        return block
+
+    def add(
+        self, court_session: schemas.CourtSession
+    ) -> schemas.CourtSession | None:
+        """Adds the next session, returning the previous block if it ended
+        and lasts at least the minimum duration"""
+        block = self.block
+        if (
+            block is not None
+            and (court_session.venue, court_session.label)
+            == (block.venue, block.label)
+            and court_session.start_time <= block.end_time
+        ):
+            block.end_time = max(block.end_time, court_session.end_time)
+            block.cost += court_session.cost
+            return None
+
+        self.block = court_session.model_copy()
+        return self._complete(block)
+
+    def finish(self) -> schemas.CourtSession | None:
+        block, self.block = self.block, None
+        return self._complete(block)
+
+
+def find_available_blocks(
+    court_sessions: list[schemas.CourtSession],
+    min_duration: timedelta,
+) -> list[schemas.CourtSession]:
+    """Merges contiguous court sessions at the same court into blocks
+
+    The sessions are sorted by court and start time and then merged in a
+    single pass, so slots of any length are handled in O(n log n).
+
+    Args:
+        court_sessions (list[schemas.CourtSession]): The available sessions
+        min_duration (timedelta): The shortest block to return
+
+    Returns:
+        list[schemas.CourtSession]: The blocks lasting at least
+            `min_duration`, ordered by start time
+    """
+    merger = _BlockMerger(min_duration)
+    blocks = [
+        block
+        for court_session in sorted(court_sessions, key=_court_start_key)
+        if (block := merger.add(court_session)) is not None
     ]
 
-    return court_sessions
+    if (block := merger.finish()) is not None:
+        blocks.append(block)
+
+    return sorted(blocks, key=attrgetter("start_time"))
@@ -1,30 +1,25 @@
+import asyncio
 import datetime
+import functools
 import json
 import logging
-import os
 from typing import Any
 
-import geckodriver_autoinstaller
-from celery import Celery, group
+import redis
+from celery import chord, group
 from celery.schedules import crontab
 
-from courtbooker import models
+from courtbooker import churn, models, persistence, scheduler, util
+from courtbooker.celery_app import celery
 from courtbooker.database import DbSession
+from courtbooker.mapper import geocode_missing_venues
+from courtbooker.refresh_status import refresh_registry
 from courtbooker.scraper import better as better_scraper
 from courtbooker.scraper import clubspark as clubspark_scraper
 from courtbooker.scraper import tower_hamlets as tower_hamlets_scraper
+from courtbooker.scraper.common import OnPageDone, PageScrapeError
 from courtbooker.settings import app_settings
 
-geckodriver_autoinstaller.install()
-celery = Celery(__name__)
-celery.conf.broker_url = os.environ.get(
-    "CELERY_BROKER_URL", "redis://localhost:6379"
-)
-celery.conf.result_backend = os.environ.get(
-    "CELERY_RESULT_BACKEND", "redis://localhost:6379"
-)
-
-
 SCRAPERS = {
     models.DataSource.BETTER: better_scraper,
     models.DataSource.CLUBSPARK: clubspark_scraper,
@@ -72,41 +67,79 @@ def _fetch_or_create_venues(
     return venues
 
 
+def _get_date_range(look_ahead_days: int) -> list[datetime.date]:
+    today = datetime.datetime.today().date()
+    return [today + datetime.timedelta(days=i) for i in range(look_ahead_days)]
+
+
 def get_all_available_sessions(
     data_source: models.DataSource,
     look_ahead_days: int,
     venues: list[models.Venue],
     _scraper: Any,
+    on_page_done: OnPageDone | None = None,
 ) -> list[models.CourtSession]:
-    today = datetime.datetime.today().date()
-    date_range = [
-        today + datetime.timedelta(days=i) for i in range(look_ahead_days)
-    ]
+    date_range = _get_date_range(look_ahead_days)
 
     logging.info(
         f"Scraping {data_source} for {date_range[0]} to {date_range[-1]}"
     )
 
-    courts = _scraper.get_available_sessions(venues, date_range)
+    courts = _scraper.get_available_sessions(
+        venues, date_range, on_page_done=on_page_done
+    )
 
     logging.info(f"Found {len(courts)} courts")
 
     return courts
 
 
-@celery.task(name="scrape_sessions")
-def scrape_sessions(data_source_name: str):
-    start_time = datetime.datetime.now()
+async def get_all_available_sessions_async(
+    data_source: models.DataSource,
+    look_ahead_days: int,
+    venues: list[models.Venue],
+    _scraper: Any,
+    on_page_done: OnPageDone | None = None,
+) -> list[models.CourtSession]:
+    date_range = _get_date_range(look_ahead_days)
 
-    data_source = models.DataSource(data_source_name)
+    logging.info(
+        f"Scraping {data_source} asynchronously for {date_range[0]} to {date_range[-1]}"
+    )
+
+    courts = await _scraper.get_available_sessions_async(
+        venues, date_range, on_page_done=on_page_done
+    )
+
+    logging.info(f"Found {len(courts)} courts")
+
+    return courts
+
+
+def _progress_callback(
+    data_source: models.DataSource, refresh_id: str | None
+) -> OnPageDone | None:
+    """Counts each page towards the refresh's progress, if there is one"""
+    if refresh_id is None:
+        return None
+
+    return functools.partial(
+        refresh_registry.add_pages_done, refresh_id, data_source.value, 1
+    )
+
+
+def _get_venues_to_scrape(
+    data_source: models.DataSource,
+) -> list[models.Venue] | None:
+    """Gets the venues to scrape for a data source, or None if it is disabled"""
     data_source_settings = app_settings.data_sources[data_source.value]
     logging.info(
         f"Settings:{json.dumps(data_source_settings.model_dump(), indent=2)}"
     )
 
     if data_source_settings.LOOK_AHEAD_DAYS <= 0:
-        logging.info(f"Skipping {data_source_name}")
-        return
+        logging.info(f"Skipping {data_source.value}")
+        return None
 
     venues = _fetch_or_create_venues(data_source, data_source_settings.VENUES)
 
@@ -117,68 +150,605 @@ def scrape_sessions(data_source_name: str):
 
     logging.info(f"Scraping {data_source} for {len(venues)} venues")
 
-    courts = get_all_available_sessions(
+    return venues
+
+
+def _get_slices(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    failed_pages: list[tuple[datetime.date, models.Venue]] = (),
+) -> list[scheduler.Slice]:
+    """The slices of a full scrape, without any pages that failed"""
+    date_range = _get_date_range(
+        app_settings.data_sources[data_source.value].LOOK_AHEAD_DAYS
+    )
+    failed = {(venue.path, date) for date, venue in failed_pages}
+
+    return [
+        scheduler.Slice(data_source, venue.path, date)
+        for venue in venues
+        for date in date_range
+        if (venue.path, date) not in failed
+    ]
+
+
+def _save_scraped_pages(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    courts: list[models.CourtSession],
+    start_time: datetime.datetime,
+    failed_pages: list[tuple[datetime.date, models.Venue]],
+) -> int | None:
+    """Saves a full scrape, leaving out the pages that failed
+
+    The sessions on failed pages are kept as they were, rather than closed
+    as if they had all been booked.
+    """
+    if not failed_pages:
+        return _save_scrape_task(data_source, venues, courts, start_time)
+
+    logging.warning(
+        f"Saving {data_source} without {len(failed_pages)} failed pages"
+    )
+    return _save_scrape_task(
         data_source,
-        look_ahead_days=data_source_settings.LOOK_AHEAD_DAYS,
+        venues,
+        courts,
+        start_time,
+        slices=_get_slices(data_source, venues, failed_pages),
+        partial=True,
+    )
+
+
+def _save_scrape_task(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    courts: list[models.CourtSession],
+    start_time: datetime.datetime,
+    slices: list[scheduler.Slice] | None = None,
+    partial: bool = False,
+) -> int | None:
+    if slices is None:
+        slices = _get_slices(data_source, venues)
+
+    if not slices:
+        logging.warning(f"Nothing was scraped for {data_source}")
+        return None
+
+    # Saving assigns the new venues their ids
+    has_new_venues = any(venue.id is None for venue in venues)
+
+    if partial:
+        # Only some venues and dates were scraped, so the rest are kept
+        task_id = persistence.save_incremental(
+            data_source,
+            venues,
+            courts,
+            start_time,
+            slices={(slice_.venue_path, slice_.date) for slice_ in slices},
+        )
+    elif app_settings.PERSISTENCE_MODE == "incremental":
+        task_id = persistence.save_incremental(
+            data_source, venues, courts, start_time
+        )
+    else:
+        task_id = persistence.save_snapshot(
+            data_source, venues, courts, start_time
+        )
+
+    scheduler.mark_slices_scraped(slices, start_time)
+
+    if has_new_venues:
+        # New venues need coordinates before they can be found by location
+        geocode_missing_venues()
+
+    if app_settings.READ_CACHE_BACKEND == "redis":
+        try:
+            util.publish_snapshot([data_source])
+        except redis.RedisError:
+            # Replicas keep serving the previous snapshot until the next one
+            logging.exception(f"Failed to publish {data_source} snapshot")
+
+    return task_id
+
+
+@celery.task(name="scrape_sessions")
+def scrape_sessions(data_source_name: str, refresh_id: str | None = None):
+    start_time = datetime.datetime.now()
+
+    data_source = models.DataSource(data_source_name)
+    venues = _get_venues_to_scrape(data_source)
+    if venues is None:
+        return
+
+    look_ahead_days = app_settings.data_sources[
+        data_source.value
+    ].LOOK_AHEAD_DAYS
+    pages_planned = len(venues) * look_ahead_days
+    if refresh_id is not None:
+        refresh_registry.start_source(
+            refresh_id, data_source.value, pages_planned
+        )
+
+    scrape_kwargs = dict(
+        look_ahead_days=look_ahead_days,
         venues=venues,
         _scraper=SCRAPERS[data_source],
+        on_page_done=_progress_callback(data_source, refresh_id),
     )
 
-    end_time = datetime.datetime.now()
+    try:
+        try:
+            if app_settings.SCRAPE_MODE == "async":
+                courts = asyncio.run(
+                    get_all_available_sessions_async(
+                        data_source, **scrape_kwargs
+                    )
+                )
+            else:
+                courts = get_all_available_sessions(
+                    data_source, **scrape_kwargs
+                )
+            failed_pages = []
+        except PageScrapeError as e:
+            courts, failed_pages = e.court_sessions, e.failed_pages
 
-    task = models.ScrapeTask(
-        time_started=start_time,
-        time_finished=end_time,
-        data_source=data_source,
-        params=app_settings.model_dump(),
-        court_sessions=courts,
-    )
-    for court in courts:
-        court.task = task
+        task_id = _save_scraped_pages(
+            data_source, venues, courts, start_time, failed_pages
+        )
+    except Exception:
+        if refresh_id is not None:
+            refresh_registry.finish_source(
+                refresh_id, data_source.value, failed=True
+            )
+        raise
 
-    with DbSession() as db_session:
-        db_session.add_all(venues)
-        db_session.add_all(courts)
-        db_session.add(task)
-        task_id = task.id
+    if refresh_id is not None:
+        refresh_registry.finish_source(
+            refresh_id, data_source.value, failed=bool(failed_pages)
+        )
 
     return task_id
 
 
-@celery.task(name="court_refresh")
-def court_refresh_task():
-    scrape_task_group = group(
+@celery.task(name="scrape_all_sessions")
+def scrape_all_sessions(refresh_id: str | None = None) -> dict[str, int]:
+    """Scrapes every data source concurrently on a single event loop"""
+    start_time = datetime.datetime.now()
+
+    venues_to_scrape = {
+        data_source: venues
+        for data_source in models.DataSource
+        if (venues := _get_venues_to_scrape(data_source)) is not None
+    }
+
+    if refresh_id is not None:
+        for data_source, venues in venues_to_scrape.items():
+            refresh_registry.start_source(
+                refresh_id,
+                data_source.value,
+                len(venues)
+                * app_settings.data_sources[data_source.value].LOOK_AHEAD_DAYS,
+            )
+
+    async def _scrape_all():
+        return await asyncio.gather(
+            *(
+                get_all_available_sessions_async(
+                    data_source,
+                    look_ahead_days=app_settings.data_sources[
+                        data_source.value
+                    ].LOOK_AHEAD_DAYS,
+                    venues=venues,
+                    _scraper=SCRAPERS[data_source],
+                    on_page_done=_progress_callback(data_source, refresh_id),
+                )
+                for data_source, venues in venues_to_scrape.items()
+            ),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(_scrape_all())
+
+    task_ids = {}
+    for (data_source, venues), courts in zip(
+        venues_to_scrape.items(), results
+    ):
+        failed_pages = []
+        if isinstance(courts, PageScrapeError):
+            courts, failed_pages = courts.court_sessions, courts.failed_pages
+        elif isinstance(courts, Exception):
+            logging.error(f"Failed to scrape {data_source}")
+            logging.exception(courts)
+            if refresh_id is not None:
+                refresh_registry.finish_source(
+                    refresh_id, data_source.value, failed=True
+                )
+            continue
+
+        task_id = _save_scraped_pages(
+            data_source, venues, courts, start_time, failed_pages
+        )
+        if task_id is not None:
+            task_ids[data_source.value] = task_id
+        if refresh_id is not None:
+            refresh_registry.finish_source(
+                refresh_id, data_source.value, failed=bool(failed_pages)
+            )
+
+    return task_ids
+
+
+def _chunk_date_range(
+    date_range: list[datetime.date], shard_days: int
+) -> list[list[datetime.date]]:
+    return [
+        date_range[i : i + shard_days]
+        for i in range(0, len(date_range), shard_days)
+    ]
+
+
+def _serialize_court_sessions(
+    courts: list[models.CourtSession],
+) -> list[list[str | None]]:
+    # Task results are sent through the result backend as JSON
+    return [
         [
-            scrape_sessions.s(data_source.value)
-            for data_source in models.DataSource
+            court.venue.path,
+            court.label,
+            str(court.cost),
+            court.start_time.isoformat(),
+            court.end_time.isoformat(),
+            court.url,
         ]
+        for court in courts
+    ]
+
+
+def _deserialize_court_sessions(
+    rows: list[list[str | None]],
+    venues_by_path: dict[str, models.Venue],
+) -> list[models.CourtSession]:
+    return [
+        models.CourtSession(
+            venue=venues_by_path[path],
+            label=label,
+            cost=cost,
+            start_time=datetime.datetime.fromisoformat(start_time),
+            end_time=datetime.datetime.fromisoformat(end_time),
+            url=url,
+        )
+        for path, label, cost, start_time, end_time, url in rows
+    ]
+
+
+@celery.task(
+    name="scrape_shard",
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=app_settings.SCRAPE_SHARD_MAX_RETRIES,
+)
+def scrape_shard(
+    self,
+    data_source_name: str,
+    venue_path: str,
+    dates: list[str],
+    refresh_id: str | None = None,
+) -> dict[str, list]:
+    """Scrapes a single venue for a chunk of dates
+
+    Retried on its own when any page fails, without re-running the other
+    shards. Once out of retries, the pages that still fail are returned
+    alongside the sessions, so the merge can leave them out of the save.
+    """
+    data_source = models.DataSource(data_source_name)
+    venues = _fetch_or_create_venues(data_source, [venue_path])
+    date_range = [datetime.date.fromisoformat(date) for date in dates]
+    scraper = SCRAPERS[data_source]
+
+    logging.info(
+        f"Scraping {data_source} {venue_path} for {date_range[0]} to {date_range[-1]}"
     )
 
-    scrape_task_group.apply_async()
+    on_page_done = _progress_callback(data_source, refresh_id)
 
+    try:
+        if app_settings.SCRAPE_MODE == "async":
+            courts = asyncio.run(
+                scraper.get_available_sessions_async(
+                    venues, date_range, on_page_done=on_page_done
+                )
+            )
+        else:
+            courts = scraper.get_available_sessions(
+                venues, date_range, on_page_done=on_page_done
+            )
+        failed_pages = []
+    except PageScrapeError as e:
+        if self.request.retries < self.max_retries:
+            if refresh_id is not None:
+                # Every page was tried, and the retry counts them again
+                refresh_registry.add_pages_done(
+                    refresh_id, data_source.value, -len(dates)
+                )
+            raise
+        courts, failed_pages = e.court_sessions, e.failed_pages
 
-@celery.on_after_configure.connect
-def setup_periodic_tasks(sender, **kwargs):
-    sender.add_periodic_task(
-        crontab(hour="22", minute="0"),
-        court_refresh_task.s(),
+    logging.info(
+        f"Found {len(courts)} courts, {len(failed_pages)} pages failed"
     )
 
+    return {
+        "courts": _serialize_court_sessions(courts),
+        "failed": [
+            [venue.path, date.isoformat()] for date, venue in failed_pages
+        ],
+    }
 
-def get_running_task_id(task_name: str) -> str | None:
-    """
-    Get the task id of a running task with the given name.
+
+@celery.task(name="merge_scrape_shards")
+def merge_scrape_shards(
+    shard_results: list[dict[str, list]],
+    data_source_name: str,
+    slices: list[tuple[str, str]],
+    start_time: str,
+    partial: bool = False,
+    refresh_id: str | None = None,
+) -> int | None:
+    """Saves the sessions from every shard of a data source as one task
+
+    Pages that failed are left out of the save, so their sessions are kept
+    rather than closed, and the refresh is marked as failed.
 
     Args:
-        task_name (str): The name of the task to find
+        shard_results (list[dict[str, list]]): The serialized sessions
+            scraped by each shard, and the (venue path, ISO date) pages
+            that failed
+        data_source_name (str): The data source scraped
+        slices (list[tuple[str, str]]): The (venue path, ISO date) pairs
+            the shards scraped
+        start_time (str): When the scrape started, in ISO format
+        partial (bool): Whether only some of the data source's venues and
+            dates were scraped
+        refresh_id (str | None): The refresh the shards are part of
 
     Returns:
-        str | None: The task id if the task is running, otherwise None
+        int | None: The id of the saved task, if any page was scraped
     """
-    active_tasks = celery.control.inspect().active()
-    for _, running_tasks in active_tasks.items():
-        for task in running_tasks:
-            if task["name"] == task_name:
-                return task["id"]
+    data_source = models.DataSource(data_source_name)
+    venue_paths = list(dict.fromkeys(venue_path for venue_path, _ in slices))
+    venues = _fetch_or_create_venues(data_source, venue_paths)
+    venues_by_path = {venue.path: venue for venue in venues}
+
+    courts = [
+        court
+        for shard_result in shard_results
+        for court in _deserialize_court_sessions(
+            shard_result["courts"], venues_by_path
+        )
+    ]
+    failed = {
+        tuple(page)
+        for shard_result in shard_results
+        for page in shard_result["failed"]
+    }
 
-    return None
+    logging.info(
+        f"Merged {len(shard_results)} {data_source} shards with "
+        f"{len(courts)} courts and {len(failed)} failed pages"
+    )
+
+    task_id = _save_scrape_task(
+        data_source,
+        venues,
+        courts,
+        datetime.datetime.fromisoformat(start_time),
+        slices=[
+            scheduler.Slice(
+                data_source, venue_path, datetime.date.fromisoformat(date)
+            )
+            for venue_path, date in slices
+            if (venue_path, date) not in failed
+        ],
+        partial=partial or bool(failed),
+    )
+
+    if refresh_id is not None:
+        refresh_registry.finish_source(
+            refresh_id, data_source.value, failed=bool(failed)
+        )
+
+    return task_id
+
+
+@celery.task(name="refresh_source_failed")
+def refresh_source_failed(data_source_name: str, refresh_id: str):
+    refresh_registry.finish_source(refresh_id, data_source_name, failed=True)
+
+
+def _scrape_chord(
+    data_source: models.DataSource,
+    dates_by_venue: dict[str, list[datetime.date]],
+    start_time: datetime.datetime,
+    partial: bool = False,
+    refresh_id: str | None = None,
+) -> chord:
+    """Builds a chord scraping each venue and chunk of days in parallel"""
+    shard_days = app_settings.data_sources[data_source.value].SHARD_DAYS
+
+    shards = [
+        scrape_shard.s(
+            data_source.value,
+            venue_path,
+            [date.isoformat() for date in dates],
+            refresh_id=refresh_id,
+        )
+        for venue_path, venue_dates in dates_by_venue.items()
+        for dates in _chunk_date_range(venue_dates, shard_days)
+    ]
+    slices = [
+        (venue_path, date.isoformat())
+        for venue_path, venue_dates in dates_by_venue.items()
+        for date in venue_dates
+    ]
+
+    merge = merge_scrape_shards.s(
+        data_source.value,
+        slices,
+        start_time.isoformat(),
+        partial=partial,
+        refresh_id=refresh_id,
+    )
+    if refresh_id is not None:
+        merge = merge.on_error(
+            refresh_source_failed.si(data_source.value, refresh_id)
+        )
+
+    return chord(shards, merge)
+
+
+def _shard_scrape(
+    data_source: models.DataSource,
+    venues: list[models.Venue],
+    start_time: datetime.datetime,
+    refresh_id: str | None = None,
+) -> chord:
+    date_range = _get_date_range(
+        app_settings.data_sources[data_source.value].LOOK_AHEAD_DAYS
+    )
+
+    return _scrape_chord(
+        data_source,
+        {venue.path: date_range for venue in venues},
+        start_time,
+        refresh_id=refresh_id,
+    )
+
+
+@celery.task(name="freshness_tick")
+def freshness_tick() -> int:
+    """Queues scrapes for the venues and dates past their target staleness"""
+    now = datetime.datetime.now()
+    scheduler.delete_past_slices(now.date())
+
+    candidates = scheduler.get_candidate_slices(now.date())
+    churn_factors = churn.load_churn_factors()
+
+    slices = scheduler.select_stale_slices(
+        candidates,
+        scheduler.load_slice_states(),
+        now,
+        budget=app_settings.FRESHNESS_SCRAPE_BUDGET,
+        churn_factors=churn_factors,
+    )
+
+    savings = scheduler.estimate_scrape_savings(
+        candidates, churn_factors, now.date()
+    )
+    logging.info(
+        f"Adaptive schedule needs {savings['adaptive_scrapes_per_day']:.0f} "
+        f"scrapes a day, {savings['saved_fraction']:.0%} fewer than the "
+        f"{savings['flat_scrapes_per_day']:.0f} of the flat schedule"
+    )
+
+    if not slices:
+        return 0
+
+    scheduler.mark_slices_queued(slices, now)
+
+    for data_source, data_source_slices in scheduler.group_by_data_source(
+        slices
+    ).items():
+        logging.info(
+            f"Queueing {len(data_source_slices)} stale {data_source} slices"
+        )
+
+        dates_by_venue = {}
+        for slice_ in data_source_slices:
+            dates_by_venue.setdefault(slice_.venue_path, []).append(
+                slice_.date
+            )
+
+        _scrape_chord(
+            data_source,
+            {
+                venue_path: sorted(dates)
+                for venue_path, dates in dates_by_venue.items()
+            },
+            now,
+            partial=True,
+        ).apply_async()
+
+    return len(slices)
+
+
+@celery.task(name="court_refresh", bind=True)
+def court_refresh_task(self):
+    refresh_id = self.request.id
+    running_refresh_id = refresh_registry.claim(refresh_id)
+    if running_refresh_id != refresh_id:
+        logging.info(f"Refresh {running_refresh_id} is already running")
+        return
+
+    venues_to_scrape = {
+        data_source: venues
+        for data_source in models.DataSource
+        if (venues := _get_venues_to_scrape(data_source)) is not None
+    }
+    refresh_registry.start(
+        refresh_id, [data_source.value for data_source in venues_to_scrape]
+    )
+
+    if app_settings.SCRAPE_SHARDED:
+        start_time = datetime.datetime.now()
+        for data_source, venues in venues_to_scrape.items():
+            refresh_registry.start_source(
+                refresh_id,
+                data_source.value,
+                len(venues)
+                * app_settings.data_sources[data_source.value].LOOK_AHEAD_DAYS,
+            )
+            _shard_scrape(
+                data_source, venues, start_time, refresh_id=refresh_id
+            ).apply_async()
+        return
+
+    if app_settings.SCRAPE_MODE == "async":
+        scrape_all_sessions.delay(refresh_id=refresh_id)
+        return
+
+    scrape_task_group = group(
+        [
+            scrape_sessions.s(data_source.value, refresh_id=refresh_id)
+            for data_source in venues_to_scrape
+        ]
+    )
+
+    scrape_task_group.apply_async()
+
+
+@celery.task(name="geocode_venues")
+def geocode_venues_task():
+    """Retries geocoding the venues that failed when they were added"""
+    geocode_missing_venues()
+
+
+@celery.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    sender.add_periodic_task(
+        crontab(hour="4", minute="0"),
+        geocode_venues_task.s(),
+    )
+
+    if app_settings.FRESHNESS_SCHEDULER_ENABLED:
+        sender.add_periodic_task(
+            app_settings.FRESHNESS_TICK_SECONDS,
+            freshness_tick.s(),
+        )
+        return
+
+    sender.add_periodic_task(
+        crontab(hour="22", minute="0"),
+        court_refresh_task.s(),
+    )
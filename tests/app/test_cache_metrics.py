@@ -0,0 +1,23 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from courtbooker.app.api import router
+from courtbooker.cache import TTLCache
+
+
+def test_cache_metrics_reports_location_cache_counters():
+    app = FastAPI()
+    app.include_router(router)
+    cache = TTLCache("test", max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    with patch("courtbooker.app.api.location_cache", cache):
+        response = TestClient(app).get("/api/metrics/cache")
+
+    assert response.json() == {
+        "location": {"size": 1, "hits": 1, "redis_hits": 0, "misses": 1}
+    }
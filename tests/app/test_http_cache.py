@@ -0,0 +1,100 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from courtbooker import compact
+from courtbooker.app.api import router
+from courtbooker.app.http_cache import ConditionalGetMiddleware
+
+LAST_MODIFIED = datetime(2023, 1, 2, 9, 30)
+SEARCH = "/api/courts?venues=b&venues=a&only_double_headers=false"
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ConditionalGetMiddleware, paths={"/api/courts"})
+    return TestClient(app)
+
+
+def _patch_versions(version=(("better", 1), ("clubspark", 2))):
+    return (
+        patch(
+            "courtbooker.app.http_cache.get_results_version_async",
+            AsyncMock(return_value=version),
+        ),
+        patch(
+            "courtbooker.app.http_cache.get_latest_update_time_async",
+            AsyncMock(return_value=LAST_MODIFIED),
+        ),
+    )
+
+
+def test_unchanged_search_is_not_modified():
+    client = _client()
+    get_court_sessions = AsyncMock(return_value=[])
+    patch_version, patch_update_time = _patch_versions()
+
+    with patch_version, patch_update_time, patch(
+        "courtbooker.app.api.get_court_sessions_async", get_court_sessions
+    ):
+        response = client.get(SEARCH)
+        # The same search with its parameters in another order
+        not_modified = client.get(
+            "/api/courts?only_double_headers=false&venues=b&venues=a",
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        since = client.get(
+            SEARCH,
+            headers={"If-Modified-Since": response.headers["last-modified"]},
+        )
+        compact_response = client.get(
+            SEARCH,
+            headers={
+                "Accept": compact.COMPACT_JSON,
+                "If-None-Match": response.headers["etag"],
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert not_modified.status_code == since.status_code == 304
+    assert not_modified.headers["etag"] == response.headers["etag"]
+    assert compact_response.status_code == 200
+    assert get_court_sessions.await_count == 2
+
+
+def test_new_scrape_changes_etag():
+    client = _client()
+    etags = []
+
+    for version in [(("better", 1),), (("better", 2),)]:
+        patch_version, patch_update_time = _patch_versions(version)
+        with patch_version, patch_update_time, patch(
+            "courtbooker.app.api.get_court_sessions_async",
+            AsyncMock(return_value=[]),
+        ):
+            response = client.get(
+                "/api/courts",
+                headers={"If-None-Match": etags[-1] if etags else ""},
+            )
+
+        assert response.status_code == 200
+        etags.append(response.headers["etag"])
+
+    assert etags[0] != etags[1]
+
+
+def test_error_messages_are_not_cached():
+    client = _client()
+    patch_version, patch_update_time = _patch_versions()
+
+    with patch_version, patch_update_time:
+        response = client.get("/api/courts?cursor=invalid")
+
+    assert response.status_code == 200
+    assert response.json()["message"].startswith("Invalid cursor")
+    assert "etag" not in response.headers
+    assert "cache-control" not in response.headers
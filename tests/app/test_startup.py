@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+# Run in a fresh interpreter, as other tests have already imported everything
+IMPORT_APP = """
+import sys
+
+from courtbooker import database
+from courtbooker.app import fastapi
+
+assert "courtbooker.worker" not in sys.modules
+assert "geckodriver_autoinstaller" not in sys.modules
+assert database.get_engine.cache_info().currsize == 0
+assert database.get_async_engine.cache_info().currsize == 0
+"""
+
+
+def test_importing_the_app_has_no_side_effects():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP], capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,112 @@
+import asyncio
+from collections import namedtuple
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import orjson
+
+from courtbooker import schemas
+from courtbooker.app.streaming import encode_json_array, encode_ndjson
+from courtbooker.cache import IndexedSnapshot, Snapshot
+from courtbooker.settings import app_settings
+from courtbooker.util import _to_stream_batches, stream_court_sessions_async
+
+Row = namedtuple(
+    "Row", ["venue", "label", "cost", "start_time", "end_time", "url"]
+)
+
+
+def _row(hour: int, label: str = "Court 1") -> Row:
+    start_time = datetime(2023, 1, 2, hour)
+    return Row(
+        "venue1",
+        label,
+        "5.00",
+        start_time,
+        start_time + timedelta(hours=1),
+        "test-url",
+    )
+
+
+async def _partitions(*partitions):
+    for partition in partitions:
+        yield partition
+
+
+async def _collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_encode_ndjson():
+    batches = _to_stream_batches(
+        _partitions([_row(7), _row(8)], [_row(18)]),
+        exclude_working_hours=True,
+        min_duration=None,
+    )
+
+    lines = asyncio.run(_collect(encode_ndjson(batches))).splitlines()
+
+    assert [orjson.loads(line)["start_time"] for line in lines] == [
+        "2023-01-02T07:00:00",
+        "2023-01-02T18:00:00",
+    ]
+
+
+def test_encode_json_array_merges_blocks_across_partitions():
+    batches = _to_stream_batches(
+        _partitions(
+            [_row(9), _row(10)],
+            [_row(11), _row(15), _row(9, "Court 2")],
+            [],
+        ),
+        exclude_working_hours=False,
+        min_duration=timedelta(hours=2),
+    )
+
+    response = orjson.loads(asyncio.run(_collect(encode_json_array(batches))))
+
+    assert response == {
+        "message": "Success",
+        "courts": [
+            {
+                "venue": "venue1",
+                "label": "Court 1",
+                "cost": "15.00",
+                "start_time": "2023-01-02T09:00:00",
+                "end_time": "2023-01-02T12:00:00",
+                "url": "test-url",
+            }
+        ],
+    }
+
+
+def test_encode_json_array_without_rows():
+    batches = _to_stream_batches(
+        _partitions([]), exclude_working_hours=False, min_duration=None
+    )
+
+    response = orjson.loads(asyncio.run(_collect(encode_json_array(batches))))
+
+    assert response == {"message": "Success", "courts": []}
+
+
+def test_stream_court_sessions_reads_the_snapshot_when_cached():
+    court_sessions = [
+        schemas.CourtSession(**_row(hour)._asdict()) for hour in (9, 7, 8)
+    ]
+    snapshot = IndexedSnapshot(1, Snapshot(court_sessions, ["venue1"], None))
+    snapshot_cache = AsyncMock()
+    snapshot_cache.get_async.return_value = snapshot
+
+    with patch.object(app_settings, "READ_CACHE_ENABLED", True), patch.object(
+        app_settings, "STREAM_BATCH_SIZE", 2
+    ), patch("courtbooker.util.snapshot_cache", snapshot_cache):
+        lines = asyncio.run(
+            _collect(encode_ndjson(stream_court_sessions_async()))
+        ).splitlines()
+
+    assert [orjson.loads(line)["start_time"] for line in lines] == [
+        "2023-01-02T07:00:00",
+        "2023-01-02T08:00:00",
+        "2023-01-02T09:00:00",
+    ]
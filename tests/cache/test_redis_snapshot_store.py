@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from courtbooker.cache import (
+    RedisSnapshotStore,
+    decode_court_sessions,
+    encode_court_sessions,
+)
+from courtbooker.schemas import CourtSession
+
+
+def _session(venue: str, hour: int) -> CourtSession:
+    start_time = datetime(2022, 1, 1, hour)
+    return CourtSession(
+        venue=venue,
+        label=None,
+        cost="12.50",
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        url="test-url",
+    )
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+
+    def execute(self):
+        pass
+
+    def pipeline(self):
+        pipeline = MagicMock()
+        pipeline.__enter__.return_value = self
+        return pipeline
+
+
+def test_encode_decode_court_sessions():
+    court_sessions = [_session("venue1", 8), _session("venue2", 9)]
+
+    decoded, ids = decode_court_sessions(
+        encode_court_sessions(court_sessions, [3, 4])
+    )
+
+    assert decoded == court_sessions
+    assert decoded[0].cost == Decimal("12.50")
+    assert ids == [3, 4]
+
+
+def test_redis_snapshot_store_save_and_load():
+    store = RedisSnapshotStore(FakeRedis())
+    assert store.get_version() == 0
+    assert store.load(["better", "clubspark"]) is None
+
+    store.save(
+        {"better": ([_session("venue1", 8)], [1])},
+        venues=["venue1"],
+        latest_update_time=None,
+    )
+    assert store.get_version() == 1
+    assert store.load(["better", "clubspark"]) is None
+
+    store.save(
+        {"clubspark": ([_session("venue2", 9)], [2])},
+        venues=["venue1", "venue2"],
+        latest_update_time=datetime(2022, 1, 1),
+    )
+    snapshot = store.load(["better", "clubspark"])
+
+    assert store.get_version() == 2
+    assert [
+        court_session.venue for court_session in snapshot.court_sessions
+    ] == ["venue1", "venue2"]
+    assert snapshot.court_session_ids == [1, 2]
+    assert snapshot.venues == ["venue1", "venue2"]
+    assert snapshot.latest_update_time == datetime(2022, 1, 1)
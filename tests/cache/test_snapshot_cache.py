@@ -0,0 +1,266 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from courtbooker.cache import IndexedSnapshot, Snapshot, SnapshotCache
+from courtbooker.pagination import decode_cursor, paginate
+from courtbooker.schemas import CourtSession
+from courtbooker.util import find_available_blocks, is_working_hours
+
+
+def _session(
+    venue: str, time: str, label: str | None = "test-label", minutes: int = 60
+) -> CourtSession:
+    start_time = datetime.strptime(time, "%Y-%m-%dT%H:%M")
+    return CourtSession(
+        venue=venue,
+        label=label,
+        cost=10,
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=minutes),
+        url="test-url",
+    )
+
+
+SNAPSHOT = Snapshot(
+    court_sessions=[
+        _session("venue1", "2022-01-01T10:00"),
+        _session("venue2", "2022-01-01T09:00"),
+        _session("venue1", "2022-01-01T08:00"),
+        _session("venue3", "2022-01-01T11:00"),
+        _session("venue2", "2022-01-01T12:00"),
+    ],
+    venues=["venue1", "venue2", "venue3"],
+    latest_update_time=datetime(2022, 1, 1),
+)
+
+
+@pytest.mark.parametrize(
+    "venues, start_time_after, start_time_before, expected",
+    [
+        (
+            None,
+            None,
+            None,
+            [
+                ("venue1", 8),
+                ("venue2", 9),
+                ("venue1", 10),
+                ("venue3", 11),
+                ("venue2", 12),
+            ],
+        ),
+        (
+            ["venue1", "venue2"],
+            None,
+            None,
+            [
+                ("venue1", 8),
+                ("venue2", 9),
+                ("venue1", 10),
+                ("venue2", 12),
+            ],
+        ),
+        (
+            None,
+            datetime(2022, 1, 1, 9),
+            datetime(2022, 1, 1, 11),
+            [("venue2", 9), ("venue1", 10), ("venue3", 11)],
+        ),
+        (
+            ["venue2", "unknown"],
+            datetime(2022, 1, 1, 10),
+            None,
+            [
+                ("venue2", 12),
+            ],
+        ),
+    ],
+)
+def test_indexed_snapshot_get_court_sessions(
+    venues, start_time_after, start_time_before, expected
+):
+    snapshot = IndexedSnapshot(1, SNAPSHOT)
+
+    court_sessions = snapshot.get_court_sessions(
+        venues=venues,
+        start_time_after=start_time_after,
+        start_time_before=start_time_before,
+    )
+
+    assert [
+        (court_session.venue, court_session.start_time.hour)
+        for court_session in court_sessions
+    ] == expected
+
+
+def test_snapshot_cache_reloads_on_new_version():
+    get_version = MagicMock(side_effect=[1, 1, 2])
+    load_snapshot = MagicMock(return_value=SNAPSHOT)
+    cache = SnapshotCache(get_version, load_snapshot, poll_seconds=0)
+
+    assert cache.get().version == 1
+    assert cache.get().version == 1
+    assert load_snapshot.call_count == 1
+
+    assert cache.get().version == 2
+    assert load_snapshot.call_count == 2
+
+
+def test_snapshot_cache_polls_at_most_every_poll_seconds():
+    get_version = MagicMock(return_value=1)
+    cache = SnapshotCache(
+        get_version, MagicMock(return_value=SNAPSHOT), poll_seconds=60
+    )
+
+    for _ in range(3):
+        cache.get()
+
+    assert get_version.call_count == 1
+
+
+@pytest.mark.parametrize("min_duration_minutes", [None, 60, 90, 120, 180])
+@pytest.mark.parametrize("exclude_working_hours", [False, True])
+def test_indexed_snapshot_filters_match_python_filters(
+    min_duration_minutes, exclude_working_hours
+):
+    court_sessions = [
+        _session(venue, f"2022-01-{day:02d}T{hour:02d}:00", label=label)
+        for venue in ["venue1", "venue2"]
+        for label in ["court1", "court2", None]
+        for day in [3, 8]
+        for hour in [7, 8, 9, 16, 17, 18, 20]
+        if (hour + day + len(label or "")) % 4
+    ] + [
+        _session("venue3", f"2022-01-03T19:{minute:02d}", minutes=30)
+        for minute in [0, 30]
+    ]
+    snapshot = IndexedSnapshot(
+        1, Snapshot(court_sessions, ["venue1", "venue2", "venue3"], None)
+    )
+
+    expected = [
+        court_session
+        for court_session in court_sessions
+        if not (
+            exclude_working_hours
+            and is_working_hours(court_session.start_time)
+        )
+    ]
+    min_duration = None
+    if min_duration_minutes is not None:
+        min_duration = timedelta(minutes=min_duration_minutes)
+        expected = find_available_blocks(expected, min_duration)
+
+    result = snapshot.get_court_sessions(
+        exclude_working_hours=exclude_working_hours,
+        min_duration=min_duration,
+    )
+
+    assert sorted(result, key=_sort_key) == sorted(expected, key=_sort_key)
+    assert [court_session.start_time for court_session in result] == sorted(
+        court_session.start_time for court_session in result
+    )
+
+
+@pytest.mark.parametrize("min_duration", [None, timedelta(hours=2)])
+def test_indexed_snapshot_pages_match_paginate(min_duration):
+    court_sessions = [
+        _session("venue1", "2022-01-01T09:00", label="Court 2"),
+        _session("venue1", "2022-01-01T09:00", label=None),
+        _session("venue2", "2022-01-01T09:00", label="Court 1"),
+        _session("venue1", "2022-01-01T10:00", label="Court 2"),
+        _session("venue1", "2022-01-01T08:00", label="Court 1"),
+        _session("venue1", "2022-01-01T10:00", label=None),
+        _session("venue2", "2022-01-01T11:00", label="Court 1"),
+    ]
+    snapshot = IndexedSnapshot(
+        1, Snapshot(court_sessions, ["venue1", "venue2"], None)
+    )
+    expected = paginate(
+        snapshot.get_court_sessions(min_duration=min_duration), 100
+    )
+
+    pages = []
+    after = None
+    while True:
+        page = snapshot.get_court_sessions_page(
+            2, after, min_duration=min_duration
+        )
+        pages.append(page)
+        if page.next_cursor is None:
+            break
+        after = decode_cursor(page.next_cursor)
+
+    assert pages[0].total == expected.total
+    assert pages[0].total_is_exact
+    assert [
+        court_session
+        for page in pages
+        for court_session in page.court_sessions
+    ] == expected.court_sessions
+
+
+@pytest.mark.parametrize("min_duration", [None, timedelta(hours=2)])
+def test_indexed_snapshot_iterates_court_sessions_in_batches(min_duration):
+    snapshot = IndexedSnapshot(1, SNAPSHOT)
+    expected = snapshot.get_court_sessions(min_duration=min_duration)
+
+    batches = list(snapshot.iter_court_sessions(2, min_duration=min_duration))
+
+    assert all(len(batch) <= 2 for batch in batches)
+    assert len(batches) == (len(expected) + 1) // 2
+    assert [
+        court_session for batch in batches for court_session in batch
+    ] == expected
+
+
+def _sort_key(court_session: CourtSession):
+    return (
+        court_session.venue,
+        court_session.label or "",
+        court_session.start_time,
+    )
+
+
+def test_snapshot_cache_get_async_reloads_on_new_version():
+    get_version_async = AsyncMock(side_effect=[1, 1, 2])
+    load_snapshot_async = AsyncMock(return_value=SNAPSHOT)
+    cache = SnapshotCache(
+        MagicMock(),
+        MagicMock(),
+        poll_seconds=0,
+        get_version_async=get_version_async,
+        load_snapshot_async=load_snapshot_async,
+    )
+
+    async def get_versions():
+        return [(await cache.get_async()).version for _ in range(3)]
+
+    assert asyncio.run(get_versions()) == [1, 1, 2]
+    assert load_snapshot_async.await_count == 2
+    cache.get_version.assert_not_called()
+
+
+def test_snapshot_cache_get_async_works_across_event_loops():
+    async def get_version_async():
+        await asyncio.sleep(0)
+        return 1
+
+    cache = SnapshotCache(
+        MagicMock(),
+        MagicMock(),
+        poll_seconds=0,
+        get_version_async=get_version_async,
+        load_snapshot_async=AsyncMock(return_value=SNAPSHOT),
+    )
+
+    async def get_concurrently():
+        # Concurrent callers wait on the lock, which ties it to the loop
+        return await asyncio.gather(cache.get_async(), cache.get_async())
+
+    for _ in range(2):
+        snapshots = asyncio.run(get_concurrently())
+        assert [snapshot.version for snapshot in snapshots] == [1, 1]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import orjson
+
+from courtbooker.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", max_size=2, ttl_seconds=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "size": 2,
+        "hits": 3,
+        "redis_hits": 0,
+        "misses": 1,
+    }
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache("test", max_size=2, ttl_seconds=60)
+
+    with patch("courtbooker.cache.time.monotonic", return_value=0):
+        cache.set("a", 1)
+
+    with patch("courtbooker.cache.time.monotonic", return_value=59):
+        assert cache.get("a") == 1
+
+    with patch("courtbooker.cache.time.monotonic", return_value=60):
+        assert cache.get("a") is None
+
+
+def test_ttl_cache_reads_through_to_redis():
+    client = MagicMock()
+    pipeline = client.pipeline.return_value.__enter__.return_value
+    pipeline.execute.return_value = [orjson.dumps({"venue": 100}), 30_000]
+    cache = TTLCache("test", max_size=2, ttl_seconds=60, client=client)
+
+    assert cache.get("a") == {"venue": 100}
+    assert cache.get("a") == {"venue": 100}
+
+    client.pipeline.assert_called_once()
+    assert cache.stats()["redis_hits"] == 1
+    assert cache.stats()["hits"] == 1
+
+    cache.set("b", [1, 2])
+    client.set.assert_called_once_with(
+        "courtbooker:test:b", b"[1,2]", px=60_000
+    )
+
+
+def test_ttl_cache_reads_redis_off_the_event_loop():
+    client = MagicMock()
+    pipeline = client.pipeline.return_value.__enter__.return_value
+    loop_thread = threading.get_ident()
+    redis_threads = []
+
+    def execute():
+        redis_threads.append(threading.get_ident())
+        return [orjson.dumps({"venue": 100}), 30_000]
+
+    pipeline.execute.side_effect = execute
+    cache = TTLCache("test", max_size=2, ttl_seconds=60, client=client)
+
+    async def get_twice():
+        return await cache.get_async("a"), await cache.get_async("a")
+
+    assert asyncio.run(get_twice()) == ({"venue": 100}, {"venue": 100})
+    assert len(redis_threads) == 1
+    assert redis_threads[0] != loop_thread
@@ -0,0 +1,136 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from courtbooker import models
+from courtbooker.churn import get_churn_factors, record_churn
+from courtbooker.database import Base
+from courtbooker.scheduler import Slice, estimate_scrape_savings
+from courtbooker.settings import app_settings
+
+DATA_SOURCE = models.DataSource.CLUBSPARK
+# A Monday
+DATE = datetime.date(2023, 1, 2)
+
+
+@pytest.fixture(autouse=True)
+def churn_settings():
+    with patch.multiple(
+        app_settings,
+        CHURN_HOUR_BUCKET_HOURS=12,
+        CHURN_DECAY=0.5,
+        CHURN_MIN_FACTOR=0.25,
+        CHURN_MAX_FACTOR=4,
+        FRESHNESS_MIN_STALENESS_MINUTES=10,
+        FRESHNESS_STALENESS_GROWTH=2,
+        FRESHNESS_MAX_STALENESS_MINUTES=60,
+    ):
+        yield
+
+
+def _churn_stat(venue_path, weekday, changes, hours, hour_bucket=0):
+    return models.ChurnStat(
+        data_source=DATA_SOURCE,
+        venue_path=venue_path,
+        weekday=weekday,
+        hour_bucket=hour_bucket,
+        changes=changes,
+        hours=hours,
+        observations=1,
+    )
+
+
+def test_record_churn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    venue = models.Venue(path="venue1", data_source=DATA_SOURCE)
+    changed_session = models.CourtSession(
+        venue=venue,
+        label="Court 1",
+        cost="5.00",
+        start_time=datetime.datetime(2023, 1, 2, 18),
+        end_time=datetime.datetime(2023, 1, 2, 19),
+        url="test-url",
+    )
+
+    with Session(engine) as db_session:
+        db_session.add_all(
+            [
+                models.ScrapeSlice(
+                    data_source=DATA_SOURCE,
+                    venue_path="venue1",
+                    date=DATE,
+                    time_scraped=datetime.datetime(2023, 1, 1, 10),
+                ),
+                _churn_stat("venue1", DATE.weekday(), changes=2, hours=4),
+            ]
+        )
+        db_session.flush()
+
+        record_churn(
+            db_session,
+            DATA_SOURCE,
+            [changed_session],
+            # Never scraped before, so not observed
+            {("venue1", DATE), ("venue1", DATE + datetime.timedelta(days=1))},
+            datetime.datetime(2023, 1, 1, 12),
+        )
+        db_session.flush()
+
+        stats = {
+            stat.hour_bucket: (stat.changes, stat.hours, stat.observations)
+            for stat in db_session.query(models.ChurnStat)
+        }
+
+    assert stats == {0: (1.0, 4.0, 2), 1: (1.0, 2.0, 1)}
+
+
+def test_get_churn_factors():
+    factors = get_churn_factors(
+        [
+            _churn_stat("venue1", 0, changes=4, hours=1),
+            _churn_stat("venue1", 1, changes=2, hours=1),
+            _churn_stat("venue2", 0, changes=0, hours=1),
+            _churn_stat("venue2", 1, changes=0, hours=0),
+        ]
+    )
+
+    assert factors == {
+        (DATA_SOURCE, "venue1", 0): 0.5,
+        (DATA_SOURCE, "venue1", 1): 1.0,
+        (DATA_SOURCE, "venue2", 0): 4,
+    }
+
+
+def test_get_churn_factors_uses_the_busiest_hours():
+    factors = get_churn_factors(
+        [
+            _churn_stat("venue1", 0, changes=4, hours=1, hour_bucket=0),
+            _churn_stat("venue1", 0, changes=0, hours=1, hour_bucket=1),
+            _churn_stat("venue2", 0, changes=2, hours=1, hour_bucket=0),
+            _churn_stat("venue2", 0, changes=2, hours=1, hour_bucket=1),
+        ]
+    )
+
+    assert factors == {
+        (DATA_SOURCE, "venue1", 0): 0.75,
+        (DATA_SOURCE, "venue2", 0): 1.5,
+    }
+
+
+def test_estimate_scrape_savings():
+    # Both are a week out, so scraped every hour on the flat schedule
+    candidates = [
+        Slice(DATA_SOURCE, "venue1", DATE + datetime.timedelta(days=7)),
+        Slice(DATA_SOURCE, "venue2", DATE + datetime.timedelta(days=7)),
+    ]
+    factors = {(DATA_SOURCE, "venue2", DATE.weekday()): 4}
+
+    assert estimate_scrape_savings(candidates, factors, DATE) == {
+        "flat_scrapes_per_day": 48,
+        "adaptive_scrapes_per_day": 30,
+        "saved_fraction": 0.375,
+    }
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from courtbooker import compact, schemas
+from courtbooker.app.api import router
+
+
+def _court_session(
+    venue: str, day: int, hour: int, label: str | None = "Court 1"
+) -> schemas.CourtSession:
+    start_time = datetime(2023, 1, day, hour)
+    return schemas.CourtSession(
+        venue=venue,
+        label=label,
+        cost=Decimal("7.50"),
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=90),
+        url=f"https://example.com/{venue}/{start_time:%Y-%m-%d}/by-time",
+    )
+
+
+COURT_SESSIONS = [
+    _court_session(venue, day, hour, label)
+    for venue in ["venue1", "venue2"]
+    for day in [2, 3]
+    for hour in [9, 18]
+    for label in ["Court 1", None]
+]
+
+
+@pytest.mark.parametrize(
+    "media_type", [compact.COMPACT_JSON, compact.COMPACT_MSGPACK]
+)
+def test_round_trip(media_type):
+    payload = compact.encode(COURT_SESSIONS, message="Success")
+    content = compact.dumps(payload, media_type)
+
+    assert compact.decode_response(content, media_type) == COURT_SESSIONS
+    assert payload["urls"] == [
+        "https://example.com/venue1/{date}/by-time",
+        "https://example.com/venue2/{date}/by-time",
+    ]
+    assert len(content) < len(
+        orjson.dumps(
+            [court.model_dump() for court in COURT_SESSIONS], default=str
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, None),
+        ("*/*", None),
+        ("application/json", None),
+        ("application/msgpack", "application/msgpack"),
+        (
+            "application/json;q=0.5, application/vnd.courtbooker.compact+json",
+            compact.COMPACT_JSON,
+        ),
+        ("application/json, application/msgpack;q=0.9", None),
+        ("text/html, application/msgpack;q=0", None),
+    ],
+)
+def test_negotiate(accept, expected):
+    assert compact.negotiate(accept) == expected
+
+
+def test_courts_endpoint_negotiates_compact_response():
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    with patch(
+        "courtbooker.app.api.get_court_sessions_async",
+        AsyncMock(return_value=COURT_SESSIONS),
+    ):
+        plain = client.get("/api/courts")
+        packed = client.get(
+            "/api/courts", headers={"Accept": compact.COMPACT_MSGPACK}
+        )
+
+    assert plain.headers["vary"] == packed.headers["vary"] == "Accept"
+    assert len(plain.json()["courts"]) == len(COURT_SESSIONS)
+    assert packed.headers["content-type"] == compact.COMPACT_MSGPACK
+    assert (
+        compact.decode_response(packed.content, packed.headers["content-type"])
+        == COURT_SESSIONS
+    )
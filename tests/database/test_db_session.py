@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from courtbooker import models
+from courtbooker.database import Base, DbSession, pool_metrics
+
+
+class VenueNotFoundError(Exception):
+    def __init__(self, venue: str, reason: str):
+        super().__init__(f"{venue}: {reason}")
+
+
+@pytest.fixture
+def session_local():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    with patch(
+        "courtbooker.database.get_session_local", return_value=session_local
+    ):
+        yield session_local
+
+
+def _count_venues(session_local) -> int:
+    with session_local() as db_session:
+        return db_session.query(models.Venue).count()
+
+
+def _venue() -> models.Venue:
+    return models.Venue(path="venue", data_source=models.DataSource.BETTER)
+
+
+def test_db_session_commits(session_local):
+    checkouts = pool_metrics.checkouts
+
+    with DbSession() as db_session:
+        db_session.add(_venue())
+
+    assert _count_venues(session_local) == 1
+    assert pool_metrics.checkouts == checkouts + 1
+
+
+def test_db_session_read_only_does_not_commit(session_local):
+    with DbSession(read_only=True) as db_session:
+        db_session.add(_venue())
+
+    assert _count_venues(session_local) == 0
+
+
+def test_db_session_rolls_back_and_reraises(session_local):
+    # The original exception is raised, even if it can't be rebuilt from
+    # its message
+    with pytest.raises(VenueNotFoundError) as exc_info:
+        with DbSession() as db_session:
+            db_session.add(_venue())
+            raise VenueNotFoundError("venue", "missing")
+
+    assert (
+        exc_info.traceback[-1].name
+        == "test_db_session_rolls_back_and_reraises"
+    )
+    assert _count_venues(session_local) == 0
+
+
+def test_db_session_read_only_objects_are_usable_after_exit(session_local):
+    with DbSession() as db_session:
+        db_session.add(_venue())
+
+    with DbSession(read_only=True) as db_session:
+        venue = db_session.query(models.Venue).one()
+
+    assert venue.path == "venue"
+
+
+def test_db_session_closes_session_when_setup_fails():
+    session = MagicMock()
+    session.connection.side_effect = OperationalError("SELECT 1", {}, None)
+
+    with patch(
+        "courtbooker.database.get_session_local",
+        return_value=MagicMock(return_value=session),
+    ), pytest.raises(OperationalError):
+        with DbSession():
+            pass
+
+    session.close.assert_called_once()
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from courtbooker import models
+from courtbooker.database import Base, DbSession, ReplicaMonitor
+
+
+def _sqlite_session_local():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def databases():
+    _, primary_session_local = _sqlite_session_local()
+    replica_engine, replica_session_local = _sqlite_session_local()
+
+    with replica_session_local() as db_session:
+        db_session.add(
+            models.Venue(path="replica", data_source=models.DataSource.BETTER)
+        )
+        db_session.commit()
+
+    with patch(
+        "courtbooker.database.get_session_local",
+        return_value=primary_session_local,
+    ), patch(
+        "courtbooker.database.get_replica_session_local",
+        return_value=replica_session_local,
+    ), patch(
+        "courtbooker.database.get_replica_engine", return_value=replica_engine
+    ), patch(
+        "courtbooker.database.has_replica", return_value=True
+    ), patch(
+        "courtbooker.database.replica_monitor",
+        ReplicaMonitor(max_lag_seconds=30, check_seconds=60),
+    ):
+        yield
+
+
+def _read_venue_paths(use_replica: bool = True) -> list[str]:
+    with DbSession(read_only=True, use_replica=use_replica) as db_session:
+        return [venue.path for venue in db_session.query(models.Venue)]
+
+
+def test_read_only_sessions_use_the_replica(databases):
+    assert _read_venue_paths() == ["replica"]
+
+    with DbSession() as db_session:
+        db_session.add(
+            models.Venue(path="primary", data_source=models.DataSource.BETTER)
+        )
+
+    assert _read_venue_paths() == ["replica"]
+
+
+def test_read_only_sessions_only_use_the_replica_when_asked(databases):
+    assert _read_venue_paths(use_replica=False) == []
+
+
+@pytest.mark.parametrize("lag_seconds", [31, None])
+def test_read_only_sessions_fall_back_to_the_primary(databases, lag_seconds):
+    with patch("courtbooker.database._measure_lag", return_value=lag_seconds):
+        assert _read_venue_paths() == []
+
+
+def test_replica_monitor_checks_lag_at_most_every_check_seconds():
+    replica_monitor = ReplicaMonitor(max_lag_seconds=30, check_seconds=60)
+
+    with patch(
+        "courtbooker.database._measure_lag", side_effect=[31, 0]
+    ) as mock_measure_lag, patch("courtbooker.database.get_replica_engine"):
+        assert not replica_monitor.use_replica()
+        assert not replica_monitor.use_replica()
+        assert mock_measure_lag.call_count == 1
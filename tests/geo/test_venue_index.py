@@ -0,0 +1,46 @@
+import pytest
+
+from courtbooker.geo import VenueIndex, haversine_distance_in_metres
+
+VENUE_COORDINATES = {
+    "ShoreditchPark": (51.5343, -0.0888),
+    "VictoriaPark": (51.5362, -0.0389),
+    "ClissoldPark": (51.5614, -0.0880),
+    "Finsburypark": (51.5700, -0.1045),
+}
+
+
+def test_haversine_distance_in_metres():
+    # One degree of latitude is about 111km
+    assert haversine_distance_in_metres(51, 0, 52, 0) == pytest.approx(
+        111_195, rel=1e-3
+    )
+    assert haversine_distance_in_metres(51.5, -0.1, 51.5, -0.1) == 0
+
+
+@pytest.mark.parametrize(
+    "radius, expected_venues",
+    [
+        (100, []),
+        (1000, ["ShoreditchPark"]),
+        (3500, ["ShoreditchPark", "VictoriaPark", "ClissoldPark"]),
+        (10_000, list(VENUE_COORDINATES)),
+    ],
+)
+def test_venue_index_get_venues_within(radius, expected_venues):
+    venue_index = VenueIndex(VENUE_COORDINATES)
+    latitude, longitude = 51.5361238, -0.0870316
+
+    venues = venue_index.get_venues_within(latitude, longitude, radius)
+
+    assert sorted(venues) == sorted(expected_venues)
+    for venue, distance in venues.items():
+        assert distance == pytest.approx(
+            haversine_distance_in_metres(
+                latitude, longitude, *VENUE_COORDINATES[venue]
+            )
+        )
+
+
+def test_venue_index_without_venues():
+    assert VenueIndex({}).get_venues_within(51.5, -0.1, 10_000) == {}
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from courtbooker import models
+from courtbooker.database import Base
+from courtbooker.mapper import geocode_missing_venues
+
+
+def test_geocode_missing_venues_geocodes_outside_the_transaction(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'courts.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    with session_local() as db_session:
+        db_session.add_all(
+            [
+                models.Venue(
+                    path="clissold-park",
+                    data_source=models.DataSource.CLUBSPARK,
+                ),
+                models.Venue(
+                    path="Unknown",
+                    data_source=models.DataSource.CLUBSPARK,
+                ),
+            ]
+        )
+        db_session.commit()
+
+    def geocode(address):
+        assert engine.pool.checkedout() == 0
+        return 51.56, -0.08
+
+    with patch(
+        "courtbooker.database.get_session_local", return_value=session_local
+    ), patch("courtbooker.mapper.geocode", side_effect=geocode):
+        geocode_missing_venues()
+
+    with session_local() as db_session:
+        assert sorted(
+            (venue.name, venue.latitude, venue.longitude)
+            for venue in db_session.query(models.Venue)
+        ) == [("ClissoldPark", 51.56, -0.08), ("Unknown", None, None)]
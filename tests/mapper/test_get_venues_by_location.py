@@ -2,9 +2,15 @@ from unittest.mock import patch
 
 import pytest
 
+from courtbooker.cache import TTLCache
+from courtbooker.geo import VenueIndex
 from courtbooker.mapper import get_venues_by_location
 
 
+def _empty_location_cache() -> TTLCache:
+    return TTLCache("location", max_size=10, ttl_seconds=60)
+
+
 @pytest.mark.parametrize(
     "distance_map, radius, expected_venues",
     [
@@ -75,7 +81,11 @@ from courtbooker.mapper import get_venues_by_location
 def test_get_venues_by_location(distance_map, radius, expected_venues):
     with patch(
         "courtbooker.mapper.get_distance_in_metres_to_venues"
-    ) as mock_get_distance_in_metres_to_venues:
+    ) as mock_get_distance_in_metres_to_venues, patch(
+        "courtbooker.mapper.get_venue_index", return_value=VenueIndex({})
+    ), patch(
+        "courtbooker.mapper.location_cache", _empty_location_cache()
+    ):
         mock_get_distance_in_metres_to_venues.return_value = distance_map
 
         venues = get_venues_by_location(
@@ -84,3 +94,55 @@ def test_get_venues_by_location(distance_map, radius, expected_venues):
         )
 
         assert venues == expected_venues
+
+
+def test_get_venues_by_location_only_measures_nearby_venues():
+    venue_index = VenueIndex(
+        {
+            "ShoreditchPark": (51.5343, -0.0888),
+            "VictoriaPark": (51.5362, -0.0389),
+        }
+    )
+
+    with patch(
+        "courtbooker.mapper.get_distance_in_metres_to_venues"
+    ) as mock_get_distance_in_metres_to_venues, patch(
+        "courtbooker.mapper.get_venue_index", return_value=venue_index
+    ), patch(
+        "courtbooker.mapper.location_cache", _empty_location_cache()
+    ):
+        mock_get_distance_in_metres_to_venues.return_value = {
+            "ShoreditchPark": 418
+        }
+
+        venues = get_venues_by_location(
+            (51.5361238, -0.0870316),
+            radius_in_metres=2000,
+        )
+
+        candidates = mock_get_distance_in_metres_to_venues.call_args.args[1]
+        assert "ShoreditchPark" in candidates
+        assert "VictoriaPark" not in candidates
+        assert venues == {"ShoreditchPark": 418}
+
+
+def test_get_venues_by_location_caches_distances():
+    with patch(
+        "courtbooker.mapper.get_distance_in_metres_to_venues"
+    ) as mock_get_distance_in_metres_to_venues, patch(
+        "courtbooker.mapper.get_venue_index", return_value=VenueIndex({})
+    ), patch(
+        "courtbooker.mapper.location_cache", _empty_location_cache()
+    ):
+        mock_get_distance_in_metres_to_venues.side_effect = (
+            lambda origin, venues: {
+                venue: 418 if venue == "ShoreditchPark" else 5000
+                for venue in venues
+            }
+        )
+
+        for origin in [(51.53612, -0.08703), (51.53614, -0.08701)]:
+            venues = get_venues_by_location(origin, radius_in_metres=2000)
+
+        assert venues == {"ShoreditchPark": 418}
+        mock_get_distance_in_metres_to_venues.assert_called_once()
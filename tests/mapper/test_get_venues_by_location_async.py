@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from courtbooker.cache import TTLCache
+from courtbooker.geo import VenueIndex
+from courtbooker.mapper import (
+    VENUE_NAME_TO_GOOGLE_MAPS_NAME,
+    get_venues_by_location_async,
+)
+
+
+def test_get_venues_by_location_async():
+    # Every other venue is far away
+    venue_coordinates = {
+        venue: (52.5, 0.0) for venue in VENUE_NAME_TO_GOOGLE_MAPS_NAME
+    }
+    venue_coordinates["ShoreditchPark"] = (51.5343, -0.0888)
+    venue_index = VenueIndex(venue_coordinates)
+    responses = {
+        "geocode": {
+            "status": "OK",
+            "results": [
+                {"geometry": {"location": {"lat": 51.5361, "lng": -0.0870}}}
+            ],
+        },
+        "distancematrix": {
+            "status": "OK",
+            "rows": [{"elements": [{"distance": {"value": 418}}]}],
+        },
+    }
+
+    async def get_json_async(url, params):
+        return responses[url.split("/")[-2]]
+
+    with patch(
+        "courtbooker.mapper._get_json_async",
+        AsyncMock(side_effect=get_json_async),
+    ) as mock_get_json_async, patch(
+        "courtbooker.mapper.get_venue_index_async",
+        AsyncMock(return_value=venue_index),
+    ), patch(
+        "courtbooker.mapper.location_cache",
+        TTLCache("location", max_size=10, ttl_seconds=60),
+    ):
+        venues = asyncio.run(
+            get_venues_by_location_async("N1 6AA", radius_in_metres=2000)
+        )
+
+        assert venues == {"ShoreditchPark": 418}
+
+        # Only the nearby venue is measured
+        distance_matrix_params = mock_get_json_async.await_args.args[1]
+        assert distance_matrix_params["destinations"] == (
+            "Britannia Leisure Centre"
+        )
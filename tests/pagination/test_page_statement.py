@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from courtbooker import models
+from courtbooker.cache import IndexedSnapshot, Snapshot
+from courtbooker.database import Base
+from courtbooker.pagination import decode_cursor
+from courtbooker.util import (
+    _count_statement,
+    _page_statement,
+    _query_snapshot_sessions,
+    _to_page,
+    is_working_hours,
+)
+
+
+def _latest_court_session(id: int, venue_name: str, label, hour: int):
+    start_time = datetime(2023, 1, 2, hour)
+    return models.LatestCourtSession(
+        id=id,
+        data_source=models.DataSource.CLUBSPARK,
+        venue_name=venue_name,
+        label=label,
+        cost="5.00",
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        url="test-url",
+    )
+
+
+def test_page_statement_seeks_past_cursor():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    with session_local() as db_session:
+        db_session.add_all(
+            [
+                _latest_court_session(1, "venue1", "Court 2", 9),
+                _latest_court_session(2, "venue1", None, 9),
+                _latest_court_session(3, "venue2", "Court 1", 9),
+                _latest_court_session(4, "venue1", "Court 1", 10),
+                _latest_court_session(5, "venue1", "Court 1", 8),
+            ]
+        )
+        db_session.commit()
+
+        seen = []
+        after = None
+        while True:
+            court_sessions, next_cursor = _to_page(
+                db_session.execute(_page_statement(2, after)), limit=2
+            )
+            seen.extend(
+                (court_session.start_time.hour, court_session.venue)
+                for court_session in court_sessions
+            )
+            if next_cursor is None:
+                break
+            after = decode_cursor(next_cursor)
+
+        with patch("courtbooker.util.app_settings.PAGE_COUNT_CAP", 3):
+            capped_total = db_session.execute(_count_statement()).scalar_one()
+
+    assert seen == [
+        (8, "venue1"),
+        (9, "venue1"),
+        (9, "venue1"),
+        (9, "venue2"),
+        (10, "venue1"),
+    ]
+    assert capped_total == 4
+
+
+def test_page_statement_excludes_the_same_working_hours_as_python():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+    # Every hour of a week, starting on a Monday
+    start_times = [
+        datetime(2023, 1, 2) + timedelta(hours=hour) for hour in range(168)
+    ]
+
+    with session_local() as db_session:
+        for id, start_time in enumerate(start_times, start=1):
+            court_session = _latest_court_session(id, "venue1", None, 0)
+            court_session.start_time = start_time
+            court_session.end_time = start_time + timedelta(hours=1)
+            db_session.add(court_session)
+        db_session.commit()
+
+        court_sessions, _ = _to_page(
+            db_session.execute(
+                _page_statement(len(start_times), exclude_working_hours=True)
+            ),
+            limit=len(start_times),
+        )
+
+    assert [court_session.start_time for court_session in court_sessions] == [
+        start_time
+        for start_time in start_times
+        if not is_working_hours(start_time)
+    ]
+
+
+def test_snapshot_pages_tied_sessions_like_the_database():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    with session_local() as db_session:
+        # Sessions 2, 3 and 4 share a page key apart from their ids
+        for id, hour in [(4, 9), (2, 9), (5, 10), (3, 9), (1, 8)]:
+            court_session = _latest_court_session(
+                id, "venue1", "Court 1", hour
+            )
+            court_session.url = f"url{id}"
+            db_session.add(court_session)
+        db_session.commit()
+
+        database_pages = []
+        after = None
+        while True:
+            court_sessions, next_cursor = _to_page(
+                db_session.execute(_page_statement(2, after)), limit=2
+            )
+            database_pages.append(
+                [court_session.url for court_session in court_sessions]
+            )
+            if next_cursor is None:
+                break
+            after = decode_cursor(next_cursor)
+
+    with patch(
+        "courtbooker.database.get_session_local", return_value=session_local
+    ):
+        court_sessions, court_session_ids = _query_snapshot_sessions()
+    snapshot = IndexedSnapshot(
+        1,
+        Snapshot(
+            court_sessions,
+            ["venue1"],
+            None,
+            court_session_ids=court_session_ids,
+        ),
+    )
+
+    snapshot_pages = []
+    after = None
+    while True:
+        page = snapshot.get_court_sessions_page(2, after)
+        snapshot_pages.append(
+            [court_session.url for court_session in page.court_sessions]
+        )
+        if page.next_cursor is None:
+            break
+        after = decode_cursor(page.next_cursor)
+
+    assert (
+        snapshot_pages
+        == database_pages
+        == [
+            ["url1", "url2"],
+            ["url3", "url4"],
+            ["url5"],
+        ]
+    )
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from courtbooker import schemas
+from courtbooker.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+
+
+def _court_session(hour: int, venue: str = "venue1") -> schemas.CourtSession:
+    start_time = datetime(2023, 1, 2, hour)
+    return schemas.CourtSession(
+        venue=venue,
+        label="Court 1",
+        cost="5.00",
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        url="test-url",
+    )
+
+
+def test_cursor_round_trip():
+    key = (datetime(2023, 1, 2, 9), "venue1", "Court 1", 42)
+
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+def test_paginate_walks_every_session_once():
+    court_sessions = [
+        _court_session(hour, venue)
+        for hour in [11, 9, 10]
+        for venue in ["venue2", "venue1"]
+    ]
+
+    first = paginate(court_sessions, limit=4)
+    second = paginate(
+        court_sessions, limit=4, after=decode_cursor(first.next_cursor)
+    )
+
+    assert (first.total, first.total_is_exact) == (6, True)
+    assert second.next_cursor is None
+    assert second.total is None
+    assert [
+        (court_session.start_time.hour, court_session.venue)
+        for court_session in first.court_sessions + second.court_sessions
+    ] == [
+        (9, "venue1"),
+        (9, "venue2"),
+        (10, "venue1"),
+        (10, "venue2"),
+        (11, "venue1"),
+        (11, "venue2"),
+    ]
+
+
+def test_paginate_exact_final_page_has_no_cursor():
+    page = paginate([_court_session(9), _court_session(10)], limit=2)
+
+    assert page.next_cursor is None
@@ -0,0 +1,44 @@
+import datetime
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from courtbooker import models
+from courtbooker.database import Base
+from courtbooker.persistence import bulk_insert_court_sessions
+
+
+def test_bulk_insert_court_sessions():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    venue = models.Venue(path="LondonFields", data_source="clubspark")
+    courts = [
+        models.CourtSession(
+            label=f"Court {i}",
+            cost="5.00",
+            start_time=datetime.datetime(2023, 1, 1, 9),
+            end_time=datetime.datetime(2023, 1, 1, 10),
+            url="test-url",
+        )
+        for i in range(5)
+    ]
+
+    with Session(engine) as db_session:
+        db_session.add(venue)
+        db_session.flush()
+
+        with patch("courtbooker.persistence.BULK_INSERT_BATCH_SIZE", 2):
+            num_rows = bulk_insert_court_sessions(
+                db_session, [(venue, court) for court in courts], task_id=1
+            )
+
+        rows = db_session.query(models.CourtSession).all()
+
+    assert num_rows == 5
+    assert sorted(row.label for row in rows) == [
+        f"Court {i}" for i in range(5)
+    ]
+    assert all(row.venue_id == venue.id for row in rows)
+    assert all(row.task_id == 1 for row in rows)
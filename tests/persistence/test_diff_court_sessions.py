@@ -0,0 +1,56 @@
+import datetime
+
+from courtbooker import models
+from courtbooker.persistence import diff_court_sessions
+
+VENUE = models.Venue(path="LondonFields", data_source="clubspark")
+OTHER_VENUE = models.Venue(path="ClissoldPark", data_source="clubspark")
+
+
+def _session(hour, label="Court 1", cost="5.00", venue=VENUE):
+    start_time = datetime.datetime(2023, 1, 1, hour)
+    return models.CourtSession(
+        venue=venue,
+        label=label,
+        cost=cost,
+        start_time=start_time,
+        end_time=start_time + datetime.timedelta(hours=1),
+        url="test-url",
+    )
+
+
+def test_diff_court_sessions():
+    unchanged = _session(9)
+    changed = _session(10)
+    vanished = _session(11)
+    previous = [unchanged, changed, vanished]
+
+    scraped_unchanged = _session(9, cost=5.0)
+    scraped_changed = _session(10, cost="6.00")
+    new_label = _session(9, label="Court 2")
+    new_venue = _session(9, venue=OTHER_VENUE)
+    scraped = [
+        scraped_unchanged,
+        scraped_changed,
+        new_label,
+        new_venue,
+        _session(9, label="Court 2"),
+    ]
+
+    diff = diff_court_sessions(previous, scraped)
+
+    assert diff.new == [new_label, new_venue]
+    assert diff.changed == [(changed, scraped_changed)]
+    assert diff.unchanged == [(unchanged, scraped_unchanged)]
+    assert diff.vanished == [vanished]
+
+
+def test_diff_court_sessions_without_previous_snapshot():
+    scraped = [_session(9), _session(10)]
+
+    diff = diff_court_sessions([], scraped)
+
+    assert diff.new == scraped
+    assert not diff.changed
+    assert not diff.unchanged
+    assert not diff.vanished
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+
+from courtbooker import models
+from courtbooker.persistence import lock_data_source
+
+
+def _db_session(dialect: str) -> MagicMock:
+    db_session = MagicMock()
+    db_session.get_bind.return_value.dialect.name = dialect
+    return db_session
+
+
+def test_lock_data_source_takes_an_advisory_lock_per_data_source():
+    db_session = _db_session("postgresql")
+
+    lock_data_source(db_session, models.DataSource.BETTER)
+    lock_data_source(db_session, models.DataSource.CLUBSPARK)
+
+    better, clubspark = (
+        call.args[0].compile().params
+        for call in db_session.execute.call_args_list
+    )
+    assert "pg_advisory_xact_lock" in str(db_session.execute.call_args.args[0])
+    assert better != clubspark
+
+
+def test_lock_data_source_skips_other_databases():
+    db_session = _db_session("sqlite")
+
+    lock_data_source(db_session, models.DataSource.BETTER)
+
+    db_session.execute.assert_not_called()
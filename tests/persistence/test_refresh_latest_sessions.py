@@ -0,0 +1,70 @@
+import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from courtbooker import models
+from courtbooker.database import Base
+from courtbooker.persistence import refresh_latest_sessions
+
+
+def _task(hour, venue, start_hours, incremental=False, closed_hours=()):
+    return models.ScrapeTask(
+        time_started=datetime.datetime(2023, 1, 1, hour),
+        time_finished=datetime.datetime(2023, 1, 1, hour),
+        data_source=models.DataSource.CLUBSPARK,
+        params={},
+        incremental=incremental,
+        court_sessions=[
+            models.CourtSession(
+                venue=venue,
+                label="Court 1",
+                cost="5.00",
+                start_time=datetime.datetime(2023, 1, 2, start_hour),
+                end_time=datetime.datetime(2023, 1, 2, start_hour + 1),
+                url="test-url",
+                time_closed=(
+                    datetime.datetime(2023, 1, 1, hour)
+                    if start_hour in closed_hours
+                    else None
+                ),
+            )
+            for start_hour in start_hours
+        ],
+    )
+
+
+def _latest_start_hours(db_session):
+    return sorted(
+        session.start_time.hour
+        for session in db_session.query(models.LatestCourtSession)
+    )
+
+
+def test_refresh_latest_sessions():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db_session:
+        venue = models.Venue(
+            path="LondonFields", data_source=models.DataSource.CLUBSPARK
+        )
+        db_session.add_all(
+            [
+                _task(1, venue, [9, 10]),
+                _task(2, venue, [11, 12]),
+            ]
+        )
+        db_session.flush()
+
+        assert refresh_latest_sessions(db_session, venue.data_source) == 2
+        assert _latest_start_hours(db_session) == [11, 12]
+
+        db_session.add(
+            _task(3, venue, [13, 14], incremental=True, closed_hours=[14])
+        )
+        db_session.flush()
+
+        # Sessions from the older snapshots are still open
+        assert refresh_latest_sessions(db_session, venue.data_source) == 5
+        assert _latest_start_hours(db_session) == [9, 10, 11, 12, 13]
@@ -0,0 +1,114 @@
+import datetime
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from courtbooker import models
+from courtbooker.database import Base
+from courtbooker.persistence import save_incremental
+
+
+def _court_session(venue, day, hour):
+    return models.CourtSession(
+        venue=venue,
+        label="Court 1",
+        cost="5.00",
+        start_time=datetime.datetime(2023, 1, day, hour),
+        end_time=datetime.datetime(2023, 1, day, hour + 1),
+        url="test-url",
+    )
+
+
+def _open_sessions(session_local):
+    with session_local() as db_session:
+        return sorted(
+            (
+                court_session.venue.path,
+                court_session.start_time.day,
+                court_session.start_time.hour,
+            )
+            for court_session in db_session.query(models.CourtSession).filter(
+                models.CourtSession.time_closed.is_(None)
+            )
+        )
+
+
+def test_save_incremental_only_closes_scraped_slices():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+    data_source = models.DataSource.CLUBSPARK
+
+    def _venues():
+        with session_local() as db_session:
+            return db_session.query(models.Venue).order_by("path").all()
+
+    with patch(
+        "courtbooker.database.get_session_local", return_value=session_local
+    ):
+        venues = [
+            models.Venue(path=path, data_source=data_source)
+            for path in ["venue1", "venue2"]
+        ]
+        save_incremental(
+            data_source,
+            venues,
+            [
+                _court_session(venues[0], 1, 9),
+                _court_session(venues[0], 2, 9),
+                _court_session(venues[1], 1, 9),
+            ],
+            datetime.datetime(2023, 1, 1),
+        )
+
+        venues = _venues()
+        save_incremental(
+            data_source,
+            venues,
+            [_court_session(venues[0], 1, 10)],
+            datetime.datetime(2023, 1, 1, 1),
+            slices={("venue1", datetime.date(2023, 1, 1))},
+        )
+
+    assert _open_sessions(session_local) == [
+        ("venue1", 1, 10),
+        ("venue1", 2, 9),
+        ("venue2", 1, 9),
+    ]
+
+
+def test_save_incremental_closes_sessions_before_the_scrape_date():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_local = sessionmaker(autoflush=False, bind=engine)
+    data_source = models.DataSource.CLUBSPARK
+
+    with patch(
+        "courtbooker.database.get_session_local", return_value=session_local
+    ):
+        venue = models.Venue(path="venue1", data_source=data_source)
+        save_incremental(
+            data_source,
+            [venue],
+            [_court_session(venue, 1, 21), _court_session(venue, 2, 9)],
+            datetime.datetime(2023, 1, 1, 20),
+            slices={
+                ("venue1", datetime.date(2023, 1, 1)),
+                ("venue1", datetime.date(2023, 1, 2)),
+            },
+        )
+
+        with session_local() as db_session:
+            venue = db_session.query(models.Venue).one()
+
+        # The first tick after midnight only scrapes from the new day
+        save_incremental(
+            data_source,
+            [venue],
+            [_court_session(venue, 2, 9)],
+            datetime.datetime(2023, 1, 2, 0, 5),
+            slices={("venue1", datetime.date(2023, 1, 2))},
+        )
+
+    assert _open_sessions(session_local) == [("venue1", 2, 9)]
@@ -0,0 +1,126 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from courtbooker.refresh_status import RefreshRegistry
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.results = []
+
+    def _result(self, result):
+        self.results.append(result)
+        return result
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return self._result(None)
+        self.values[key] = value.encode()
+        return self._result(True)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def expire(self, key, seconds):
+        return self._result(key in self.values)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.values.setdefault(key, {})
+        for field, value in (mapping or {field: value}).items():
+            fields[field.encode()] = str(value).encode()
+        return self._result(len(fields))
+
+    def hincrby(self, key, field, amount):
+        fields = self.values.setdefault(key, {})
+        value = int(fields.get(field.encode(), 0)) + amount
+        fields[field.encode()] = str(value).encode()
+        return self._result(value)
+
+    def eval(self, script, numkeys, key, owner, *args):
+        # Emulates the compare-and-expire and compare-and-delete scripts
+        if self.values.get(key) != owner.encode():
+            return self._result(0)
+        if "del" in script:
+            self.values.pop(key)
+        return self._result(1)
+
+    def hgetall(self, key):
+        return self.values.get(key, {})
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+    def pipeline(self):
+        self.results = []
+        pipeline = MagicMock()
+        pipeline.__enter__.return_value = self
+        return pipeline
+
+
+def test_refresh_registry_deduplicates_refreshes():
+    registry = RefreshRegistry(FakeRedis(), lock_ttl_seconds=60)
+
+    assert registry.get_running_task_id() is None
+    assert registry.claim("task1") == "task1"
+    assert registry.claim("task2") == "task1"
+    assert registry.get_running_task_id() == "task1"
+
+
+def test_refresh_registry_tracks_progress():
+    registry = RefreshRegistry(FakeRedis(), lock_ttl_seconds=60)
+    registry.claim("task1")
+    registry.start("task1", ["better", "clubspark"])
+
+    registry.start_source("task1", "better", pages_planned=14)
+    registry.add_pages_done("task1", "better", 7)
+
+    assert registry.get_progress() == {
+        "better": {"state": "running", "pages_planned": 14, "pages_done": 7},
+        "clubspark": {"state": "queued"},
+    }
+
+    registry.finish_source("task1", "better")
+    assert registry.get_running_task_id() == "task1"
+
+    registry.finish_source("task1", "clubspark", failed=True)
+    assert registry.get_running_task_id() is None
+    assert registry.get_progress()["clubspark"] == {"state": "failed"}
+    assert registry.claim("task2") == "task2"
+    assert registry.get_progress() == {}
+
+
+def test_refresh_registry_ignores_updates_from_earlier_refreshes():
+    client = FakeRedis()
+    registry = RefreshRegistry(client, lock_ttl_seconds=60)
+    registry.claim("task1")
+    registry.start("task1", ["better"])
+    # The first refresh's lock expires while a shard is still retrying
+    client.delete(registry.lock_key)
+
+    registry.claim("task2")
+    registry.start("task2", ["better"])
+    registry.start_source("task2", "better", pages_planned=14)
+
+    registry.add_pages_done("task1", "better", 7)
+    registry.finish_source("task1", "better")
+
+    assert registry.get_running_task_id() == "task2"
+    assert registry.get_progress() == {
+        "better": {"state": "running", "pages_planned": 14, "pages_done": 0}
+    }
+
+
+def test_refresh_registry_records_the_last_refresh():
+    registry = RefreshRegistry(FakeRedis(), lock_ttl_seconds=60)
+    assert registry.get_last_refresh_time() is None
+
+    before = datetime.now()
+    registry.claim("task1")
+    registry.claim("task2")
+
+    assert before <= registry.get_last_refresh_time() <= datetime.now()
@@ -0,0 +1,83 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from courtbooker import models
+from courtbooker.scheduler import (
+    Slice,
+    SliceState,
+    get_target_staleness,
+    select_stale_slices,
+)
+from courtbooker.settings import app_settings
+
+NOW = datetime.datetime(2023, 1, 1, 12)
+
+
+def _slice(days_ahead: int, venue_path: str = "venue1") -> Slice:
+    return Slice(
+        models.DataSource.BETTER,
+        venue_path,
+        NOW.date() + datetime.timedelta(days=days_ahead),
+    )
+
+
+def _minutes_ago(minutes: float) -> datetime.datetime:
+    return NOW - datetime.timedelta(minutes=minutes)
+
+
+@pytest.fixture(autouse=True)
+def staleness_settings():
+    with patch.multiple(
+        app_settings,
+        FRESHNESS_MIN_STALENESS_MINUTES=10,
+        FRESHNESS_STALENESS_GROWTH=2,
+        FRESHNESS_MAX_STALENESS_MINUTES=60,
+        FRESHNESS_QUEUED_TIMEOUT_MINUTES=30,
+    ):
+        yield
+
+
+@pytest.mark.parametrize(
+    "days_ahead, minutes", [(0, 10), (1, 20), (2, 40), (3, 60), (7, 60)]
+)
+def test_get_target_staleness(days_ahead, minutes):
+    assert get_target_staleness(days_ahead) == datetime.timedelta(
+        minutes=minutes
+    )
+
+
+def test_select_stale_slices_most_overdue_first():
+    candidates = [_slice(0), _slice(1), _slice(2), _slice(0, "venue2")]
+    states = {
+        _slice(0): SliceState(_minutes_ago(5), None),
+        _slice(1): SliceState(_minutes_ago(30), None),
+        _slice(2): SliceState(_minutes_ago(100), None),
+    }
+
+    assert select_stale_slices(candidates, states, NOW, budget=10) == [
+        _slice(0, "venue2"),
+        _slice(2),
+        _slice(1),
+    ]
+    assert select_stale_slices(candidates, states, NOW, budget=1) == [
+        _slice(0, "venue2"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "state, is_selected",
+    [
+        (SliceState(_minutes_ago(60), _minutes_ago(5)), False),
+        (SliceState(_minutes_ago(60), _minutes_ago(40)), True),
+        (SliceState(_minutes_ago(20), _minutes_ago(20)), True),
+        (SliceState(None, _minutes_ago(5)), False),
+    ],
+)
+def test_select_stale_slices_skips_queued(state, is_selected):
+    selected = select_stale_slices(
+        [_slice(0)], {_slice(0): state}, NOW, budget=10
+    )
+
+    assert selected == ([_slice(0)] if is_selected else [])
@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+from courtbooker.scraper.aio import AsyncHttpFetcher, HostRateLimiter
+
+
+def _fetch(handler, url="https://example.com/page", max_retries=2):
+    async def _run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            fetcher = AsyncHttpFetcher(
+                client,
+                HostRateLimiter(max_concurrency=2, requests_per_second=100),
+                lambda page_source: "ready" in page_source,
+                max_retries=max_retries,
+            )
+            return await fetcher.fetch(url)
+
+    with patch("courtbooker.scraper.aio.backoff_delay", return_value=0):
+        return asyncio.run(_run())
+
+
+def test_async_http_fetcher_retries_server_errors():
+    responses = iter(
+        [
+            httpx.Response(503),
+            httpx.Response(200, text="<p>ready</p>"),
+        ]
+    )
+
+    page = _fetch(lambda request: next(responses))
+
+    assert page.url == "https://example.com/page"
+    assert page.page_source == "<p>ready</p>"
+
+
+def test_async_http_fetcher_gives_up():
+    num_requests = 0
+
+    def handler(request):
+        nonlocal num_requests
+        num_requests += 1
+        return httpx.Response(503)
+
+    assert _fetch(handler, max_retries=2) is None
+    assert num_requests == 3
+
+
+def test_async_http_fetcher_skips_unrendered_pages():
+    page = _fetch(lambda request: httpx.Response(200, text="<p>loading</p>"))
+
+    assert page is None
+
+
+def test_host_rate_limiter():
+    limiter = HostRateLimiter(max_concurrency=2, requests_per_second=20)
+    running = 0
+    max_running = 0
+
+    async def _request():
+        nonlocal running, max_running
+        async with limiter.limit("example.com"):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(_request() for _ in range(5)))
+        return loop.time() - start
+
+    elapsed = asyncio.run(_run())
+
+    assert max_running <= 2
+    # Five requests spaced 50ms apart
+    assert elapsed >= 0.2
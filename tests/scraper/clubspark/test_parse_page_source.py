@@ -0,0 +1,55 @@
+import datetime
+from decimal import Decimal
+
+from courtbooker import models
+from courtbooker.scraper.clubspark import (
+    is_page_source_ready,
+    parse_page_source,
+)
+
+PAGE_SOURCE = """
+<html><body>
+<div class="booking-sheet">
+  <div class="resource" data-resource-name="Court 1">
+    <div class="resource-session" data-availability="true" data-session-cost="6.50">
+      <div class="resource-interval" data-system-start-time="540" data-system-end-time="600">
+        <a class="book-interval not-booked" href="#">Book</a>
+      </div>
+      <div class="resource-interval" data-system-start-time="600" data-system-end-time="660">
+        <span class="booked">Booked</span>
+      </div>
+    </div>
+    <div class="resource-session" data-availability="false" data-session-cost="6.50">
+      <div class="resource-interval" data-system-start-time="660" data-system-end-time="720">
+        <a class="book-interval not-booked" href="#">Book</a>
+      </div>
+    </div>
+  </div>
+  <div class="resource" data-resource-name="Mini Court">
+    <div class="resource-session" data-availability="true" data-session-cost="3.00">
+      <div class="resource-interval" data-system-start-time="540" data-system-end-time="600">
+        <a class="book-interval not-booked" href="#">Book</a>
+      </div>
+    </div>
+  </div>
+</div>
+</body></html>
+"""
+
+
+def test_parse_page_source():
+    venue = models.Venue(path="LondonFields", data_source="clubspark")
+    date = datetime.date(2023, 1, 1)
+
+    sessions = parse_page_source(PAGE_SOURCE, venue, date, "test-url")
+
+    assert len(sessions) == 1
+    assert sessions[0].label == "Court 1"
+    assert sessions[0].cost == Decimal("6.50")
+    assert sessions[0].start_time == datetime.datetime(2023, 1, 1, 9, 0)
+    assert sessions[0].end_time == datetime.datetime(2023, 1, 1, 10, 0)
+
+
+def test_is_page_source_ready():
+    assert is_page_source_ready(PAGE_SOURCE)
+    assert not is_page_source_ready("<html><body>Loading</body></html>")
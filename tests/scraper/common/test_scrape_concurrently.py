@@ -0,0 +1,120 @@
+import datetime
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from courtbooker.scraper.common import (
+    PageScrapeError,
+    WebDriverPool,
+    scrape_concurrently,
+)
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 2, 4])
+def test_scrape_concurrently(max_concurrency):
+    venues = ["venue1", "venue2", "venue3"]
+    date_range = [
+        datetime.date(2023, 1, 1),
+        datetime.date(2023, 1, 2),
+    ]
+
+    lock = threading.Lock()
+    num_running = 0
+    max_running = 0
+
+    def scrape_page(venue, date):
+        nonlocal num_running, max_running
+        with lock:
+            num_running += 1
+            max_running = max(max_running, num_running)
+
+        time.sleep(0.01)
+
+        with lock:
+            num_running -= 1
+
+        return [(date, venue)]
+
+    sessions = scrape_concurrently(
+        scrape_page, venues, date_range, max_concurrency
+    )
+
+    assert sessions == [
+        (date, venue) for date in date_range for venue in venues
+    ]
+    assert max_running <= max_concurrency
+
+
+def test_scrape_concurrently_raises_after_trying_every_page():
+    def scrape_page(venue, date):
+        if venue == "broken":
+            raise ValueError("Could not parse page")
+        return [venue]
+
+    with pytest.raises(PageScrapeError) as exc_info:
+        scrape_concurrently(
+            scrape_page,
+            ["venue1", "broken", "venue2"],
+            [datetime.date(2023, 1, 1)],
+            max_concurrency=2,
+        )
+
+    assert exc_info.value.court_sessions == ["venue1", "venue2"]
+    assert exc_info.value.failed_pages == [
+        (datetime.date(2023, 1, 1), "broken")
+    ]
+
+
+def test_scrape_concurrently_reports_each_page():
+    def scrape_page(venue, date):
+        if venue == "broken":
+            raise ValueError("Could not parse page")
+        return [venue]
+
+    on_page_done = MagicMock()
+    with pytest.raises(PageScrapeError):
+        scrape_concurrently(
+            scrape_page,
+            ["venue1", "broken", "venue2"],
+            [datetime.date(2023, 1, 1), datetime.date(2023, 1, 2)],
+            max_concurrency=2,
+            on_page_done=on_page_done,
+        )
+
+    assert on_page_done.call_count == 6
+
+
+def test_webdriver_pool_reuses_drivers():
+    with patch(
+        "courtbooker.scraper.common._create_webdriver",
+        side_effect=lambda: MagicMock(),
+    ) as mock_create_webdriver:
+        with WebDriverPool(2) as pool:
+            with pool.acquire() as first_driver:
+                with pool.acquire() as second_driver:
+                    assert first_driver is not second_driver
+
+            with pool.acquire() as driver:
+                assert driver in (first_driver, second_driver)
+
+    assert mock_create_webdriver.call_count == 2
+    first_driver.quit.assert_called_once()
+    second_driver.quit.assert_called_once()
+
+
+def test_webdriver_pool_releases_driver_after_other_errors():
+    with patch(
+        "courtbooker.scraper.common._create_webdriver",
+        side_effect=lambda: MagicMock(),
+    ) as mock_create_webdriver:
+        with WebDriverPool(1) as pool:
+            with pytest.raises(ValueError):
+                with pool.acquire() as first_driver:
+                    raise ValueError("Could not parse page")
+
+            with pool.acquire() as driver:
+                assert driver is first_driver
+
+    assert mock_create_webdriver.call_count == 1
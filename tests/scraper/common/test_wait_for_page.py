@@ -0,0 +1,41 @@
+from unittest.mock import MagicMock
+
+from courtbooker.scraper.common import (
+    PageWaitTimings,
+    page_text_contains,
+    wait_for_page,
+)
+
+
+def test_wait_for_page_ready():
+    driver = MagicMock()
+    driver.find_element.return_value.text = "Sorry, No Courts Available"
+    timings = PageWaitTimings("test")
+
+    is_ready = wait_for_page(
+        driver,
+        page_text_contains("no courts available"),
+        timeout=1,
+        timings=timings,
+    )
+
+    assert is_ready
+    assert len(timings.waits) == 1
+    assert timings.timeouts == 0
+
+
+def test_wait_for_page_timeout():
+    driver = MagicMock()
+    driver.find_element.return_value.text = "Loading..."
+    timings = PageWaitTimings("test")
+
+    is_ready = wait_for_page(
+        driver,
+        page_text_contains("no courts available"),
+        timeout=0.3,
+        timings=timings,
+    )
+
+    assert not is_ready
+    assert timings.waits[0] >= 0.3
+    assert timings.timeouts == 1
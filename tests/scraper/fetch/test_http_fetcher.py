@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from courtbooker.scraper.fetch import FetchedPage, HttpFetcher
+
+
+def _mock_session(text: str = "", error: Exception | None = None):
+    session = MagicMock()
+    if error is not None:
+        session.get.side_effect = error
+    else:
+        session.get.return_value.text = text
+        session.get.return_value.history = []
+    return session
+
+
+def test_http_fetcher_returns_ready_page():
+    session = _mock_session("<p>ready</p>")
+    fallback = MagicMock()
+    fetcher = HttpFetcher(
+        session,
+        lambda page_source: "ready" in page_source,
+        timeout=1,
+        fallback=fallback,
+    )
+
+    page = fetcher.fetch("https://example.com/#?date=1", "https://q?date=1")
+
+    assert page == FetchedPage("https://example.com/#?date=1", "<p>ready</p>")
+    session.get.assert_called_once_with("https://q?date=1", timeout=1)
+    fallback.fetch.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "session",
+    [
+        _mock_session("<p>loading</p>"),
+        _mock_session(error=requests.ConnectionError("refused")),
+    ],
+)
+def test_http_fetcher_falls_back(session):
+    fallback = MagicMock()
+    fetcher = HttpFetcher(
+        session,
+        lambda page_source: "ready" in page_source,
+        timeout=1,
+        fallback=fallback,
+    )
+
+    page = fetcher.fetch("https://example.com")
+
+    assert page is fallback.fetch.return_value
+    fallback.fetch.assert_called_once_with("https://example.com", None)
@@ -0,0 +1,46 @@
+import datetime
+
+from courtbooker import models
+from courtbooker.scraper.tower_hamlets import (
+    is_page_source_ready,
+    parse_page_source,
+)
+
+PAGE_SOURCE = """
+<html><body>
+<form>
+  <label class="court">
+    Court 1
+    <span>£8.00</span>
+    <input class="bookable" type="checkbox" data-price="8.00" value="1_2_2023-01-01_09:00">
+  </label>
+  <label class="court booked">
+    Court 2
+    <span>£8.00</span>
+  </label>
+  <label class="court">
+    Court 3
+    <span>£8.00</span>
+    <input class="bookable" type="checkbox" data-price="8.00" value="unparseable">
+  </label>
+</form>
+</body></html>
+"""
+
+
+def test_parse_page_source():
+    venue = models.Venue(path="victoria-park", data_source="towerhamlets")
+    date = datetime.date(2023, 1, 1)
+
+    sessions = parse_page_source(PAGE_SOURCE, venue, date, "test-url")
+
+    assert len(sessions) == 1
+    assert sessions[0].label == "Court 1"
+    assert sessions[0].cost == 8.0
+    assert sessions[0].start_time == datetime.datetime(2023, 1, 1, 9, 0)
+    assert sessions[0].end_time == datetime.datetime(2023, 1, 1, 10, 0)
+
+
+def test_is_page_source_ready():
+    assert is_page_source_ready(PAGE_SOURCE)
+    assert not is_page_source_ready("<html><body>Loading</body></html>")
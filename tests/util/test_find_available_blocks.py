@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from courtbooker.schemas import CourtSession
+from courtbooker.util import find_available_blocks
+
+
+@pytest.mark.parametrize(
+    "sessions, min_duration_minutes, expected",
+    [
+        ([], 60, []),
+        (
+            [("court1", "18:00", 60)],
+            60,
+            [("court1", "18:00", "19:00", 10)],
+        ),
+        (
+            [("court1", "18:00", 60)],
+            120,
+            [],
+        ),
+        (
+            [
+                ("court1", "18:30", 30),
+                ("court1", "18:00", 30),
+                ("court1", "19:00", 60),
+            ],
+            120,
+            [("court1", "18:00", "20:00", 20)],
+        ),
+        (
+            [
+                ("court1", "18:00", 60),
+                ("court2", "19:00", 60),
+            ],
+            120,
+            [],
+        ),
+        (
+            [
+                ("court1", "18:00", 60),
+                ("court1", "20:00", 60),
+                ("court2", "17:00", 60),
+                ("court2", "18:00", 60),
+            ],
+            120,
+            [("court2", "17:00", "19:00", 20)],
+        ),
+    ],
+)
+def test_find_available_blocks(sessions, min_duration_minutes, expected):
+    court_sessions = []
+    for label, time, minutes in sessions:
+        start_time = datetime.strptime(f"2022-01-01T{time}", "%Y-%m-%dT%H:%M")
+        court_sessions.append(
+            CourtSession(
+                venue="venue1",
+                label=label,
+                cost=minutes / 6,
+                start_time=start_time,
+                end_time=start_time + timedelta(minutes=minutes),
+                url="test-url",
+            )
+        )
+
+    blocks = find_available_blocks(
+        court_sessions, timedelta(minutes=min_duration_minutes)
+    )
+
+    assert [
+        (
+            block.label,
+            f"{block.start_time:%H:%M}",
+            f"{block.end_time:%H:%M}",
+            block.cost,
+        )
+        for block in blocks
+    ] == expected
@@ -0,0 +1,226 @@
+import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from courtbooker import models, scheduler
+from courtbooker.scraper.common import PageScrapeError
+from courtbooker.settings import app_settings
+from courtbooker.worker import (
+    _save_scrape_task,
+    _serialize_court_sessions,
+    _shard_scrape,
+    merge_scrape_shards,
+    scrape_shard,
+)
+
+
+def _venue(path: str) -> models.Venue:
+    return models.Venue(path=path, data_source=models.DataSource.BETTER)
+
+
+def _court_session(venue: models.Venue, day: int) -> models.CourtSession:
+    start_time = datetime.datetime(2023, 1, day, 18)
+    return models.CourtSession(
+        venue=venue,
+        label="Court 1",
+        cost=12.5,
+        start_time=start_time,
+        end_time=start_time + datetime.timedelta(hours=1),
+        url="test-url",
+    )
+
+
+def _shard_result(
+    court_sessions: list[models.CourtSession], failed: list[list[str]] = ()
+) -> dict[str, list]:
+    return {
+        "courts": _serialize_court_sessions(court_sessions),
+        "failed": list(failed),
+    }
+
+
+def test_shard_scrape_splits_by_venue_and_date_chunk():
+    venues = [_venue("venue1"), _venue("venue2")]
+
+    with patch.object(
+        app_settings.BETTER, "LOOK_AHEAD_DAYS", 10
+    ), patch.object(app_settings.BETTER, "SHARD_DAYS", 4), patch(
+        "courtbooker.worker._get_date_range",
+        return_value=[datetime.date(2023, 1, day) for day in range(1, 11)],
+    ):
+        scrape = _shard_scrape(
+            models.DataSource.BETTER,
+            venues,
+            datetime.datetime(2023, 1, 1),
+        )
+
+    shards = [shard.args for shard in scrape.tasks]
+    assert [(venue, len(dates)) for _, venue, dates in shards] == [
+        ("venue1", 4),
+        ("venue1", 4),
+        ("venue1", 2),
+        ("venue2", 4),
+        ("venue2", 4),
+        ("venue2", 2),
+    ]
+    assert shards[1][2][0] == "2023-01-05"
+    assert scrape.body.args[0] == "better"
+    assert len(scrape.body.args[1]) == 20
+    assert scrape.body.args[1][10] == ("venue2", "2023-01-01")
+    assert scrape.body.kwargs == {"partial": False, "refresh_id": None}
+
+
+def test_merge_scrape_shards_saves_one_task():
+    venues = [_venue("venue1"), _venue("venue2")]
+    shard_results = [
+        _shard_result([_court_session(venues[0], 1)]),
+        _shard_result([]),
+        _shard_result(
+            [_court_session(venues[1], 1), _court_session(venues[1], 2)]
+        ),
+    ]
+
+    with patch(
+        "courtbooker.worker._fetch_or_create_venues", return_value=venues
+    ), patch(
+        "courtbooker.worker._save_scrape_task", return_value=1
+    ) as mock_save_scrape_task:
+        task_id = merge_scrape_shards(
+            shard_results,
+            "better",
+            [("venue1", "2023-01-01"), ("venue2", "2023-01-01")],
+            "2023-01-01T00:00:00",
+        )
+
+    assert task_id == 1
+    mock_save_scrape_task.assert_called_once()
+    (
+        data_source,
+        saved_venues,
+        courts,
+        start_time,
+    ) = mock_save_scrape_task.call_args.args
+    assert data_source == models.DataSource.BETTER
+    assert saved_venues == venues
+    assert start_time == datetime.datetime(2023, 1, 1)
+    assert [(court.venue.path, court.start_time.day) for court in courts] == [
+        ("venue1", 1),
+        ("venue2", 1),
+        ("venue2", 2),
+    ]
+    assert courts[0].cost == "12.5"
+
+
+def test_merge_scrape_shards_leaves_failed_pages_out_of_the_save():
+    venues = [_venue("venue1"), _venue("venue2")]
+    shard_results = [
+        _shard_result([_court_session(venues[0], 1)]),
+        _shard_result([], failed=[["venue2", "2023-01-01"]]),
+    ]
+
+    with patch(
+        "courtbooker.worker._fetch_or_create_venues", return_value=venues
+    ), patch(
+        "courtbooker.worker._save_scrape_task", return_value=1
+    ) as mock_save_scrape_task, patch(
+        "courtbooker.worker.refresh_registry"
+    ) as mock_refresh_registry:
+        merge_scrape_shards(
+            shard_results,
+            "better",
+            [("venue1", "2023-01-01"), ("venue2", "2023-01-01")],
+            "2023-01-01T00:00:00",
+            refresh_id="refresh",
+        )
+
+    assert mock_save_scrape_task.call_args.kwargs == {
+        "slices": [
+            scheduler.Slice(
+                models.DataSource.BETTER, "venue1", datetime.date(2023, 1, 1)
+            )
+        ],
+        "partial": True,
+    }
+    mock_refresh_registry.finish_source.assert_called_once_with(
+        "refresh", "better", failed=True
+    )
+
+
+def test_scrape_shard_returns_failed_pages_once_out_of_retries():
+    venue = _venue("venue1")
+    error = PageScrapeError(
+        [_court_session(venue, 1)], [(datetime.date(2023, 1, 2), venue)]
+    )
+    scraper = MagicMock()
+    scraper.get_available_sessions.side_effect = error
+
+    with patch.object(app_settings, "SCRAPE_MODE", "sync"), patch.dict(
+        "courtbooker.worker.SCRAPERS", {models.DataSource.BETTER: scraper}
+    ), patch(
+        "courtbooker.worker._fetch_or_create_venues", return_value=[venue]
+    ):
+        result = scrape_shard.apply(
+            args=["better", "venue1", ["2023-01-01", "2023-01-02"]]
+        ).get()
+
+    assert (
+        scraper.get_available_sessions.call_count
+        == app_settings.SCRAPE_SHARD_MAX_RETRIES + 1
+    )
+    assert len(result["courts"]) == 1
+    assert result["failed"] == [["venue1", "2023-01-02"]]
+
+
+@pytest.mark.parametrize("venue_id, geocoded", [(None, True), (1, False)])
+def test_save_scrape_task_only_geocodes_new_venues(venue_id, geocoded):
+    venue = _venue("venue1")
+    venue.id = venue_id
+
+    with patch.object(app_settings, "PERSISTENCE_MODE", "snapshot"), patch(
+        "courtbooker.worker.persistence.save_snapshot", return_value=1
+    ), patch("courtbooker.worker.scheduler.mark_slices_scraped"), patch(
+        "courtbooker.worker.geocode_missing_venues"
+    ) as mock_geocode_missing_venues:
+        _save_scrape_task(
+            models.DataSource.BETTER,
+            [venue],
+            [],
+            datetime.datetime(2023, 1, 1),
+        )
+
+    assert mock_geocode_missing_venues.called == geocoded
+
+
+def test_scrape_shard_reports_each_page_once():
+    venue = _venue("venue1")
+    attempts = []
+
+    def get_available_sessions(venues, date_range, on_page_done=None):
+        for _ in date_range:
+            on_page_done()
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise PageScrapeError([], [(date_range[0], venue)])
+        return []
+
+    scraper = MagicMock()
+    scraper.get_available_sessions.side_effect = get_available_sessions
+
+    with patch.object(app_settings, "SCRAPE_MODE", "sync"), patch.dict(
+        "courtbooker.worker.SCRAPERS", {models.DataSource.BETTER: scraper}
+    ), patch(
+        "courtbooker.worker._fetch_or_create_venues", return_value=[venue]
+    ), patch(
+        "courtbooker.worker.refresh_registry"
+    ) as mock_refresh_registry:
+        scrape_shard.apply(
+            args=["better", "venue1", ["2023-01-01", "2023-01-02"]],
+            kwargs={"refresh_id": "refresh"},
+        ).get()
+
+    pages_done = [
+        call.args[2]
+        for call in mock_refresh_registry.add_pages_done.call_args_list
+    ]
+    assert pages_done == [1, 1, -2, 1, 1]